@@ -5,13 +5,15 @@ import functools
 import logging
 import random
 import secrets
+import time
 import warnings
 from argparse import Namespace
 from collections import Counter, deque, defaultdict
 from collections.abc import Collection, MutableSequence
+from contextlib import contextmanager
 from enum import IntEnum, IntFlag
-from typing import (AbstractSet, Any, Callable, ClassVar, Dict, Iterable, Iterator, List, Literal, Mapping, NamedTuple,
-                    Optional, Protocol, Set, Tuple, Union, TYPE_CHECKING, Literal, overload)
+from typing import (AbstractSet, Any, Callable, ClassVar, Dict, FrozenSet, Iterable, Iterator, List, Literal, Mapping,
+                    NamedTuple, Optional, Protocol, Set, Tuple, Union, TYPE_CHECKING, Literal, overload)
 import dataclasses
 
 from typing_extensions import NotRequired, TypedDict
@@ -87,6 +89,7 @@ class MultiWorld():
     progression_balancing: Dict[int, Options.ProgressionBalancing]
     completion_condition: Dict[int, Callable[[CollectionState], bool]]
     indirect_connections: Dict[Region, Set[Entrance]]
+    item_dependent_connections: Dict[int, Dict[str, Set[Entrance]]]
     exclude_locations: Dict[int, Options.ExcludeLocations]
     priority_locations: Dict[int, Options.PriorityLocations]
     start_inventory: Dict[int, Options.StartInventory]
@@ -101,6 +104,8 @@ class MultiWorld():
     random: random.Random
     per_slot_randoms: Utils.DeprecateDict[int, random.Random]
     """Deprecated. Please use `self.random` instead."""
+    fill_profile: Optional[FillProfile] = None
+    """Collects timings and logic counters of this generation when set, see Generate.py --fill_profile."""
 
     class AttributeProxy():
         def __init__(self, rule):
@@ -166,6 +171,7 @@ class MultiWorld():
         self.early_items = {player: {} for player in self.player_ids}
         self.local_early_items = {player: {} for player in self.player_ids}
         self.indirect_connections = {}
+        self.item_dependent_connections = {}
         self.start_inventory_from_pool: Dict[int, Options.StartInventoryPool] = {}
         self.plando_item_blocks = {}
 
@@ -513,6 +519,18 @@ class MultiWorld():
         state.can_reach(Region) in the Entrance's traversal condition, as opposed to pure transition logic."""
         self.indirect_connections.setdefault(region, set()).add(entrance)
 
+    def register_item_dependencies(self, entrance: Entrance, item_names: Iterable[str]) -> None:
+        """Report that the Entrance's access rule only reads the counts of these item names of entrance.player from
+        state. A blocked Entrance with declared item dependencies is only rechecked when one of those counts changed,
+        instead of on every region update. Reachability of other Regions is still covered by indirect conditions."""
+        item_names = frozenset(item_names)
+        if entrance.item_dependencies is not None:
+            item_names |= entrance.item_dependencies
+        entrance.item_dependencies = item_names
+        dependent_connections = self.item_dependent_connections.setdefault(entrance.player, {})
+        for item_name in item_names:
+            dependent_connections.setdefault(item_name, set()).add(entrance)
+
     def get_locations(self, player: Optional[int] = None) -> Iterable[Location]:
         if player is not None:
             return self.regions.location_cache[player].values()
@@ -564,22 +582,32 @@ class MultiWorld():
     def can_beat_game(self,
                       starting_state: Optional[CollectionState] = None,
                       locations: Optional[Iterable[Location]] = None) -> bool:
+        return self._sweep_to_beat_game(starting_state, locations) is not None
+
+    def _sweep_to_beat_game(self,
+                            starting_state: Optional[CollectionState] = None,
+                            locations: Optional[Iterable[Location]] = None) -> Optional[CollectionState]:
+        """
+        Sweeps a copy of starting_state through locations until the game is beaten.
+        Returns the state that beat the game, which is starting_state itself if it already did, or None if the game
+        could not be beaten.
+        """
         if starting_state:
             if self.has_beaten_game(starting_state):
-                return True
+                return starting_state
             state = starting_state.copy()
         else:
             state = CollectionState(self)
             if self.has_beaten_game(state):
-                return True
+                return state
 
         for _ in state.sweep_for_advancements(locations,
                                               yield_each_sweep=True,
                                               checked_locations=state.locations_checked):
             if self.has_beaten_game(state):
-                return True
+                return state
 
-        return False
+        return None
 
     def get_spheres(self) -> Iterator[Set[Location]]:
         """
@@ -590,23 +618,18 @@ class MultiWorld():
         unreachable locations.
         """
         state = CollectionState(self)
-        locations = set(self.get_filled_locations())
+        locations = LocationSphereIndex(self.get_filled_locations())
 
         while locations:
-            sphere: Set[Location] = set()
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
+            sphere = locations.pop_sphere(state)
             yield sphere
             if not sphere:
                 if locations:
-                    yield locations  # unreachable locations
+                    yield set(locations)  # unreachable locations
                 break
 
             for location in sphere:
-                state.collect(location.item, True, location)
-            locations -= sphere
+                locations.collect(state, location)
 
     def get_sendable_spheres(self) -> Iterator[Set[Location]]:
         """
@@ -616,40 +639,41 @@ class MultiWorld():
         and then a set of all of the unreachable locations.
         """
         state = CollectionState(self)
-        locations: Set[Location] = set()
-        events: Set[Location] = set()
+        sendable_locations: List[Location] = []
+        event_locations: List[Location] = []
         for location in self.get_filled_locations():
             if type(location.item.code) is int and type(location.address) is int:
-                locations.add(location)
+                sendable_locations.append(location)
             else:
-                events.add(location)
-
-        while locations:
-            sphere: Set[Location] = set()
-
-            # cull events out
-            done_events: Set[Union[Location, None]] = {None}
+                event_locations.append(location)
+        locations = LocationSphereIndex(sendable_locations)
+        events = LocationSphereIndex(event_locations)
+
+        def collect(location: Location) -> None:
+            if state.collect(location.item, True, location):
+                locations.mark_changed(location.item.player)
+                events.mark_changed(location.item.player)
+
+        def cull_events() -> None:
+            # events get collected until none is left to reach, so their order within a sphere doesn't matter
+            done_events = events.pop_reachable(state)
             while done_events:
-                done_events = set()
-                for event in events:
-                    if event.can_reach(state):
-                        state.collect(event.item, True, event)
-                        done_events.add(event)
-                events -= done_events
+                for event in done_events:
+                    collect(event)
+                done_events = events.pop_reachable(state)
 
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
+        while locations:
+            cull_events()
+            sphere = locations.pop_sphere(state)
 
             yield sphere
             if not sphere:
                 if locations:
-                    yield locations  # unreachable locations
+                    yield set(locations)  # unreachable locations
                 break
 
             for location in sphere:
-                state.collect(location.item, True, location)
-            locations -= sphere
+                collect(location)
 
     def fulfills_accessibility(self, state: Optional[CollectionState] = None):
         """Check if accessibility rules are fulfilled with current or supplied state."""
@@ -682,29 +706,26 @@ class MultiWorld():
                 return False  # still locations required to be collected
             return True
 
-        locations = [location for location in self.get_locations() if location_relevant(location)]
+        locations = LocationSphereIndex(location for location in self.get_locations() if location_relevant(location))
 
         while locations:
-            sphere: List[Location] = []
-            for n in range(len(locations) - 1, -1, -1):
-                if locations[n].can_reach(state):
-                    sphere.append(locations.pop(n))
+            sphere = locations.pop_reachable(state)
 
             if not sphere:
                 if __debug__:
                     from Fill import FillError
                     raise FillError(
-                        f"Could not access required locations for accessibility check. Missing: {locations}",
+                        f"Could not access required locations for accessibility check. Missing: {list(locations)}",
                         multiworld=self,
                     )
                 # ran out of places and did not finish yet, quit
                 logging.warning(f"Could not access required locations for accessibility check."
-                                f" Missing: {locations}")
+                                f" Missing: {list(locations)}")
                 return False
 
             for location in sphere:
                 if location.item:
-                    state.collect(location.item, True, location)
+                    locations.collect(state, location)
 
             if self.has_beaten_game(state):
                 beatable_fulfilled = True
@@ -718,6 +739,189 @@ class MultiWorld():
 PathValue = Tuple[str, Optional["PathValue"]]
 
 
+class LocationSphereIndex:
+    """
+    Locations that have not been reached yet, bucketed by player, for repeatedly finding the next sphere of reachable
+    locations.
+
+    Locations can depend on the items of other players, so pop_sphere tests every bucket, as a sphere has to hold
+    everything reachable from the previous ones. Searches that only need everything reachable in the end, in any
+    order, can use pop_reachable instead. Like CollectionState.sweep_for_advancements, it first assumes that each
+    player's locations only depend on that player's items and only tests the buckets of players whose state changed.
+    If that finds nothing, every remaining bucket is tested once more to confirm, unless told not to.
+    """
+    unreached: Dict[int, Set[Location]]
+    changed_players: Set[int]
+
+    def __init__(self, locations: Iterable[Location] = ()) -> None:
+        self.unreached = {}
+        for location in locations:
+            self.unreached.setdefault(location.player, set()).add(location)
+        self.changed_players = set(self.unreached)
+
+    def __len__(self) -> int:
+        return sum(len(locations) for locations in self.unreached.values())
+
+    def __iter__(self) -> Iterator[Location]:
+        for locations in self.unreached.values():
+            yield from locations
+
+    def __contains__(self, location: Location) -> bool:
+        return location in self.unreached.get(location.player, ())
+
+    def copy(self) -> LocationSphereIndex:
+        ret = LocationSphereIndex()
+        ret.unreached = {player: locations.copy() for player, locations in self.unreached.items()}
+        ret.changed_players = self.changed_players.copy()
+        return ret
+
+    def remove(self, location: Location) -> None:
+        self.unreached[location.player].remove(location)
+
+    def mark_changed(self, player: int) -> None:
+        """Report that the state of player changed in a way that isn't covered by collect()."""
+        self.changed_players.add(player)
+
+    def collect(self, state: CollectionState, location: Location) -> bool:
+        """Collects the item at location into state without sweeping and marks its player as changed if needed."""
+        assert location.item, f"tried to collect from Location \"{location}\" without an Item"
+        changed = state.collect(location.item, True, location)
+        if changed:
+            self.changed_players.add(location.item.player)
+        return changed
+
+    def pop_reachable(self, state: CollectionState, confirm: bool = True) -> Set[Location]:
+        """
+        Removes and returns all locations that can be reached with state.
+
+        :param state: The state to test the locations against, with everything collected since the last call being
+            reported through collect() or mark_changed().
+        :param confirm: If only testing changed players found nothing, test every other player as well.
+        """
+        tested = self.changed_players.intersection(self.unreached)
+        self.changed_players = set()
+        sphere = self._pop_reachable(state, tested)
+        if not sphere and confirm:
+            sphere = self._pop_reachable(state, [player for player in self.unreached if player not in tested])
+        return sphere
+
+    def pop_sphere(self, state: CollectionState) -> Set[Location]:
+        """Removes and returns all locations that can be reached with state, testing every player."""
+        self.changed_players = set()
+        return self._pop_reachable(state, list(self.unreached))
+
+    def _pop_reachable(self, state: CollectionState, players: Iterable[int]) -> Set[Location]:
+        sphere: Set[Location] = set()
+        for player in players:
+            locations = self.unreached[player]
+            reachable = {location for location in locations if location.can_reach(state)}
+            if reachable:
+                locations -= reachable
+                sphere |= reachable
+        return sphere
+
+
+class PlayerCopyOnWriteDict(dict):
+    """
+    Player -> mutable container mapping used by CollectionState, whose containers can be shared between copies.
+
+    Shared containers are never mutated. As the containers themselves can't report writes, a player's container is
+    copied on its first access through this dict, after which lookups are plain dict lookups. Operations that need all
+    players, such as iteration, copy every container that is still shared.
+    References to a container must not be kept across a `fork()`, as it becomes shared by that call.
+    """
+    __slots__ = ("_shared",)
+    _shared: Dict[int, Any]
+
+    def __init__(self, owned: Mapping[int, Any] = (), shared: Optional[Dict[int, Any]] = None) -> None:
+        super().__init__(owned)
+        self._shared = {} if shared is None else shared
+
+    def __missing__(self, player: int) -> Any:
+        container = self._shared[player].copy()
+        dict.__setitem__(self, player, container)
+        return container
+
+    def fork(self) -> PlayerCopyOnWriteDict:
+        """Returns a new dict with the same contents. All containers become shared between both dicts."""
+        if dict.__len__(self):
+            shared = self._shared.copy()
+            shared.update(dict.items(self))
+            dict.clear(self)
+            self._shared = shared
+        return PlayerCopyOnWriteDict(shared=self._shared)
+
+    def _materialize(self) -> None:
+        if self._shared:
+            for player, container in self._shared.items():
+                if not dict.__contains__(self, player):
+                    dict.__setitem__(self, player, container.copy())
+            self._shared = {}
+
+    def get(self, player: int, default: Any = None) -> Any:
+        if dict.__contains__(self, player) or player in self._shared:
+            return self[player]
+        return default
+
+    def __contains__(self, player: object) -> bool:
+        return dict.__contains__(self, player) or player in self._shared
+
+    def __len__(self) -> int:
+        self._materialize()
+        return dict.__len__(self)
+
+    def __iter__(self) -> Iterator[int]:
+        self._materialize()
+        return dict.__iter__(self)
+
+    def __repr__(self) -> str:
+        self._materialize()
+        return dict.__repr__(self)
+
+    def __eq__(self, other: object) -> bool:
+        self._materialize()
+        return dict.__eq__(self, other)
+
+    def __delitem__(self, player: int) -> None:
+        self._materialize()
+        dict.__delitem__(self, player)
+
+    def __reduce__(self):
+        return self.__class__, (dict(self.items()),)
+
+    def keys(self):
+        self._materialize()
+        return dict.keys(self)
+
+    def values(self):
+        self._materialize()
+        return dict.values(self)
+
+    def items(self):
+        self._materialize()
+        return dict.items(self)
+
+    def copy(self) -> Dict[int, Any]:
+        self._materialize()
+        return dict.copy(self)
+
+    def setdefault(self, player: int, default: Any = None) -> Any:
+        self._materialize()
+        return dict.setdefault(self, player, default)
+
+    def pop(self, player: int, *default: Any) -> Any:
+        self._materialize()
+        return dict.pop(self, player, *default)
+
+    def popitem(self) -> Tuple[int, Any]:
+        self._materialize()
+        return dict.popitem(self)
+
+    def clear(self) -> None:
+        self._shared = {}
+        dict.clear(self)
+
+
 class CollectionState():
     prog_items: Dict[int, Counter[str]]
     multiworld: MultiWorld
@@ -725,22 +929,28 @@ class CollectionState():
     blocked_connections: Dict[int, Set[Entrance]]
     advancements: Set[Location]
     path: Dict[Union[Region, Entrance], PathValue]
+    path_shared: bool
+    """Whether path is shared with a copy of this state, in which case it gets copied before it is written to."""
     locations_checked: Set[Location]
     stale: Dict[int, bool]
+    item_dependency_counts: Dict[int, Dict[str, int]]
+    """Counts of each player's declared item dependencies at their last region update."""
     allow_partial_entrances: bool
     additional_init_functions: List[Callable[[CollectionState, MultiWorld], None]] = []
     additional_copy_functions: List[Callable[[CollectionState, CollectionState], CollectionState]] = []
 
     def __init__(self, parent: MultiWorld, allow_partial_entrances: bool = False):
         assert parent.worlds, "CollectionState created without worlds initialized in parent"
-        self.prog_items = {player: Counter() for player in parent.get_all_ids()}
+        self.prog_items = PlayerCopyOnWriteDict({player: Counter() for player in parent.get_all_ids()})
         self.multiworld = parent
-        self.reachable_regions = {player: set() for player in parent.get_all_ids()}
-        self.blocked_connections = {player: set() for player in parent.get_all_ids()}
+        self.reachable_regions = PlayerCopyOnWriteDict({player: set() for player in parent.get_all_ids()})
+        self.blocked_connections = PlayerCopyOnWriteDict({player: set() for player in parent.get_all_ids()})
         self.advancements = set()
         self.path = {}
+        self.path_shared = False
         self.locations_checked = set()
         self.stale = {player: True for player in parent.get_all_ids()}
+        self.item_dependency_counts = PlayerCopyOnWriteDict({player: {} for player in parent.get_all_ids()})
         self.allow_partial_entrances = allow_partial_entrances
         for function in self.additional_init_functions:
             function(self, parent)
@@ -750,10 +960,19 @@ class CollectionState():
 
     def update_reachable_regions(self, player: int):
         self.stale[player] = False
+        if self.multiworld.fill_profile:
+            self.multiworld.fill_profile.region_updates[player] += 1
         world: AutoWorld.World = self.multiworld.worlds[player]
         reachable_regions = self.reachable_regions[player]
-        queue = deque(self.blocked_connections[player])
         start: Region = world.get_region(world.origin_region_name)
+        dependent_connections = self.multiworld.item_dependent_connections.get(player)
+        if dependent_connections and start in reachable_regions:
+            queue = self._get_item_dependent_queue(player, dependent_connections)
+        else:
+            if dependent_connections:
+                # everything gets rechecked, so only the snapshot needs updating
+                self._get_changed_item_dependencies(player, dependent_connections)
+            queue = deque(self.blocked_connections[player])
 
         # init on first call - this can't be done on construction since the regions don't exist yet
         if start not in reachable_regions:
@@ -766,6 +985,33 @@ class CollectionState():
         else:
             self._update_reachable_regions_auto_indirect_conditions(player, queue)
 
+    def _get_changed_item_dependencies(self, player: int,
+                                       dependent_connections: Dict[str, Set[Entrance]]) -> List[str]:
+        """Returns the declared item dependencies whose count changed since the last call and updates the snapshot."""
+        player_prog_items = self.prog_items[player]
+        last_counts = self.item_dependency_counts[player]
+        changed: List[str] = []
+        for item_name in dependent_connections:
+            count = player_prog_items[item_name]
+            if last_counts.get(item_name, 0) != count:
+                last_counts[item_name] = count
+                changed.append(item_name)
+        return changed
+
+    def _get_item_dependent_queue(self, player: int, dependent_connections: Dict[str, Set[Entrance]]) -> deque:
+        """
+        Builds the initial queue of blocked connections for an incremental region update. Connections without declared
+        item dependencies are always rechecked, the others only if one of their items changed since the last update.
+        """
+        blocked_connections = self.blocked_connections[player]
+        requeued: Set[Entrance] = set()
+        for item_name in self._get_changed_item_dependencies(player, dependent_connections):
+            requeued |= dependent_connections[item_name]
+        requeued &= blocked_connections
+        queue = deque(connection for connection in blocked_connections if connection.item_dependencies is None)
+        queue.extend(requeued)
+        return queue
+
     def _update_reachable_regions_explicit_indirect_conditions(self, player: int, queue: deque):
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
@@ -783,7 +1029,7 @@ class CollectionState():
                 blocked_connections.remove(connection)
                 blocked_connections.update(new_region.exits)
                 queue.extend(new_region.exits)
-                self.path[new_region] = (new_region.name, self.path.get(connection, None))
+                self.get_writable_path()[new_region] = (new_region.name, self.path.get(connection, None))
 
                 # Retry connections if the new region can unblock them
                 for new_entrance in self.multiworld.indirect_connections.get(new_region, set()):
@@ -810,26 +1056,50 @@ class CollectionState():
                     blocked_connections.remove(connection)
                     blocked_connections.update(new_region.exits)
                     queue.extend(new_region.exits)
-                    self.path[new_region] = (new_region.name, self.path.get(connection, None))
+                    self.get_writable_path()[new_region] = (new_region.name, self.path.get(connection, None))
                     new_connection = True
             # sweep for indirect connections, mostly Entrance.can_reach(unrelated_Region)
             queue.extend(blocked_connections)
 
     def copy(self) -> CollectionState:
-        ret = CollectionState(self.multiworld)
-        ret.prog_items = {player: counter.copy() for player, counter in self.prog_items.items()}
-        ret.reachable_regions = {player: region_set.copy() for player, region_set in
-                                 self.reachable_regions.items()}
-        ret.blocked_connections = {player: entrance_set.copy() for player, entrance_set in
-                                   self.blocked_connections.items()}
+        """
+        Creates a copy of this state. Per-player items and region caches are shared between both states and only get
+        copied once a player is accessed through either of them, so the cost of copying scales with the number of
+        players used afterward instead of the whole state.
+        """
+        ret = CollectionState.__new__(CollectionState)
+        ret.multiworld = self.multiworld
+        ret.prog_items = self._fork_per_player("prog_items")
+        ret.reachable_regions = self._fork_per_player("reachable_regions")
+        ret.blocked_connections = self._fork_per_player("blocked_connections")
+        ret.item_dependency_counts = self._fork_per_player("item_dependency_counts")
         ret.advancements = self.advancements.copy()
-        ret.path = self.path.copy()
+        ret.path = self.path
+        ret.path_shared = self.path_shared = True
         ret.locations_checked = self.locations_checked.copy()
+        ret.stale = dict.fromkeys(self.multiworld.get_all_ids(), True)
         ret.allow_partial_entrances = self.allow_partial_entrances
+        for function in self.additional_init_functions:
+            function(ret, self.multiworld)
         for function in self.additional_copy_functions:
             ret = function(self, ret)
         return ret
 
+    def _fork_per_player(self, attribute: str) -> PlayerCopyOnWriteDict:
+        per_player = getattr(self, attribute)
+        if not isinstance(per_player, PlayerCopyOnWriteDict):
+            # replaced from outside with a plain dict
+            per_player = PlayerCopyOnWriteDict(shared=dict(per_player))
+            setattr(self, attribute, per_player)
+        return per_player.fork()
+
+    def get_writable_path(self) -> Dict[Union[Region, Entrance], PathValue]:
+        """Returns self.path, copying it first if it is still shared with a copy of this state."""
+        if self.path_shared:
+            self.path = self.path.copy()
+            self.path_shared = False
+        return self.path
+
     def can_reach(self,
                   spot: Union[Location, Entrance, Region, str],
                   resolution_hint: Optional[str] = None,
@@ -956,6 +1226,8 @@ class CollectionState():
         """
         if checked_locations is None:
             checked_locations = self.advancements
+        if self.multiworld.fill_profile:
+            self.multiworld.fill_profile.sweeps += 1
 
         # Since the sweep loop usually performs many iterations, the locations are filtered in advance.
         # A list of tuples is used, instead of a dictionary, because it is faster to iterate.
@@ -1139,6 +1411,7 @@ class CollectionState():
             # invalidate caches, nothing can be trusted anymore now
             self.reachable_regions[item.player] = set()
             self.blocked_connections[item.player] = set()
+            self.item_dependency_counts[item.player] = {}
             self.stale[item.player] = True
 
     def remove_item(self, item: str, player: int, count: int = 1) -> None:
@@ -1181,6 +1454,8 @@ class Entrance:
     name: str
     parent_region: Optional[Region]
     connected_region: Optional[Region] = None
+    item_dependencies: Optional[FrozenSet[str]] = None
+    """Item names the access_rule reads, see MultiWorld.register_item_dependencies. None if undeclared."""
     randomization_group: int
     randomization_type: EntranceType
 
@@ -1196,7 +1471,8 @@ class Entrance:
         assert self.parent_region, f"called can_reach on an Entrance \"{self}\" with no parent_region"
         if self.parent_region.can_reach(state) and self.access_rule(state):
             if not self.hide_path and self not in state.path:
-                state.path[self] = (self.name, state.path.get(self.parent_region, (self.parent_region.name, None)))
+                state.get_writable_path()[self] = (self.name, state.path.get(self.parent_region,
+                                                                             (self.parent_region.name, None)))
             return True
 
         return False
@@ -1658,6 +1934,90 @@ class Item:
         return f"{self.name} (Player {self.player})"
 
 
+class FillProfile:
+    """
+    Timings and logic counters of a single generation, collected while set as MultiWorld.fill_profile.
+    Stage times include nested stages, so the swaps of a fill_restrictive call also count towards its own time.
+    """
+    stage_times: Dict[str, float]
+    stage_calls: Counter[str]
+    step_times: Dict[int, Dict[str, float]]
+    sweeps: int
+    region_updates: Counter[int]
+    rule_calls: Counter[int]
+    _original_rules: Dict[Union[Location, Entrance],
+                          Tuple[Callable[[CollectionState], bool], Callable[[CollectionState], bool]]]
+    """ original and counting rule of each wrapped spot """
+
+    def __init__(self) -> None:
+        self.stage_times = {}
+        self.stage_calls = Counter()
+        self.step_times = defaultdict(dict)
+        self.sweeps = 0
+        self.region_updates = Counter()
+        self.rule_calls = Counter()
+        self._original_rules = {}
+
+    def add_stage_time(self, stage: str, seconds: float) -> None:
+        self.stage_times[stage] = self.stage_times.get(stage, 0.0) + seconds
+        self.stage_calls[stage] += 1
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage_time(stage, time.perf_counter() - start)
+
+    def count_rule_calls(self, multiworld: MultiWorld) -> None:
+        """
+        Wraps the access rules of all Locations and Entrances of multiworld to count their calls per player, until
+        restore_rules is called. Rules that get replaced in the meantime are not counted.
+        """
+        rule_calls = self.rule_calls
+
+        def counted(rule: Callable[[CollectionState], bool], player: int) -> Callable[[CollectionState], bool]:
+            def counted_rule(state: CollectionState) -> bool:
+                rule_calls[player] += 1
+                return rule(state)
+            return counted_rule
+
+        for cache in (multiworld.regions.location_cache, multiworld.regions.entrance_cache):
+            for player, spots in cache.items():
+                for spot in spots.values():
+                    if spot not in self._original_rules:
+                        counted_rule = counted(spot.access_rule, player)
+                        self._original_rules[spot] = spot.access_rule, counted_rule
+                        spot.access_rule = counted_rule
+
+    def restore_rules(self) -> None:
+        """
+        Puts back the access rules wrapped by count_rule_calls. Rules that got replaced since are left in place, so
+        changes made in the meantime are kept.
+        """
+        for spot, (rule, counted_rule) in self._original_rules.items():
+            if spot.access_rule is counted_rule:
+                spot.access_rule = rule
+        self._original_rules.clear()
+
+    def to_dict(self, multiworld: MultiWorld) -> Dict[str, Any]:
+        return {
+            "stages": {stage: {"time": seconds, "calls": self.stage_calls[stage]}
+                       for stage, seconds in self.stage_times.items()},
+            "sweeps": self.sweeps,
+            "players": {
+                player: {
+                    "name": multiworld.get_player_name(player),
+                    "game": multiworld.game[player],
+                    "steps": self.step_times.get(player, {}),
+                    "region_updates": self.region_updates[player],
+                    "rule_calls": self.rule_calls[player],
+                } for player in multiworld.get_all_ids()
+            },
+        }
+
+
 class EntranceInfo(TypedDict, total=False):
     player: int
     entrance: str
@@ -1733,20 +2093,8 @@ class Spoiler:
         # reducing each range of influence to the bare minimum required inside it
         required_locations = {location for sphere in collection_spheres for location in sphere}
         for num, sphere in reversed(tuple(enumerate(collection_spheres))):
-            to_delete: Set[Location] = set()
-            for location in sphere:
-                # we remove the location from required_locations to sweep from, and check if the game is still beatable
-                logging.debug('Checking if %s (Player %d) is required to beat the game.', location.item.name,
-                              location.item.player)
-                required_locations.remove(location)
-                if multiworld.can_beat_game(state_cache[num], required_locations):
-                    to_delete.add(location)
-                else:
-                    # still required, got to keep it around
-                    required_locations.add(location)
-
             # cull entries in spheres for spoiler walkthrough at end
-            sphere -= to_delete
+            sphere -= self._cull_sphere(sphere, state_cache[num], required_locations)
 
         # second phase, sphere 0
         removed_precollected: List[Item] = []
@@ -1805,6 +2153,38 @@ class Spoiler:
         for item in removed_precollected:
             multiworld.push_precollected(item)
 
+    def _cull_sphere(self, sphere: Set[Location], state: Optional[CollectionState],
+                     required_locations: Set[Location]) -> Set[Location]:
+        """
+        Removes each location of sphere from required_locations if the game is still beatable from state without it,
+        going through sphere in iteration order, and returns the removed locations.
+
+        When a sweep still beats the game, it also tells which of the remaining candidates it never collected. Removing
+        any of those would replay the exact same sweep, so they are removed without sweeping again, until a later
+        candidate that was collected gets removed and changes the sweep.
+        """
+        multiworld = self.multiworld
+        to_delete: Set[Location] = set()
+        unused_candidates: Set[Location] = set()
+        candidates = list(sphere)
+        for index, location in enumerate(candidates):
+            # we remove the location from required_locations to sweep from, and check if the game is still beatable
+            required_locations.remove(location)
+            if location in unused_candidates:
+                to_delete.add(location)
+                continue
+            logging.debug('Checking if %s (Player %d) is required to beat the game.', location.item.name,
+                          location.item.player)
+            beaten_state = multiworld._sweep_to_beat_game(state, required_locations)
+            if beaten_state:
+                to_delete.add(location)
+                unused_candidates = {candidate for candidate in candidates[index + 1:]
+                                     if candidate not in beaten_state.locations_checked}
+            else:
+                # still required, got to keep it around
+                required_locations.add(location)
+        return to_delete
+
     def create_paths(self, state: CollectionState, collection_spheres: List[Set[Location]]) -> None:
         from itertools import zip_longest
         multiworld = self.multiworld
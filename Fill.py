@@ -1,10 +1,12 @@
 import collections
 import itertools
 import logging
+import time
 import typing
 from collections import Counter, deque
 
-from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, PlandoItemBlock
+from BaseClasses import (CollectionState, Item, Location, LocationProgressType, LocationSphereIndex, MultiWorld,
+                         PlandoItemBlock)
 from Options import Accessibility
 
 from worlds.AutoWorld import call_all
@@ -33,6 +35,26 @@ def sweep_from_pool(base_state: CollectionState, itempool: typing.Sequence[Item]
     return new_state
 
 
+def _can_fill_from_state(location: Location, state: CollectionState, item: Item, check_access: bool,
+                         unreachable_locations: typing.Set[Location]) -> bool:
+    """
+    Location.can_fill for many items placed from the same state. Locations found to be unreachable in state get added to
+    unreachable_locations and are rejected without checking their rules again. Locations that override can_fill or
+    always_allow are always checked in full, as either could make the result depend on more than the item's rules.
+    """
+    if type(location).can_fill is not Location.can_fill or location.always_allow is not Location.always_allow:
+        return location.can_fill(state, item, check_access)
+    if check_access and location in unreachable_locations:
+        return False
+    # without always_allow, can_fill with access is can_fill without access and can_reach
+    if not location.can_fill(state, item, check_access=False):
+        return False
+    if check_access and not location.can_reach(state):
+        unreachable_locations.add(location)
+        return False
+    return True
+
+
 def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locations: typing.List[Location],
                      item_pool: typing.List[Item], single_player_placement: bool = False, lock: bool = False,
                      swap: bool = True, on_place: typing.Optional[typing.Callable[[Location], None]] = None,
@@ -51,6 +73,8 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     :param allow_excluded: if true and placement fails, it is re-attempted while ignoring excluded on Locations
     :param name: name of this fill step for progress logging purposes
     """
+    start = time.perf_counter()
+    profile = multiworld.fill_profile
     unplaced_items: typing.List[Item] = []
     placements: typing.List[Location] = []
     cleanup_required = False
@@ -87,6 +111,8 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             if single_player_placement else None)
 
         has_beaten_game = multiworld.has_beaten_game(maximum_exploration_state)
+        # reachability only depends on maximum_exploration_state, so it is shared by all items placed from it
+        unreachable_locations: typing.Set[Location] = set()
 
         while items_to_place:
             # if we have run out of locations to fill,break out of this loop
@@ -107,7 +133,8 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
 
             for i, location in enumerate(locations):
                 if (not single_player_placement or location.player == item_to_place.player) \
-                        and location.can_fill(maximum_exploration_state, item_to_place, perform_access_check):
+                        and _can_fill_from_state(location, maximum_exploration_state, item_to_place,
+                                                 perform_access_check, unreachable_locations):
                     # popping by index is faster than removing by content,
                     spot_to_fill = locations.pop(i)
                     # skipping a scan for the element
@@ -116,6 +143,7 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             else:
                 # we filled all reachable spots.
                 if swap:
+                    swap_start = time.perf_counter()
                     # Keep a cache of previous safe swap states that might be usable to sweep from to produce the next
                     # swap state, instead of sweeping from `base_state` each time.
                     previous_safe_swap_state_cache: typing.Deque[CollectionState] = deque()
@@ -190,6 +218,8 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                         location.item = placed_item
                         placed_item.location = location
 
+                    if profile:
+                        profile.add_stage_time(f"swaps ({name})", time.perf_counter() - swap_start)
                     if spot_to_fill is None:
                         # Can't place this item, move on to the next
                         unplaced_items.append(item_to_place)
@@ -252,6 +282,8 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                             f"{', '.join(str(place) for place in placements)}", multiworld=multiworld)
 
     item_pool.extend(unplaced_items)
+    if profile:
+        profile.add_stage_time(f"fill_restrictive ({name})", time.perf_counter() - start)
 
 
 def remaining_fill(multiworld: MultiWorld,
@@ -260,6 +292,8 @@ def remaining_fill(multiworld: MultiWorld,
                    name: str = "Remaining", 
                    move_unplaceable_to_start_inventory: bool = False,
                    check_location_can_fill: bool = False) -> None:
+    start = time.perf_counter()
+    profile = multiworld.fill_profile
     unplaced_items: typing.List[Item] = []
     placements: typing.List[Location] = []
     swapped_items: typing.Counter[typing.Tuple[int, str]] = Counter()
@@ -290,6 +324,7 @@ def remaining_fill(multiworld: MultiWorld,
         else:
             # we filled all reachable spots.
             # try swapping this item with previously placed items
+            swap_start = time.perf_counter()
 
             for (i, location) in enumerate(placements):
                 placed_item = location.item
@@ -318,6 +353,8 @@ def remaining_fill(multiworld: MultiWorld,
                 location.item = placed_item
                 placed_item.location = location
 
+            if profile:
+                profile.add_stage_time(f"swaps ({name})", time.perf_counter() - swap_start)
             if spot_to_fill is None:
                 # Can't place this item, move on to the next
                 unplaced_items.append(item_to_place)
@@ -351,6 +388,8 @@ def remaining_fill(multiworld: MultiWorld,
                             f"{', '.join(str(place) for place in placements)}", multiworld=multiworld)
 
     itempool.extend(unplaced_items)
+    if profile:
+        profile.add_stage_time(f"remaining_fill ({name})", time.perf_counter() - start)
 
 
 def fast_fill(multiworld: MultiWorld,
@@ -737,6 +776,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
     # Define a threshold value based on the player with the most available locations.
     # If other players are below the threshold value, swap progression in this sphere into earlier spheres,
     #   which gives more locations available by this sphere.
+    start = time.perf_counter()
     balanceable_players: typing.Dict[int, float] = {
         player: multiworld.worlds[player].options.progression_balancing / 100
         for player in multiworld.player_ids
@@ -749,7 +789,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
         logging.debug(balanceable_players)
         state: CollectionState = CollectionState(multiworld)
         checked_locations: typing.Set[Location] = set()
-        unchecked_locations: typing.Set[Location] = set(multiworld.get_locations())
+        unchecked_locations = LocationSphereIndex(multiworld.get_locations())
 
         total_locations_count: typing.Counter[int] = Counter(
             location.player
@@ -784,9 +824,8 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
             # Gather non-locked locations.
             # This ensures that only shuffled locations get counted for progression balancing,
             #   i.e. the items the players will be checking.
-            sphere_locations = get_sphere_locations(state, unchecked_locations)
+            sphere_locations = unchecked_locations.pop_sphere(state)
             for location in sphere_locations:
-                unchecked_locations.remove(location)
                 if not location.locked:
                     reachable_locations_count[location.player] += 1
 
@@ -823,7 +862,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                         # Check locations in the current sphere and gather progression items to swap earlier
                         for location in balancing_sphere:
                             if location.advancement:
-                                balancing_state.collect(location.item, True, location)
+                                balancing_unchecked_locations.collect(balancing_state, location)
                                 player = location.item.player
                                 # only replace items that end up in another player's world
                                 if (not location.locked and not location.item.skip_in_prog_balancing and
@@ -832,9 +871,8 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                                         location.progress_type != LocationProgressType.PRIORITY):
                                     candidate_items[player].add(location)
                                     logging.debug(f"Candidate item: {location.name}, {location.item.name}")
-                        balancing_sphere = get_sphere_locations(balancing_state, balancing_unchecked_locations)
+                        balancing_sphere = balancing_unchecked_locations.pop_sphere(balancing_state)
                         for location in balancing_sphere:
-                            balancing_unchecked_locations.remove(location)
                             if not location.locked:
                                 balancing_reachables[location.player] += 1
                         if multiworld.has_beaten_game(balancing_state) or all(
@@ -895,7 +933,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                                 logging.debug(f"Progression balancing moved {new_location.item} to {new_location}, "
                                               f"displacing {old_location.item} into {old_location}")
                                 moved_item_count += 1
-                                state.collect(new_location.item, True, new_location)
+                                unchecked_locations.collect(state, new_location)
                                 break
                         else:
                             logging.warning(f"Could not Progression Balance {old_location.item}")
@@ -911,7 +949,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
 
             for location in sphere_locations:
                 if location.advancement:
-                    state.collect(location.item, True, location)
+                    unchecked_locations.collect(state, location)
             checked_locations |= sphere_locations
 
             if multiworld.has_beaten_game(state):
@@ -920,6 +958,9 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                 logging.warning("Progression Balancing ran out of paths.")
                 break
 
+    if multiworld.fill_profile:
+        multiworld.fill_profile.add_stage_time("balance_multiworld_progression", time.perf_counter() - start)
+
 
 def swap_location_item(location_1: Location, location_2: Location, check_locked: bool = True) -> None:
     """Swaps Items of locations. Does NOT swap flags like shop_slot or locked, but does swap event"""
@@ -7,11 +7,12 @@ import os
 import random
 import string
 import sys
+import time
 import urllib.parse
 import urllib.request
 from collections import Counter
 from itertools import chain
-from typing import Any
+from typing import Any, NamedTuple
 
 import ModuleUpdate
 
@@ -57,6 +58,17 @@ def mystery_argparse(argv: list[str] | None = None):
     parser.add_argument("--spoiler_only", action="store_true",
                         help="Skips generation assertion and multidata, outputting only a spoiler log. "
                              "Intended for debugging and testing purposes.")
+    parser.add_argument("--fill_profile", action="store_true",
+                        help="Records timings of the fill stages and logic call counts per world, "
+                             "and outputs them as json next to the spoiler log.")
+    parser.add_argument("--lazy_worlds", action="store_true",
+                        help="Only imports the worlds used by the player files, "
+                             "using an index of the world folders cached from previous runs.")
+    parser.add_argument("--batch",
+                        help="Generates one seed per sub folder of player files in this folder, or per entry of this "
+                             "yaml manifest, in worker processes sharing one import of the worlds.")
+    parser.add_argument("--batch_workers", type=lambda value: max(int(value), 1), default=os.cpu_count() or 1,
+                        help="Number of worker processes for --batch.")
     args = parser.parse_args(argv)
 
     if args.skip_output and args.spoiler_only:
@@ -77,9 +89,10 @@ def get_seed_name(random_source) -> str:
     return f"{random_source.randint(0, pow(10, seeddigits) - 1)}".zfill(seeddigits)
 
 
-def main(args=None) -> tuple[argparse.Namespace, int]:
+def main(args=None, *, batch: bool = False) -> tuple[argparse.Namespace, int]:
     # __name__ == "__main__" check so unittests that already imported worlds don't trip this.
-    if __name__ == "__main__" and "worlds" in sys.modules:
+    # batch workers are forked after the worlds got loaded, which happens after logging init in generate_batch.
+    if __name__ == "__main__" and not batch and "worlds" in sys.modules:
         raise Exception("Worlds system should not be loaded before logging init.")
 
     if not args:
@@ -88,6 +101,9 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
     seed = get_seed(args.seed)
 
     Utils.init_logging(f"Generate_{seed}", loglevel=args.log_level, add_timestamp=args.log_time)
+    if args.lazy_worlds:
+        # read by worlds on import, which only happens after logging init
+        os.environ["LAZY_WORLD_LOADING"] = "1"
     random.seed(seed)
     seed_name = get_seed_name(random)
 
@@ -649,20 +665,144 @@ def roll_alttp_settings(ret: argparse.Namespace, weights):
                         ret.sprite_pool += [key] * int(value)
 
 
+class BatchResult(NamedTuple):
+    player_files_path: str
+    seed: int | None
+    seed_name: str | None
+    seconds: float
+    error: str | None
+
+
+def read_batch(args: argparse.Namespace) -> list[argparse.Namespace]:
+    """
+    Returns the arguments of each seed of args.batch, which is either a folder containing one sub folder of player files
+    per seed, or a yaml manifest listing seeds as mappings of optional player_files_path and seed.
+    Anything not set per seed is taken from args, except that seeds count up from args.seed so their output files don't
+    overwrite each other.
+    """
+    entries: list[dict[str, Any]]
+    if os.path.isdir(args.batch):
+        entries = [{"player_files_path": entry.path}
+                   for entry in sorted(os.scandir(args.batch), key=lambda entry: entry.name.casefold())
+                   if entry.is_dir() and not entry.name.startswith(".")]
+    else:
+        with open(args.batch, encoding="utf-8-sig") as f:
+            entries = Utils.parse_yaml(f.read())
+        if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+            raise ValueError(f"Batch manifest {args.batch} has to be a list of mappings.")
+
+    batch: list[argparse.Namespace] = []
+    for index, entry in enumerate(entries):
+        unknown_keys = set(entry) - {"player_files_path", "seed"}
+        if unknown_keys:
+            raise ValueError(f"Unknown keys {sorted(unknown_keys)} in batch manifest {args.batch}.")
+        seed_args = copy.copy(args)
+        seed_args.batch = None
+        seed_args.player_files_path = entry.get("player_files_path", args.player_files_path)
+        seed_args.seed = entry.get("seed", None if args.seed is None else args.seed + index)
+        for path_arg in ("weights_file_path", "meta_file_path"):
+            # mystery_argparse made these relative to the default player files path
+            if os.path.dirname(getattr(args, path_arg)) == args.player_files_path:
+                setattr(seed_args, path_arg, os.path.join(seed_args.player_files_path,
+                                                          os.path.basename(getattr(args, path_arg))))
+        batch.append(seed_args)
+
+    seeds = Counter(seed_args.seed for seed_args in batch if seed_args.seed is not None)
+    duplicates = sorted(seed for seed, count in seeds.items() if count > 1)
+    if duplicates:
+        raise ValueError(f"Seeds {duplicates} appear more than once in batch {args.batch}.")
+    return batch
+
+
+def generate_batch_seed(args: argparse.Namespace) -> BatchResult:
+    """Rolls and generates a single seed of a batch, catching errors so the rest of the batch keeps going."""
+    start = time.perf_counter()
+    erargs: argparse.Namespace | None = None
+    try:
+        erargs, seed = main(args, batch=True)
+        from Main import main as ERmain
+        ERmain(erargs, seed)
+    except Exception as e:
+        logging.exception(f"Exception generating batch seed for {args.player_files_path}")
+        return BatchResult(args.player_files_path, args.seed, erargs.outputname if erargs else None,
+                           time.perf_counter() - start, Utils.get_all_causes(e))
+    return BatchResult(args.player_files_path, seed, erargs.outputname, time.perf_counter() - start, None)
+
+
+def generate_batch(args: argparse.Namespace) -> list[BatchResult]:
+    """
+    Generates every seed of args.batch in up to args.batch_workers processes. The worlds are imported once before the
+    workers get forked, so each seed only pays for its own generation. Where fork is not available, each worker imports
+    the worlds itself. Returns the results in batch order.
+    """
+    import multiprocessing
+
+    Utils.init_logging("Generate_batch", loglevel=args.log_level, add_timestamp=args.log_time)
+    batch = read_batch(args)
+    if not batch:
+        raise ValueError(f"No seeds found in batch {args.batch}.")
+
+    if args.lazy_worlds:
+        # has to be set before the import, main only sets it once the worlds of the batch are already loaded
+        os.environ["LAZY_WORLD_LOADING"] = "1"
+    start = time.perf_counter()
+    import worlds  # noqa: F401 loaded here to be shared by the forked workers
+    logging.info(f"Loaded worlds in {time.perf_counter() - start:.2f} seconds. "
+                 f"Generating {len(batch)} seeds with up to {args.batch_workers} workers.")
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    results: list[BatchResult | None] = [None] * len(batch)
+    # every seed gets a fresh worker, so nothing a world changes at runtime leaks into the next seed
+    with context.Pool(min(args.batch_workers, len(batch)), maxtasksperchild=1) as pool:
+        for index, result in pool.imap_unordered(_generate_batch_seed_indexed, enumerate(batch)):
+            results[index] = result
+            if result.error:
+                logging.error(f"Seed {index + 1}/{len(batch)} ({result.player_files_path}) failed after "
+                              f"{result.seconds:.2f} seconds:\n{result.error}")
+            else:
+                logging.info(f"Seed {index + 1}/{len(batch)} ({result.player_files_path}) {result.seed_name} "
+                             f"generated in {result.seconds:.2f} seconds.")
+
+    finished = [result for result in results if result]
+    failures = sum(1 for result in finished if result.error)
+    logging.info(f"Batch done in {time.perf_counter() - start:.2f} seconds, "
+                 f"{len(finished) - failures} generated, {failures} failed.")
+    for result in finished:
+        status = f"failed: {result.error.splitlines()[0]}" if result.error else result.seed_name
+        logging.info(f"  {result.seconds:8.2f}s  {result.player_files_path}  {status}")
+    return finished
+
+
+def _generate_batch_seed_indexed(indexed_args: tuple[int, argparse.Namespace]) -> tuple[int, BatchResult]:
+    index, args = indexed_args
+    return index, generate_batch_seed(args)
+
+
 if __name__ == '__main__':
     import atexit
     confirmation = atexit.register(input, "Press enter to close.")
-    erargs, seed = main()
-    from Main import main as ERmain
-    multiworld = ERmain(erargs, seed)
-    if __debug__:
-        import gc
-        import sys
-        import weakref
-        weak = weakref.ref(multiworld)
-        del multiworld
-        gc.collect()  # need to collect to deref all hard references
-        assert not weak(), f"MultiWorld object was not de-allocated, it's referenced {sys.getrefcount(weak())} times." \
-                           " This would be a memory leak."
-    # in case of error-free exit should not need confirmation
-    atexit.unregister(confirmation)
+    args = mystery_argparse()
+    if args.batch:
+        import multiprocessing
+        multiprocessing.freeze_support()
+        # in case of error-free exit should not need confirmation
+        if not any(result.error for result in generate_batch(args)):
+            atexit.unregister(confirmation)
+    else:
+        erargs, seed = main(args)
+        from Main import main as ERmain
+        multiworld = ERmain(erargs, seed)
+        if __debug__:
+            import gc
+            import sys
+            import weakref
+            weak = weakref.ref(multiworld)
+            del multiworld
+            gc.collect()  # need to collect to deref all hard references
+            assert not weak(), f"MultiWorld object was not de-allocated, it's referenced {sys.getrefcount(weak())} " \
+                               "times. This would be a memory leak."
+        # in case of error-free exit should not need confirmation
+        atexit.unregister(confirmation)
@@ -1,6 +1,7 @@
 import collections
 from collections.abc import Mapping
 import concurrent.futures
+import json
 import logging
 import os
 import tempfile
@@ -10,7 +11,7 @@ import zipfile
 import zlib
 
 import worlds
-from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld
+from BaseClasses import CollectionState, FillProfile, Item, Location, LocationProgressType, MultiWorld
 from Fill import FillError, balance_multiworld_progression, distribute_items_restrictive, flood_items, \
     parse_planned_blocks, distribute_planned_blocks, resolve_early_locations_for_planned
 from NetUtils import convert_to_base_types
@@ -34,6 +35,8 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     start = time.perf_counter()
     # initialize the multiworld
     multiworld = MultiWorld(args.multi)
+    if args.fill_profile:
+        multiworld.fill_profile = FillProfile()
 
     logger = logging.getLogger()
     multiworld.set_seed(seed, args.race, str(args.outputname) if args.outputname else None)
@@ -51,16 +54,18 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     multiworld.state = CollectionState(multiworld)
     logger.info('Archipelago Version %s  -  Seed: %s\n', __version__, multiworld.seed)
 
-    logger.info(f"Found {len(AutoWorld.AutoWorldRegister.world_types)} World Types:")
-    longest_name = max(len(text) for text in AutoWorld.AutoWorldRegister.world_types)
+    # only list the loaded world types, instead of loading all of them when lazy world loading is enabled
+    world_types = dict(dict.items(AutoWorld.AutoWorldRegister.world_types))
+    logger.info(f"Found {len(world_types)} World Types:")
+    longest_name = max(len(text) for text in world_types)
 
-    world_classes = AutoWorld.AutoWorldRegister.world_types.values()
+    world_classes = world_types.values()
 
     version_count = max(len(cls.world_version.as_simple_string()) for cls in world_classes)
     item_count = len(str(max(len(cls.item_names) for cls in world_classes)))
     location_count = len(str(max(len(cls.location_names) for cls in world_classes)))
 
-    for name, cls in AutoWorld.AutoWorldRegister.world_types.items():
+    for name, cls in world_types.items():
         if not cls.hidden and len(cls.item_names) > 0:
             logger.info(f" {name:{longest_name}}: "
                         f"v{cls.world_version.as_simple_string():{version_count}} | "
@@ -184,6 +189,9 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     if any(world.options.item_links for world in multiworld.worlds.values()):
         multiworld._all_state = None
 
+    if multiworld.fill_profile:
+        multiworld.fill_profile.count_rule_calls(multiworld)
+
     logger.info("Running Item Plando.")
     resolve_early_locations_for_planned(multiworld)
     distribute_planned_blocks(multiworld, [x for player in multiworld.plando_item_blocks
@@ -207,15 +215,21 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     else:
         logger.info("Progression balancing skipped.")
 
+    if multiworld.fill_profile:
+        multiworld.fill_profile.restore_rules()
+
     # we're about to output using multithreading, so we're removing the global random state to prevent accidental use
     multiworld.random.passthrough = False
 
+    outfilebase = 'AP_' + multiworld.seed_name
+
     if args.skip_output:
+        if multiworld.fill_profile:
+            write_fill_profile(multiworld, output_path(f"{outfilebase}_FillProfile.json"))
         logger.info('Done. Skipped output/spoiler generation. Total Time: %s', time.perf_counter() - start)
         return multiworld
 
     logger.info(f'Beginning output...')
-    outfilebase = 'AP_' + multiworld.seed_name
 
     if args.spoiler_only:
         if args.spoiler > 1:
@@ -223,6 +237,8 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
             multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
 
         multiworld.spoiler.to_file(output_path('%s_Spoiler.txt' % outfilebase))
+        if multiworld.fill_profile:
+            write_fill_profile(multiworld, output_path(f"{outfilebase}_FillProfile.json"))
         logger.info('Done. Skipped multidata modification. Total time: %s', time.perf_counter() - start)
         return multiworld
 
@@ -376,6 +392,9 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         if args.spoiler:
             multiworld.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
 
+        if multiworld.fill_profile:
+            write_fill_profile(multiworld, os.path.join(temp_dir, f"{outfilebase}_FillProfile.json"))
+
         zipfilename = output_path(f"AP_{multiworld.seed_name}.zip")
         logger.info(f"Creating final archive at {zipfilename}")
         with zipfile.ZipFile(zipfilename, mode="w", compression=zipfile.ZIP_DEFLATED,
@@ -385,3 +404,8 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
 
     logger.info('Done. Enjoy. Total Time: %s', time.perf_counter() - start)
     return multiworld
+
+
+def write_fill_profile(multiworld: MultiWorld, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(multiworld.fill_profile.to_dict(multiworld), f, indent=4)
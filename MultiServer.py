@@ -3,6 +3,7 @@ from __future__ import annotations
 import argparse
 import asyncio
 import collections
+import concurrent.futures
 import contextlib
 import copy
 import datetime
@@ -13,9 +14,11 @@ import itertools
 import logging
 import math
 import operator
+import os
 import pickle
 import random
 import shlex
+import struct
 import threading
 import time
 import typing
@@ -43,7 +46,7 @@ import NetUtils
 import Utils
 from Utils import version_tuple, restricted_loads, Version, async_start, get_intended_text
 from NetUtils import Endpoint, ClientStatus, NetworkItem, decode, encode, NetworkPlayer, Permission, NetworkSlot, \
-    SlotType, LocationStore, MultiData, Hint, HintStatus
+    SlotType, LocationStore, MultiData, Hint, HintStatus, SphereIndex
 from BaseClasses import ItemClassification
 
 
@@ -212,6 +215,131 @@ class Client(Endpoint):
 team_slot = typing.Tuple[int, int]
 
 
+class SaveJournal:
+    """
+    Tracks the changes of a save since it was last written, so saving only appends them as a frame to a journal.
+    Changes get reported where they are made: location checks and data storage keys, hints per slot and the other,
+    small parts of the save per key of Context.get_save_parts. Received items are only ever appended, so they are tracked
+    by how many of them were written.
+    Frames and snapshots get taken in the event loop that makes the changes, only compressing and writing them is left
+    to the saving thread.
+    Once the journal grows larger than the last snapshot, the next save writes a full snapshot and starts a new journal.
+    """
+    journaled_keys = frozenset({"received_items", "location_checks", "hints", "stored_data"})
+    frame_header = struct.Struct("!I")
+
+    generation: int
+    """ increased with each snapshot, frames of an older journal are skipped when loading """
+    snapshot_size: int
+    journal_size: int
+    new_checks: typing.Dict[team_slot, typing.Set[int]]
+    changed_keys: typing.Set[str]
+    """ keys of data storage """
+    changed_hints: typing.Set[team_slot]
+    changed_state: typing.Set[str]
+    """ keys of Context.get_save_parts that are not journaled_keys """
+    items_written: typing.Dict[typing.Tuple[int, int, bool], int]
+
+    def __init__(self):
+        self.generation = 0
+        self.snapshot_size = 0
+        self.journal_size = 0
+        self.new_checks = collections.defaultdict(set)
+        self.changed_keys = set()
+        self.changed_hints = set()
+        self.changed_state = set()
+        self.items_written = {}
+
+    def start(self, ctx: Context, generation: int, snapshot_size: int, journal_size: int) -> None:
+        """Continues the journal of a loaded save, everything in ctx counts as written."""
+        self.generation = generation
+        self.snapshot_size = snapshot_size
+        self.journal_size = journal_size
+        self.new_checks = collections.defaultdict(set)
+        self.changed_keys = set()
+        self.changed_hints = set()
+        self.changed_state = set()
+        self.items_written = {key: len(items) for key, items in ctx.received_items.items()}
+
+    @property
+    def snapshot_due(self) -> bool:
+        return self.journal_size >= self.snapshot_size
+
+    def take_snapshot(self, ctx: Context) -> bytes:
+        """
+        Returns the full save of ctx pickled for a new journal, to be written in place of the old snapshot and journal.
+        Has to be called in the event loop of ctx, pickling is the only copy the saving thread needs.
+        """
+        self.start(ctx, self.generation + 1, self.snapshot_size, 0)
+        savedata = ctx.get_save()
+        savedata["journal_generation"] = self.generation
+        # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
+        return pickle.dumps(savedata)
+
+    def take_frame(self, ctx: Context) -> bytes:
+        """
+        Returns the changes reported since the last frame or snapshot pickled, to be compressed by compress_frame.
+        Has to be called in the event loop of ctx.
+        """
+        received_items = {}
+        for key, items in ctx.received_items.items():
+            written = self.items_written.get(key, 0)
+            if len(items) > written:
+                received_items[key] = written, items[written:]
+                self.items_written[key] = len(items)
+        save_parts = ctx.get_save_parts()
+        frame = {
+            "received_items": received_items,
+            "location_checks": dict(self.new_checks),
+            "hints": {key: frozenset(ctx.hints.get(key, ())) for key in self.changed_hints},
+            "stored_data": {key: ctx.stored_data[key] for key in self.changed_keys if key in ctx.stored_data},
+            "state": {key: save_parts[key]() for key in self.changed_state},
+        }
+        self.new_checks = collections.defaultdict(set)
+        self.changed_keys = set()
+        self.changed_hints = set()
+        self.changed_state = set()
+        return pickle.dumps((self.generation, frame))
+
+    @staticmethod
+    def compress_frame(frame: bytes) -> bytes:
+        """Returns a frame of take_frame compressed, to be appended to the journal."""
+        return zlib.compress(frame)
+
+    @classmethod
+    def pack_frames(cls, *frames: bytes) -> bytes:
+        """Joins frames for a journal file."""
+        return b"".join(cls.frame_header.pack(len(frame)) + frame for frame in frames)
+
+    @classmethod
+    def unpack_frames(cls, data: bytes) -> typing.Iterator[bytes]:
+        """Splits a journal file into frames, dropping a frame cut off by an interrupted write."""
+        position = 0
+        while position + cls.frame_header.size <= len(data):
+            size, = cls.frame_header.unpack_from(data, position)
+            position += cls.frame_header.size
+            if position + size > len(data):
+                break
+            yield data[position:position + size]
+            position += size
+
+    @staticmethod
+    def replay(savedata: dict, frames: typing.Iterable[bytes]) -> None:
+        """Applies the frames of the journal that belongs to the snapshot savedata to it."""
+        generation = savedata.get("journal_generation", 0)
+        for data in frames:
+            frame_generation, frame = restricted_loads(zlib.decompress(data))
+            if frame_generation != generation:
+                continue
+            for key, (start, items) in frame["received_items"].items():
+                savedata["received_items"].setdefault(key, [])[start:start + len(items)] = items
+            for key, locations in frame["location_checks"].items():
+                savedata["location_checks"].setdefault(key, set()).update(locations)
+            savedata["hints"].update((key, set(hints)) for key, hints in frame["hints"].items())
+            savedata.setdefault("stored_data", {}).update(frame["stored_data"])
+            savedata.update(frame["state"])
+
+
 class Context:
     dumper = staticmethod(encode)
     loader = staticmethod(decode)
@@ -249,6 +377,23 @@ class Context:
     non_hintable_names: typing.Dict[str, typing.AbstractSet[str]]
     spheres: typing.List[typing.Dict[int, typing.Set[int]]]
     """ each sphere is { player: { location_id, ... } } """
+    sphere_index: SphereIndex
+    pending_items: typing.Set[team_slot]
+    """ slots that received items which were not sent to their clients yet """
+    pending_items_handle: typing.Optional[asyncio.Handle] = None
+    encoded_game_packages: typing.Dict[str, str]
+    """ encoded data package of each game by checksum """
+    encoded_players: typing.Optional[str] = None
+    """ encoded get_players_package(), reset when an alias changes """
+    encoded_slot_info: typing.Optional[str] = None
+    encoded_slot_data: typing.Dict[int, str]
+    broadcast_window: float = 0
+    """ seconds PrintJSON broadcasts to a team are held to be sent together as one frame, 0 sends them right away """
+    pending_broadcasts: typing.Dict[int, typing.Tuple[typing.List[typing.List[dict]], asyncio.TimerHandle]]
+    coalesced_frames_saved: int = 0
+    """ frames not sent to clients because broadcasts were sent together """
+    coalesced_bytes_saved: int = 0
+    """ uncompressed bytes not sent to clients because broadcasts were sent together """
     logger: logging.Logger
 
     def __init__(self, host: str, port: int, server_password: str, password: str, location_check_points: int,
@@ -266,6 +411,12 @@ class Context:
         self.data_filename = None
         self.save_filename = None
         self.saving = False
+        self.save_journal: typing.Optional[SaveJournal] = None
+        self.journal_filename = None
+        try:
+            self.loop: typing.Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            self.loop = None  # created outside of an event loop, saving calls everything right away
         self.player_names: typing.Dict[team_slot, str] = {}
         self.player_name_lookup: typing.Dict[str, team_slot] = {}
         self.connect_names = {}  # names of slots clients can connect to
@@ -277,6 +428,7 @@ class Context:
         self.server = None
         self.countdown_timer = 0
         self.received_items = {}
+        self.pending_items = set()
         self.start_inventory = {}
         self.name_aliases: typing.Dict[team_slot, str] = {}
         self.location_checks = collections.defaultdict(set)
@@ -284,6 +436,8 @@ class Context:
         self.location_check_points = location_check_points
         self.hints_used = collections.defaultdict(int)
         self.hints: typing.Dict[team_slot, typing.Set[Hint]] = collections.defaultdict(set)
+        self.hint_index: typing.Dict[typing.Tuple[int, int, int], typing.Set[Hint]] = collections.defaultdict(set)
+        """ hints by team, finding player and location """
         self.release_mode: str = release_mode
         self.remaining_mode: str = remaining_mode
         self.collect_mode: str = collect_mode
@@ -314,6 +468,10 @@ class Context:
         self.stored_data_notification_clients = collections.defaultdict(weakref.WeakSet)
         self.read_data = {}
         self.spheres = []
+        self.sphere_index = SphereIndex([])
+        self.encoded_game_packages = {}
+        self.encoded_slot_data = {}
+        self.pending_broadcasts = {}
 
         # init empty to satisfy linter, I suppose
         self.gamespackage = {}
@@ -333,7 +491,12 @@ class Context:
     # Data package retrieval
     def _load_game_data(self):
         import worlds
-        self.gamespackage = worlds.network_data_package["games"]
+        # groups are not sent to clients, without removing them from the data package shared with other contexts
+        self.gamespackage = {
+            game_name: {key: value for key, value in game_package.items()
+                        if key not in ("item_name_groups", "location_name_groups")}
+            for game_name, game_package in worlds.network_data_package["games"].items()
+        }
 
         self.item_name_groups = {world_name: world.item_name_groups for world_name, world in
                                  worlds.AutoWorldRegister.world_types.items()}
@@ -342,11 +505,6 @@ class Context:
         for world_name, world in worlds.AutoWorldRegister.world_types.items():
             self.non_hintable_names[world_name] = world.hint_blacklist
 
-        for game_package in self.gamespackage.values():
-            # remove groups from data sent to clients
-            del game_package["item_name_groups"]
-            del game_package["location_name_groups"]
-
     def _init_game_data(self):
         for game_name, game_package in self.gamespackage.items():
             if "checksum" in game_package:
@@ -434,6 +592,21 @@ class Context:
 
     def broadcast_team(self, team: int, msgs: typing.List[dict]):
         msg_is_text = all(msg["cmd"] == "PrintJSON" for msg in msgs)
+        if msg_is_text and self.broadcast_window:
+            pending = self.pending_broadcasts.get(team)
+            if pending:
+                pending[0].append(msgs)
+                return
+            try:
+                handle = asyncio.get_running_loop().call_later(self.broadcast_window, self.flush_broadcasts, team)
+            except RuntimeError:
+                pass  # no loop to wait in
+            else:
+                self.pending_broadcasts[team] = [msgs], handle
+                return
+        elif team in self.pending_broadcasts:
+            # held text goes out first, so messages keep their order
+            self.flush_broadcasts(team)
         data = self.dumper(msgs)
         endpoints = (
             endpoint
@@ -442,6 +615,22 @@ class Context:
         )
         async_start(self.broadcast_send_encoded_msgs(endpoints, data))
 
+    def flush_broadcasts(self, team: int):
+        """Sends the PrintJSON broadcasts held for the team as one frame."""
+        pending = self.pending_broadcasts.pop(team, None)
+        if not pending:
+            return
+        batches, handle = pending
+        handle.cancel()
+        # each batch is encoded as its own list, which gets joined into one by dropping the inner brackets
+        encoded_batches = [self.dumper(batch) for batch in batches]
+        data = "[" + ",".join(encoded[1:-1] for encoded in encoded_batches if encoded != "[]") + "]"
+        endpoints = [endpoint for endpoint in itertools.chain.from_iterable(self.clients[team].values())
+                     if not endpoint.no_text]
+        self.coalesced_frames_saved += (len(batches) - 1) * len(endpoints)
+        self.coalesced_bytes_saved += (sum(map(len, encoded_batches)) - len(data)) * len(endpoints)
+        async_start(self.broadcast_send_encoded_msgs(endpoints, data))
+
     def broadcast(self, endpoints: typing.Iterable[Client], msgs: typing.List[dict]):
         msgs = self.dumper(msgs)
         async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
@@ -546,6 +735,7 @@ class Context:
 
         for slot, hints in decoded_obj["precollected_hints"].items():
             self.hints[0, slot].update(hints)
+            self.index_hints(0, hints)
 
         # declare slots that aren't players as done
         for slot, slot_info in self.slot_info.items():
@@ -576,6 +766,7 @@ class Context:
 
         # sorted access spheres
         self.spheres = decoded_obj.get("spheres", [])
+        self.sphere_index = SphereIndex(self.spheres)
 
     # saving
 
@@ -592,12 +783,31 @@ class Context:
 
     def _save(self, exit_save: bool = False) -> bool:
         try:
-            # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
-            encoded_save = pickle.dumps(self.get_save())
+            if self.save_journal and not self.save_journal.snapshot_due:
+                save_journal = self.save_journal
+                frame = save_journal.pack_frames(save_journal.compress_frame(
+                    self.call_in_loop(lambda: save_journal.take_frame(self))))
+                with open(self.journal_filename, "ab") as f:
+                    f.write(frame)
+                save_journal.journal_size += len(frame)
+                return True
+            if self.save_journal:
+                save_journal = self.save_journal
+                encoded_save = zlib.compress(self.call_in_loop(lambda: save_journal.take_snapshot(self)))
+            else:
+                # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
+                encoded_save = zlib.compress(pickle.dumps(self.get_save()))
             with open(self.save_filename, "wb") as f:
-                f.write(zlib.compress(encoded_save))
+                f.write(encoded_save)
+            if self.save_journal:
+                with open(self.journal_filename, "wb"):
+                    pass
+                self.save_journal.snapshot_size = len(encoded_save)
         except Exception as e:
             self.logger.exception(e)
+            if self.save_journal:
+                # changes of a lost frame are only in ctx now, so they need a snapshot
+                self.save_journal.snapshot_size = 0
             return False
         else:
             return True
@@ -606,14 +816,27 @@ class Context:
         self.saving = enabled
         if self.saving:
             if not self.save_filename:
-                import os
                 name, ext = os.path.splitext(self.data_filename)
                 self.save_filename = name + '.apsave' if ext.lower() in ('.archipelago', '.zip') \
                     else self.data_filename + '_' + 'apsave'
+            self.journal_filename = self.save_filename + ".journal"
             try:
                 with open(self.save_filename, 'rb') as f:
-                    save_data = restricted_loads(zlib.decompress(f.read()))
-                    self.set_save(save_data)
+                    encoded_save = f.read()
+                try:
+                    with open(self.journal_filename, 'rb') as f:
+                        journal = f.read()
+                except FileNotFoundError:
+                    journal = b""
+                save_data = restricted_loads(zlib.decompress(encoded_save))
+                SaveJournal.replay(save_data, SaveJournal.unpack_frames(journal))
+                self.set_save(save_data)
+                if self.save_journal:
+                    self.save_journal.start(self, save_data.get("journal_generation", 0), len(encoded_save),
+                                            len(journal))
+                elif journal and self._save():
+                    # saving without journal, so fold it into the save
+                    os.remove(self.journal_filename)
             except FileNotFoundError:
                 self.logger.error('No save data found, starting a new game')
             except Exception as e:
@@ -651,34 +874,76 @@ class Context:
                 import atexit
                 atexit.register(self._save, True)  # make sure we save on exit too
 
-    def get_save(self) -> dict:
-        self.recheck_hints()
-        d = {
-            "version": self.save_version,
-            "connect_names": self.connect_names,
-            "received_items": self.received_items,
-            "hints_used": dict(self.hints_used),
-            "hints": dict(self.hints),
-            "location_checks": dict(self.location_checks),
-            "name_aliases": self.name_aliases,
-            "client_game_state": dict(self.client_game_state),
-            "client_activity_timers": tuple(
+    def get_save_parts(self) -> typing.Dict[str, typing.Callable[[], typing.Any]]:
+        """Returns a function per key of the save that returns its value, so parts can be read on their own."""
+        return {
+            "version": lambda: self.save_version,
+            "connect_names": lambda: self.connect_names,
+            "received_items": lambda: self.received_items,
+            "hints_used": lambda: dict(self.hints_used),
+            "hints": lambda: dict(self.hints),
+            "location_checks": lambda: dict(self.location_checks),
+            "name_aliases": lambda: self.name_aliases,
+            "client_game_state": lambda: dict(self.client_game_state),
+            "client_activity_timers": lambda: tuple(
                 (key, value.timestamp()) for key, value in self.client_activity_timers.items()),
-            "client_connection_timers": tuple(
+            "client_connection_timers": lambda: tuple(
                 (key, value.timestamp()) for key, value in self.client_connection_timers.items()),
-            "random_state": self.random.getstate(),
-            "group_collected": dict(self.group_collected),
-            "stored_data": self.stored_data,
-            "game_options": {"hint_cost": self.hint_cost, "location_check_points": self.location_check_points,
-                             "server_password": self.server_password, "password": self.password,
-                             "release_mode": self.release_mode,
-                             "remaining_mode": self.remaining_mode, "collect_mode": self.collect_mode,
-                             "countdown_mode": self.countdown_mode,
-                             "item_cheat": self.item_cheat, "compatibility": self.compatibility}
-
+            "random_state": lambda: self.random.getstate(),
+            "group_collected": lambda: dict(self.group_collected),
+            "stored_data": lambda: self.stored_data,
+            "game_options": lambda: {"hint_cost": self.hint_cost, "location_check_points": self.location_check_points,
+                                     "server_password": self.server_password, "password": self.password,
+                                     "release_mode": self.release_mode,
+                                     "remaining_mode": self.remaining_mode, "collect_mode": self.collect_mode,
+                                     "countdown_mode": self.countdown_mode,
+                                     "item_cheat": self.item_cheat, "compatibility": self.compatibility},
         }
 
-        return d
+    def get_save(self) -> dict:
+        return {key: get_part() for key, get_part in self.get_save_parts().items()}
+
+    def journal_state(self, key: str) -> None:
+        """Reports a change of the part key of the save to the save journal, see get_save_parts."""
+        if self.save_journal:
+            self.save_journal.changed_state.add(key)
+
+    def journal_hints(self, team: int, slot: int) -> None:
+        """Reports a change of the hints of the slot to the save journal."""
+        if self.save_journal:
+            self.save_journal.changed_hints.add((team, slot))
+
+    def set_stored_data(self, key: str, value: typing.Any) -> None:
+        """Sets the data storage key, reporting it to the save journal. Data storage should only be written by this."""
+        self.stored_data[key] = value
+        if self.save_journal:
+            self.save_journal.changed_keys.add(key)
+
+    def call_in_loop(self, function: typing.Callable[[], _Return]) -> _Return:
+        """
+        Returns the result of function called in the event loop of this context, waiting for it when called from
+        another thread. Without a running loop, function is called right away.
+        """
+        loop = self.loop
+        if loop is None or not loop.is_running() or asyncio._get_running_loop() is loop:
+            return function()
+        future: concurrent.futures.Future[_Return] = concurrent.futures.Future()
+
+        def run() -> None:
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(function())
+                except BaseException as e:
+                    future.set_exception(e)
+
+        loop.call_soon_threadsafe(run)
+        while True:
+            try:
+                return future.result(1)
+            except concurrent.futures.TimeoutError:
+                # the loop stopped before getting to it, so nothing else can change the context anymore
+                if not loop.is_running() and future.cancel():
+                    return function()
 
     def set_save(self, savedata: dict):
         if self.connect_names != savedata["connect_names"]:
@@ -688,8 +953,11 @@ class Context:
         self.received_items = savedata["received_items"]
         self.hints_used.update(savedata["hints_used"])
         self.hints.update(savedata["hints"])
+        for (team, slot), hints in savedata["hints"].items():
+            self.index_hints(team, hints)
 
         self.name_aliases.update(savedata["name_aliases"])
+        self.encoded_players = None
         self.client_game_state.update(savedata["client_game_state"])
         self.client_connection_timers.update(
             {tuple(key): datetime.datetime.fromtimestamp(value, datetime.timezone.utc) for key, value
@@ -746,6 +1014,8 @@ class Context:
                 new_hints.add(new_hint)
                 if hint == new_hint:
                     continue
+                self.journal_hints(hint_team, hint_slot)
+                self.reindex_hint(hint_team, hint, new_hint)
                 for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
                     if changed is not None:
                         changed.add((hint_team,player))
@@ -753,6 +1023,33 @@ class Context:
                         self.replace_hint(hint_team, player, hint, new_hint)
             self.hints[hint_team, hint_slot] = new_hints
 
+    def recheck_location_hints(self, team: int, slot: int, locations: typing.Iterable[int],
+                               changed: typing.Optional[typing.Set[team_slot]] = None) -> None:
+        """Refreshes only the hints on these locations of the slot, for when they got checked.
+        If a set is passed for 'changed', each (team,slot) pair that has at least one hint modified will be added."""
+        for location in locations:
+            hints = self.hint_index.get((team, slot, location))
+            if not hints:
+                continue
+            for hint in list(hints):
+                new_hint = hint.re_check(self, team)
+                if hint == new_hint:
+                    continue
+                for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
+                    if changed is not None:
+                        changed.add((team, player))
+                    self.replace_hint(team, player, hint, new_hint)
+                self.reindex_hint(team, hint, new_hint)
+
+    def index_hints(self, team: int, hints: typing.Iterable[Hint]) -> None:
+        for hint in hints:
+            self.hint_index[team, hint.finding_player, hint.location].add(hint)
+
+    def reindex_hint(self, team: int, old_hint: Hint, new_hint: Hint) -> None:
+        hints = self.hint_index[team, old_hint.finding_player, old_hint.location]
+        hints.discard(old_hint)
+        hints.add(new_hint)
+
     def get_rechecked_hints(self, team: int, slot: int):
         self.recheck_hints(team, slot)
         return self.hints[team, slot]
@@ -760,9 +1057,9 @@ class Context:
     def get_sphere(self, player: int, location_id: int) -> int:
         """Get sphere of a location, -1 if spheres are not available."""
         if self.spheres:
-            for i, sphere in enumerate(self.spheres):
-                if location_id in sphere.get(player, set()):
-                    return i
+            sphere = self.sphere_index.get(player, location_id)
+            if sphere != SphereIndex.missing:
+                return sphere
             raise KeyError(f"No Sphere found for location ID {location_id} belonging to player {player}. "
                            f"Location or player may not exist.")
         return -1
@@ -770,6 +1067,43 @@ class Context:
     def get_players_package(self):
         return [NetworkPlayer(t, p, self.get_aliased_name(t, p), n) for (t, p), n in self.player_names.items()]
 
+    # Pre-encoded messages, the parts shared by many clients are encoded once and spliced into messages
+
+    def get_encoded_players(self) -> str:
+        if self.encoded_players is None:
+            self.encoded_players = self.dumper(self.get_players_package())
+        return self.encoded_players
+
+    def get_encoded_slot_info(self) -> str:
+        if self.encoded_slot_info is None:
+            self.encoded_slot_info = self.dumper(self.slot_info)
+        return self.encoded_slot_info
+
+    def get_encoded_slot_data(self, slot: int) -> str:
+        encoded = self.encoded_slot_data.get(slot)
+        if encoded is None:
+            encoded = self.encoded_slot_data[slot] = self.dumper(self.slot_data[slot])
+        return encoded
+
+    def get_encoded_game_package(self, game: str) -> str:
+        game_package = self.gamespackage[game]
+        key = game_package.get("checksum", game)
+        encoded = self.encoded_game_packages.get(key)
+        if encoded is None:
+            encoded = self.encoded_game_packages[key] = self.dumper(game_package)
+        return encoded
+
+    def encode_data_package(self, games: typing.Iterable[str]) -> str:
+        """Returns an encoded DataPackage message with the data packages of these games."""
+        return ('[{"cmd":"DataPackage","data":{"games":{' +
+                ",".join(f"{self.dumper(game)}:{self.get_encoded_game_package(game)}" for game in games) +
+                "}}}]")
+
+    def encode_spliced(self, msg: dict, **encoded_values: str) -> str:
+        """Returns msg encoded with the already encoded values added to it."""
+        encoded = self.dumper(msg)
+        return encoded[:-1] + "".join(f",{self.dumper(key)}:{value}" for key, value in encoded_values.items()) + "}"
+
     def slot_set(self, slot) -> typing.Set[int]:
         """Returns the slot IDs that concern that slot,
         as in expands groups out and returns back the input for solo."""
@@ -823,9 +1157,12 @@ class Context:
                 # we can check once if hint already exists
                 if hint not in self.hints[team, hint.finding_player]:
                     self.hints[team, hint.finding_player].add(hint)
+                    self.hint_index[team, hint.finding_player, hint.location].add(hint)
+                    self.journal_hints(team, hint.finding_player)
                     new_hint_events.add(hint.finding_player)
                     for player in self.slot_set(hint.receiving_player):
                         self.hints[team, player].add(hint)
+                        self.journal_hints(team, player)
                         new_hint_events.add(player)
 
             self.logger.info("Notice (Team #%d): %s" % (team + 1, format_hint(self, team, hint)))
@@ -841,8 +1178,8 @@ class Context:
                     async_start(self.send_msgs(client, client_hints))
 
     def get_hint(self, team: int, finding_player: int, seeked_location: int) -> typing.Optional[Hint]:
-        for hint in self.hints[team, finding_player]:
-            if hint.location == seeked_location and hint.finding_player == finding_player:
+        for hint in self.hint_index.get((team, finding_player, seeked_location), ()):
+            if hint in self.hints[team, finding_player]:
                 return hint
         return None
     
@@ -850,6 +1187,8 @@ class Context:
         if old_hint in self.hints[team, slot]:
             self.hints[team, slot].remove(old_hint)
             self.hints[team, slot].add(new_hint)
+            self.journal_hints(team, slot)
+            self.reindex_hint(team, old_hint, new_hint)
     
     # "events"
 
@@ -884,8 +1223,8 @@ class Context:
 
 
 def update_aliases(ctx: Context, team: int):
-    cmd = ctx.dumper([{"cmd": "RoomUpdate",
-                       "players": ctx.get_players_package()}])
+    ctx.encoded_players = None
+    cmd = f"[{ctx.encode_spliced({'cmd': 'RoomUpdate'}, players=ctx.get_encoded_players())}]"
 
     for clients in ctx.clients[team].values():
         for client in clients:
@@ -988,12 +1327,14 @@ async def on_client_joined(ctx: Context, client: Client):
                                   "It may stop working in the future. If you are a player, please report this to the "
                                   "client's developer.")
     ctx.client_connection_timers[client.team, client.slot] = datetime.datetime.now(datetime.timezone.utc)
+    ctx.journal_state("client_connection_timers")
 
 
 async def on_client_left(ctx: Context, client: Client):
     if len(ctx.clients[client.team][client.slot]) < 1:
         update_client_status(ctx, client, ClientStatus.CLIENT_UNKNOWN)
         ctx.client_connection_timers[client.team, client.slot] = datetime.datetime.now(datetime.timezone.utc)
+        ctx.journal_state("client_connection_timers")
 
     version_str = '.'.join(str(x) for x in client.version)
 
@@ -1072,20 +1413,34 @@ def get_start_inventory(ctx: Context, player: int, remote_start_inventory: bool)
 
 
 def send_new_items(ctx: Context):
-    for team, clients in ctx.clients.items():
-        for slot, clients in clients.items():
-            for client in clients:
-                if client.no_items:
-                    continue
-                start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
-                items = get_received_items(ctx, team, slot, client.remote_items)
-                if len(start_inventory) + len(items) > client.send_index:
-                    first_new_item = max(0, client.send_index - len(start_inventory))
-                    async_start(ctx.send_msgs(client, [{
-                        "cmd": "ReceivedItems",
-                        "index": client.send_index,
-                        "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
-                    client.send_index = len(start_inventory) + len(items)
+    """Sends the items of ctx.pending_items, once per event loop iteration to combine items of consecutive checks."""
+    if ctx.pending_items_handle:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:  # not running in the server's event loop
+        flush_new_items(ctx)
+    else:
+        ctx.pending_items_handle = loop.call_soon(flush_new_items, ctx)
+
+
+def flush_new_items(ctx: Context):
+    ctx.pending_items_handle = None
+    pending_items = ctx.pending_items
+    ctx.pending_items = set()
+    for team, slot in pending_items:
+        for client in ctx.clients.get(team, {}).get(slot, ()):
+            if client.no_items:
+                continue
+            start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
+            items = get_received_items(ctx, team, slot, client.remote_items)
+            if len(start_inventory) + len(items) > client.send_index:
+                first_new_item = max(0, client.send_index - len(start_inventory))
+                async_start(ctx.send_msgs(client, [{
+                    "cmd": "ReceivedItems",
+                    "index": client.send_index,
+                    "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
+                client.send_index = len(start_inventory) + len(items)
 
 
 def update_checked_locations(ctx: Context, team: int, slot: int):
@@ -1119,6 +1474,7 @@ def collect_player(ctx: Context, team: int, slot: int, is_group: bool = False):
             if slot in group_players:
                 group_collected_players = ctx.group_collected.setdefault(group, set())
                 group_collected_players.add(slot)
+                ctx.journal_state("group_collected")
                 if set(group_players) == group_collected_players:
                     collect_player(ctx, team, group, True)
 
@@ -1133,6 +1489,7 @@ def send_items_to(ctx: Context, team: int, target_slot: int, *items: NetworkItem
             if item.player != target_slot:
                 get_received_items(ctx, team, target, False).append(item)
             get_received_items(ctx, team, target, True).append(item)
+        ctx.pending_items.add((team, target))
 
 
 def register_location_checks(ctx: Context, team: int, slot: int, locations: typing.Iterable[int],
@@ -1143,6 +1500,7 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
     if new_locations:
         if count_activity:
             ctx.client_activity_timers[team, slot] = datetime.datetime.now(datetime.timezone.utc)
+            ctx.journal_state("client_activity_timers")
 
         sortable: list[tuple[int, int, int, int]] = []
         for location in new_locations:
@@ -1170,6 +1528,8 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
         del sortable
 
         ctx.location_checks[team, slot] |= new_locations
+        if ctx.save_journal:
+            ctx.save_journal.new_checks[team, slot] |= new_locations
         send_new_items(ctx)
         ctx.broadcast(ctx.clients[team][slot], [{
             "cmd": "RoomUpdate",
@@ -1177,7 +1537,7 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
             "checked_locations": new_locations,  # send back new checks only
         }])
         updated_slots: typing.Set[tuple[int, int]] = set()
-        ctx.recheck_hints(team, slot, updated_slots)
+        ctx.recheck_location_hints(team, slot, new_locations, updated_slots)
         for hint_team, hint_slot in updated_slots:
             ctx.on_changed_hints(hint_team, hint_slot)
         ctx.save()
@@ -1646,12 +2006,14 @@ class ClientMessageProcessor(CommonCommandProcessor):
             self.ctx.name_aliases[self.client.team, self.client.slot] = alias_name
             self.output(f"Hello, {alias_name}")
             update_aliases(self.ctx, self.client.team)
+            self.ctx.journal_state("name_aliases")
             self.ctx.save()
             return True
         elif (self.client.team, self.client.slot) in self.ctx.name_aliases:
             del (self.ctx.name_aliases[self.client.team, self.client.slot])
             self.output("Removed Alias")
             update_aliases(self.ctx, self.client.team)
+            self.ctx.journal_state("name_aliases")
             self.ctx.save()
             return True
         return False
@@ -1669,6 +2031,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
                 new_item = NetworkItem(names[item_name], -1, self.client.slot)
                 get_received_items(self.ctx, self.client.team, self.client.slot, False).append(new_item)
                 get_received_items(self.ctx, self.client.team, self.client.slot, True).append(new_item)
+                self.ctx.pending_items.add((self.client.team, self.client.slot))
                 self.ctx.broadcast_text_all(
                     'Cheat console: sending "' + item_name + '" to ' + self.ctx.get_aliased_name(self.client.team,
                                                                                                  self.client.slot),
@@ -1686,9 +2049,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
         points_available = get_client_points(self.ctx, self.client)
         cost = self.ctx.get_hint_cost(self.client.slot)
         if not input_text:
-            hints = {hint.re_check(self.ctx, self.client.team) for hint in
-                     self.ctx.hints[self.client.team, self.client.slot]}
-            self.ctx.hints[self.client.team, self.client.slot] = hints
+            hints = self.ctx.get_rechecked_hints(self.client.team, self.client.slot)
             self.ctx.notify_hints(self.client.team, list(hints), recipients=(self.client.slot,))
             self.output(f"A hint costs {self.ctx.get_hint_cost(self.client.slot)} points. "
                         f"You have {points_available} points.")
@@ -1766,6 +2127,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
                     can_pay = 1000
 
                 self.ctx.random.shuffle(not_found_hints)
+                self.ctx.journal_state("random_state")
                 # By popular vote, make hints prefer non-local placements
                 not_found_hints.sort(key=lambda hint: int(hint.receiving_player != hint.finding_player))
                 # By another popular vote, prefer early sphere
@@ -1780,6 +2142,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
                     hints.append(hint)
                     can_pay -= 1
                     self.ctx.hints_used[self.client.team, self.client.slot] += 1
+                    self.ctx.journal_state("hints_used")
 
                 self.ctx.notify_hints(self.client.team, hints)
                 if not_found_hints:
@@ -1914,13 +2277,13 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             connected_packet = {
                 "cmd": "Connected",
                 "team": client.team, "slot": client.slot,
-                "players": ctx.get_players_package(),
                 "missing_locations": get_missing_checks(ctx, team, slot),
                 "checked_locations": get_checked_checks(ctx, team, slot),
-                "slot_info": ctx.slot_info,
                 "hint_points": get_slot_points(ctx, team, slot),
             }
-            reply = [connected_packet]
+            # players, slot_info and slot_data are spliced in pre-encoded
+            shared = {"players": ctx.get_encoded_players(), "slot_info": ctx.get_encoded_slot_info()}
+            reply = []
             start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
             items = get_received_items(ctx, client.team, client.slot, client.remote_items)
             if (start_inventory or items) and not client.no_items:
@@ -1930,29 +2293,26 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                 client.auth = True
                 await on_client_joined(ctx, client)
             if args.get("slot_data", True):
-                connected_packet["slot_data"] = ctx.slot_data[client.slot]
-            await ctx.send_msgs(client, reply)
+                shared["slot_data"] = ctx.get_encoded_slot_data(client.slot)
+            encoded_reply = ctx.encode_spliced(connected_packet, **shared)
+            if reply:
+                encoded_reply += "," + ctx.dumper(reply)[1:-1]
+            await ctx.send_encoded_msgs(client, f"[{encoded_reply}]")
 
     elif cmd == "GetDataPackage":
         exclusions = args.get("exclusions", [])
         if "games" in args:
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name in set(args.get("games", []))}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": games}}])
+            requested_games = set(args.get("games", []))
+            games = [name for name in ctx.gamespackage if name in requested_games]
+            await ctx.send_encoded_msgs(client, ctx.encode_data_package(games))
         # TODO: remove exclusions behaviour around 0.5.0
         elif exclusions:
             exclusions = set(exclusions)
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name not in exclusions}
-
-            package = {"games": games}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": package}])
+            games = [name for name in ctx.gamespackage if name not in exclusions]
+            await ctx.send_encoded_msgs(client, ctx.encode_data_package(games))
 
         else:
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": ctx.gamespackage}}])
+            await ctx.send_encoded_msgs(client, ctx.encode_data_package(ctx.gamespackage))
 
     elif client.auth:
         if cmd == "ConnectUpdate":
@@ -2180,7 +2540,8 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             for operation in args["operations"]:
                 func = modify_functions[operation["operation"]]
                 value = func(value, operation["value"])
-            ctx.stored_data[args["key"]] = args["value"] = value
+            ctx.set_stored_data(args["key"], value)
+            args["value"] = value
             targets = set(ctx.stored_data_notification_clients[args["key"]])
             if args.get("want_reply", False):
                 targets.add(client)
@@ -2209,6 +2570,7 @@ def update_client_status(ctx: Context, client: Client, new_status: ClientStatus)
                 ctx.broadcast_text_all(f"Team #{client.team + 1} has completed all of their games! Congratulations!")
 
         ctx.client_game_state[client.team, client.slot] = new_status
+        ctx.journal_state("client_game_state")
         ctx.on_client_status_change(client.team, client.slot)
         ctx.save()
 
@@ -2270,12 +2632,14 @@ class ServerCommandProcessor(CommonCommandProcessor):
                         self.ctx.name_aliases[team, slot] = alias_name
                         self.output(f"Named {player_name} as {alias_name}")
                         update_aliases(self.ctx, team)
+                        self.ctx.journal_state("name_aliases")
                         self.ctx.save()
                         return True
                     else:
                         del (self.ctx.name_aliases[team, slot])
                         self.output(f"Removed Alias for {player_name}")
                         update_aliases(self.ctx, team)
+                        self.ctx.journal_state("name_aliases")
                         self.ctx.save()
                         return True
         else:
@@ -2531,6 +2895,7 @@ class ServerCommandProcessor(CommonCommandProcessor):
                 return False
 
         setattr(self.ctx, option_name, value_type(option_value))
+        self.ctx.journal_state("game_options")
         self.output(f"Set option {option_name} to {getattr(self.ctx, option_name)}")
         if option_name in {"release_mode", "remaining_mode", "collect_mode"}:
             self.ctx.broadcast_all([{"cmd": "RoomUpdate", 'permissions': get_permissions(self.ctx)}])
@@ -2583,6 +2948,8 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument('--password', default=defaults["password"])
     parser.add_argument('--savefile', default=defaults["savefile"])
     parser.add_argument('--disable_save', default=defaults["disable_save"], action='store_true')
+    parser.add_argument('--save_journal', default=defaults["save_journal"], action='store_true',
+                        help="Append changes to a journal next to the savefile instead of rewriting it each save.")
     parser.add_argument('--cert', help="Path to a SSL Certificate for encryption.")
     parser.add_argument('--cert_key', help="Path to SSL Certificate Key file")
     parser.add_argument('--loglevel', default=defaults["loglevel"],
@@ -2637,6 +3004,9 @@ def parse_args() -> argparse.Namespace:
     #0 -> recommended for tournaments to force a level playing field, only allow an exact version match
     """)
     parser.add_argument('--log_network', default=defaults["log_network"], action="store_true")
+    parser.add_argument('--broadcast_window', default=defaults["broadcast_window"], type=float,
+                        help="Milliseconds to hold text broadcasts to a team, to send those of that time as one "
+                             "message. 0 sends them right away.")
     args = parser.parse_args()
     return args
 
@@ -2684,6 +3054,7 @@ async def main(args: argparse.Namespace):
                   args.hint_cost, not args.disable_item_cheat, args.release_mode, args.collect_mode,
                   args.countdown_mode, args.remaining_mode,
                   args.auto_shutdown, args.compatibility, args.log_network)
+    ctx.broadcast_window = args.broadcast_window / 1000
     data_filename = args.multidata
 
     if not data_filename:
@@ -2713,6 +3084,8 @@ async def main(args: argparse.Namespace):
         logging.exception(f"Failed to read multiworld data ({e})")
         raise
 
+    if args.save_journal:
+        ctx.save_journal = SaveJournal()
     ctx.init_save(not args.disable_save)
 
     ssl_context = load_server_cert(args.cert, args.cert_key) if args.cert else None
@@ -1,11 +1,19 @@
 from __future__ import annotations
 
 from collections.abc import Mapping, Sequence
+import array
+import collections
+import re
 import typing
 import enum
 import warnings
 from json import JSONEncoder, JSONDecoder
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 if typing.TYPE_CHECKING:
     from websockets import WebSocketServerProtocol as ServerConnection
 
@@ -135,10 +143,51 @@ _encode = JSONEncoder(
 ).encode
 
 
-def encode(obj: typing.Any) -> str:
+def _encode_slow(obj: typing.Any) -> str:
     return _encode(_scan_for_TypedTuples(obj))
 
 
+def _orjson_default(obj: typing.Any) -> typing.Any:
+    # called for everything orjson does not write itself, mirroring _scan_for_TypedTuples
+    if isinstance(obj, tuple) and hasattr(obj, "_fields"):  # NamedTuple is not actually a parent class
+        data = obj._asdict()
+        data["class"] = obj.__class__.__name__
+        return data
+    if isinstance(obj, (tuple, list, set, frozenset)):
+        return list(obj)
+    # subclasses are passed through, so ones that override their items are read the same as by JSONEncoder
+    if isinstance(obj, dict):
+        return dict(obj.items())
+    if isinstance(obj, str):
+        return str(obj)
+    if isinstance(obj, int):
+        return int(obj)
+    raise TypeError
+
+
+if orjson:
+    _orjson_options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_SUBCLASS | orjson.OPT_PASSTHROUGH_DATACLASS | \
+                      orjson.OPT_PASSTHROUGH_DATETIME
+
+    # orjson writes NaN and Infinity as null and picks other exponent formats than repr, which JSONEncoder uses.
+    # Numbers only start the output or follow [ , or :, and float keys follow { or , in quotes, so this finds every
+    # float that may differ, plus some that don't and null from None, which are rare enough to be written by
+    # JSONEncoder as well.
+    _orjson_unlike_float = re.compile(rb'(?:^|[\[,:]|[{,]")-?(?:\d+(?:\.\d+)?e|0\.0000|null)')
+
+    def encode(obj: typing.Any) -> str:
+        try:
+            data = orjson.dumps(obj, default=_orjson_default, option=_orjson_options)
+        except (orjson.JSONEncodeError, OverflowError):
+            # integers beyond 64 bit and types neither encoder can write
+            return _encode_slow(obj)
+        if _orjson_unlike_float.search(data):
+            return _encode_slow(obj)
+        return data.decode()
+else:
+    encode = _encode_slow
+
+
 def get_any_version(data: dict) -> Version:
     data = {key.lower(): value for key, value in data.items()}  # .NET version classes have capitalized keys
     return Version(int(data["major"]), int(data["minor"]), int(data["build"]))
@@ -427,20 +476,34 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
         if len(self.get(0, {})):
             raise ValueError("Invalid player id 0 for location")
 
+        # (item, sender, location, flags) of each receiver, sorted
+        self._item_index: typing.Dict[int, typing.List[typing.Tuple[int, int, int, int]]] = {}
+        for finding_player, check_data in sorted(self.items()):
+            for location_id, (item_id, receiving_player, item_flags) in sorted(check_data.items()):
+                self._item_index.setdefault(receiving_player, []).append(
+                    (item_id, finding_player, location_id, item_flags))
+        for receiver_items in self._item_index.values():
+            receiver_items.sort()
+
     def find_item(self, slots: typing.Set[int], seeked_item_id: int
                   ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
-        for finding_player, check_data in self.items():
-            for location_id, (item_id, receiving_player, item_flags) in check_data.items():
-                if receiving_player in slots and item_id == seeked_item_id:
-                    yield finding_player, location_id, item_id, receiving_player, item_flags
+        import bisect
+        found: typing.List[typing.Tuple[int, int, int, int, int]] = []
+        for receiving_player in slots:
+            receiver_items = self._item_index.get(receiving_player, ())
+            for index in range(bisect.bisect_left(receiver_items, (seeked_item_id,)), len(receiver_items)):
+                item_id, finding_player, location_id, item_flags = receiver_items[index]
+                if item_id != seeked_item_id:
+                    break
+                found.append((finding_player, location_id, item_id, receiving_player, item_flags))
+        if len(slots) > 1:
+            found.sort()  # yield in location order, as for a single slot
+        yield from found
 
     def get_for_player(self, slot: int) -> typing.Dict[int, typing.Set[int]]:
-        import collections
         all_locations: typing.Dict[int, typing.Set[int]] = collections.defaultdict(set)
-        for source_slot, location_data in self.items():
-            for location_id, values in location_data.items():
-                if values[1] == slot:
-                    all_locations[source_slot].add(location_id)
+        for _, source_slot, location_id, _ in self._item_index.get(slot, ()):
+            all_locations[source_slot].add(location_id)
         return all_locations
 
     def get_checked(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int, slot: int
@@ -474,6 +537,67 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
                         location_id not in checked])
 
 
+class SphereIndex:
+    """
+    Sphere of each location from the spheres of a multidata, by player.
+    Spheres are stored in an array per player indexed by location id minus the player's lowest location id,
+    unless the player's location ids are too sparse for that.
+    """
+    missing = -1
+    _offsets: typing.Dict[int, int]
+    _spheres: typing.Dict[int, typing.Union[array.array, typing.Dict[int, int]]]
+
+    def __init__(self, spheres: typing.List[typing.Dict[int, typing.Set[int]]]):
+        bounds: typing.Dict[int, typing.List[int]] = {}
+        counts: typing.Dict[int, int] = collections.Counter()
+        for sphere in spheres:
+            for player, locations in sphere.items():
+                if not locations:
+                    continue
+                counts[player] += len(locations)
+                low, high = min(locations), max(locations)
+                if player in bounds:
+                    bounds[player][0] = min(bounds[player][0], low)
+                    bounds[player][1] = max(bounds[player][1], high)
+                else:
+                    bounds[player] = [low, high]
+
+        typecode = "b" if len(spheres) < 1 << 7 else "h" if len(spheres) < 1 << 15 else "i"
+        self._offsets = {}
+        self._spheres = {}
+        for player, (low, high) in bounds.items():
+            span = high - low + 1
+            if span <= 4 * counts[player] + 1024:
+                self._offsets[player] = low
+                self._spheres[player] = array.array(typecode, [self.missing]) * span
+            else:
+                self._offsets[player] = 0
+                self._spheres[player] = {}
+        for sphere_number, sphere in enumerate(spheres):
+            for player, locations in sphere.items():
+                player_spheres = self._spheres.get(player)
+                offset = self._offsets.get(player, 0)
+                for location in locations:
+                    player_spheres[location - offset] = sphere_number
+
+    def get(self, player: int, location_id: int) -> int:
+        """Returns the sphere of the location, or -1 if it is not in any sphere."""
+        player_spheres = self._spheres.get(player)
+        if player_spheres is None:
+            return self.missing
+        index = location_id - self._offsets[player]
+        if isinstance(player_spheres, dict):
+            return player_spheres.get(index, self.missing)
+        if 0 <= index < len(player_spheres):
+            return player_spheres[index]
+        return self.missing
+
+    def get_size(self) -> int:
+        from sys import getsizeof
+        return getsizeof(self._offsets) + getsizeof(self._spheres) + sum(
+            getsizeof(player_spheres) for player_spheres in self._spheres.values())
+
+
 class MinimumVersions(typing.TypedDict):
     server: tuple[int, int, int]
     clients: dict[int, tuple[int, int, int]]
@@ -524,6 +524,73 @@ class KeyedDefaultDict(collections.defaultdict):
         return value
 
 
+class LazyDict(dict):
+    """
+    dict that gets filled on demand. Looking up a missing key calls load_key with it, which may add the key.
+    Anything that needs all keys, like iterating or len, calls load_all once, after which it behaves like a regular dict.
+    """
+    _load_key: typing.Optional[typing.Callable[[typing.Any], None]]
+    _load_all: typing.Optional[typing.Callable[[], None]]
+
+    def __init__(self, seq: typing.Union[typing.Mapping, typing.Iterable] = (), *,
+                 load_key: typing.Optional[typing.Callable[[typing.Any], None]] = None,
+                 load_all: typing.Optional[typing.Callable[[], None]] = None):
+        super().__init__(seq)
+        self._load_key = load_key
+        self._load_all = load_all
+
+    def _load(self) -> None:
+        if self._load_all:
+            load_all = self._load_all
+            self._load_key = self._load_all = None
+            load_all()
+
+    def __missing__(self, key):
+        if self._load_key:
+            self._load_key(key)
+            if dict.__contains__(self, key):
+                return dict.__getitem__(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        if dict.__contains__(self, key):
+            return True
+        if self._load_key:
+            self._load_key(key)
+            return dict.__contains__(self, key)
+        return False
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __iter__(self):
+        self._load()
+        return super().__iter__()
+
+    def __len__(self) -> int:
+        self._load()
+        return super().__len__()
+
+    def keys(self):
+        self._load()
+        return super().keys()
+
+    def values(self):
+        self._load()
+        return super().values()
+
+    def items(self):
+        self._load()
+        return super().items()
+
+    def copy(self) -> dict:
+        self._load()
+        return dict(super().items())
+
+    def __reduce__(self):
+        return dict, (self.copy(),)
+
+
 def get_text_between(text: str, start: str, end: str) -> str:
     return text[text.index(start) + len(start): text.rindex(end)]
 
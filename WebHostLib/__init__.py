@@ -41,10 +41,17 @@ app.config["SELFLAUNCH"] = True  # application process is in charge of launching
 app.config["SELFLAUNCHCERT"] = None  # can point to a SSL Certificate to encrypt Room websocket connections
 app.config["SELFLAUNCHKEY"] = None  # can point to a SSL Certificate Key to encrypt Room websocket connections
 app.config["SELFGEN"] = True  # application process is in charge of scheduling Generations.
+# after what time in seconds without connected players should a room unload its game until the next connection.
+# Can be set to 0 to disable.
+app.config["ROOM_HIBERNATE_TIME"] = 900
 # at what amount of worlds should scheduling be used, instead of rolling in the web-thread
 app.config["JOB_THRESHOLD"] = 1
 # after what time in seconds should generation be aborted, freeing the queue slot. Can be set to None to disable.
 app.config["JOB_TIME"] = 600
+# generations estimated to take up to this many seconds are small, they don't have to wait for large ones to finish
+app.config["SMALL_JOB_TIME"] = 60
+# how many of the GENERATORS only take small generations, at least one is left for large ones
+app.config["SMALL_JOB_GENERATORS"] = 2
 # memory limit for generator processes in bytes
 app.config["GENERATOR_MEMORY_LIMIT"] = 4294967296
 
@@ -1,8 +1,10 @@
+import threading
+from collections import OrderedDict
 from datetime import datetime, timezone
 from typing import Any, TypedDict
 from uuid import UUID
 
-from flask import abort
+from flask import Response, abort, jsonify, request
 
 from NetUtils import ClientStatus, Hint, NetworkItem, SlotType
 from WebHostLib import cache
@@ -64,107 +66,167 @@ class PlayerGame(TypedDict):
     game: str
 
 
+# per player lists of the tracker endpoint, which delta responses only contain the changed players of
+player_keys = ("aliases", "player_items_received", "player_checks_done", "hints", "activity_timers",
+               "connection_timers", "player_status")
+
+
+class TrackerRollup:
+    """
+    Data of the tracker endpoint for one version of a room's save, built once and kept for the following requests
+    and to find the players that changed since.
+    """
+    version: int
+    data: dict[str, Any]
+    entries: dict[str, dict[tuple[int, int], dict[str, Any]]]
+    """ entry of each player in each list of player_keys """
+
+    def __init__(self, tracker_data: TrackerData, version: int):
+        self.version = version
+        all_players: dict[int, list[int]] = tracker_data.get_all_players()
+        team_players = [(team, player) for team, players in all_players.items() for player in players]
+
+        player_aliases: list[PlayerAlias] = [
+            {"team": team, "player": player, "alias": tracker_data.get_player_alias(team, player)}
+            for team, player in team_players
+        ]
+        """Slot aliases of all players."""
+
+        player_items_received: list[PlayerItemsReceived] = [
+            {"team": team, "player": player, "items": tracker_data.get_player_received_items(team, player)}
+            for team, player in team_players
+        ]
+        """Items received by each player."""
+
+        player_checks_done: list[PlayerChecksDone] = [
+            {"team": team, "player": player,
+             "locations": sorted(tracker_data.get_player_checked_locations(team, player))}
+            for team, player in team_players
+        ]
+        """ID of all locations checked by each player."""
+
+        total_checks_done: list[TeamTotalChecks] = [
+            {"team": team, "checks_done": sum(len(entry["locations"]) for entry in player_checks_done
+                                              if entry["team"] == team)}
+            for team in all_players
+        ]
+        """Total number of locations checked for the entire multiworld per team."""
+
+        hints: list[PlayerHints] = []
+        """Hints that all players have used or received."""
+        hints_by_player: dict[tuple[int, int], PlayerHints] = {}
+        for team, players in tracker_data.get_all_slots().items():
+            for player in players:
+                player_hints = sorted(tracker_data.get_player_hints(team, player))
+                hints_by_player[team, player] = {"team": team, "player": player, "hints": player_hints}
+                hints.append(hints_by_player[team, player])
+                slot_info = tracker_data.get_slot_info(player)
+                # this assumes groups are always after players
+                if slot_info.type != SlotType.group:
+                    continue
+                for member in slot_info.group_members:
+                    hints_by_player[team, member]["hints"] += player_hints
+
+        activity_times = {(team, player): datetime.fromtimestamp(timestamp, timezone.utc)
+                          for (team, player), timestamp in tracker_data._multisave.get("client_activity_timers", [])}
+        activity_timers: list[PlayerTimer] = [
+            {"team": team, "player": player, "time": activity_times.get((team, player), None)}
+            for team, player in team_players
+        ]
+        """Time of last activity per player. Returned as RFC 1123 format and null if no connection has been made."""
+
+        connection_times = {(team, player): datetime.fromtimestamp(timestamp, timezone.utc)
+                            for (team, player), timestamp
+                            in tracker_data._multisave.get("client_connection_timers", [])}
+        connection_timers: list[PlayerTimer] = [
+            {"team": team, "player": player, "time": connection_times.get((team, player), None)}
+            for team, player in team_players
+        ]
+        """Time of last connection per player. Returned as RFC 1123 format and null if no connection has been made."""
+
+        player_status: list[PlayerStatus] = [
+            {"team": team, "player": player, "status": tracker_data.get_player_client_status(team, player)}
+            for team, player in team_players
+        ]
+        """The current client status for each player."""
+
+        self.data = {
+            "aliases": player_aliases,
+            "player_items_received": player_items_received,
+            "player_checks_done": player_checks_done,
+            "total_checks_done": total_checks_done,
+            "hints": hints,
+            "activity_timers": activity_timers,
+            "connection_timers": connection_timers,
+            "player_status": player_status,
+            "version": version,
+        }
+        self.entries = {key: {(entry["team"], entry["player"]): entry for entry in self.data[key]}
+                        for key in player_keys}
+
+    def get_changed_players(self, since: "TrackerRollup") -> set[tuple[int, int]]:
+        """Returns the players with any entry that differs from the older version of the save."""
+        changed: set[tuple[int, int]] = set()
+        for key, entries in self.entries.items():
+            since_entries = since.entries[key]
+            for team_player, entry in entries.items():
+                if team_player not in changed and since_entries.get(team_player) != entry:
+                    changed.add(team_player)
+        return changed
+
+    def get_delta(self, since: "TrackerRollup") -> dict[str, Any]:
+        """Returns the data of the tracker endpoint with only the entries of players that changed since."""
+        changed = self.get_changed_players(since)
+        delta = {key: [entry for entry in self.data[key] if (entry["team"], entry["player"]) in changed]
+                 for key in player_keys}
+        return {**self.data, **delta, "since": since.version}
+
+
+_rollups: "OrderedDict[tuple[UUID, int], TrackerRollup]" = OrderedDict()
+_rollups_lock = threading.Lock()
+_rollups_size = 128
+
+
+def get_rollup(room: Room, version: int) -> TrackerRollup:
+    with _rollups_lock:
+        rollup = _rollups.get((room.id, version))
+        if rollup:
+            _rollups.move_to_end((room.id, version))
+            return rollup
+    rollup = TrackerRollup(TrackerData(room), version)
+    with _rollups_lock:
+        _rollups[room.id, version] = rollup
+        while len(_rollups) > _rollups_size:
+            _rollups.popitem(last=False)
+    return rollup
+
+
 @api_endpoints.route("/tracker/<suuid:tracker>")
-@cache.memoize(timeout=60)
-def tracker_data(tracker: UUID) -> dict[str, Any]:
+def tracker_data(tracker: UUID) -> Response:
     """
     Outputs json data to <root_path>/api/tracker/<id of current session tracker>.
 
     :param tracker: UUID of current session tracker.
 
     :return: Tracking data for all players in the room. Typing and docstrings describe the format of each value.
+        With the version of a previous response as `since` argument, only players that changed since then are included,
+        if that version is still known.
     """
     room: Room | None = Room.get(tracker=tracker)
     if not room:
         abort(404)
 
-    tracker_data = TrackerData(room)
-
-    all_players: dict[int, list[int]] = tracker_data.get_all_players()
-
-    player_aliases: list[PlayerAlias] = []
-    """Slot aliases of all players."""
-    for team, players in all_players.items():
-        for player in players:
-            player_aliases.append(
-                {"team": team, "player": player, "alias": tracker_data.get_player_alias(team, player)})
-
-    player_items_received: list[PlayerItemsReceived] = []
-    """Items received by each player."""
-    for team, players in all_players.items():
-        for player in players:
-            player_items_received.append(
-                {"team": team, "player": player, "items": tracker_data.get_player_received_items(team, player)})
-
-    player_checks_done: list[PlayerChecksDone] = []
-    """ID of all locations checked by each player."""
-    for team, players in all_players.items():
-        for player in players:
-            player_checks_done.append(
-                {"team": team, "player": player,
-                 "locations": sorted(tracker_data.get_player_checked_locations(team, player))})
-
-    total_checks_done: list[TeamTotalChecks] = [
-        {"team": team, "checks_done": checks_done}
-        for team, checks_done in tracker_data.get_team_locations_checked_count().items()
-    ]
-    """Total number of locations checked for the entire multiworld per team."""
-
-    hints: list[PlayerHints] = []
-    """Hints that all players have used or received."""
-    for team, players in tracker_data.get_all_slots().items():
-        for player in players:
-            player_hints = sorted(tracker_data.get_player_hints(team, player))
-            hints.append({"team": team, "player": player, "hints": player_hints})
-            slot_info = tracker_data.get_slot_info(player)
-            # this assumes groups are always after players
-            if slot_info.type != SlotType.group:
-                continue
-            for member in slot_info.group_members:
-                hints[member - 1]["hints"] += player_hints
-
-    activity_timers: list[PlayerTimer] = []
-    """Time of last activity per player. Returned as RFC 1123 format and null if no connection has been made."""
-    for team, players in all_players.items():
-        for player in players:
-            activity_timers.append({"team": team, "player": player, "time": None})
-
-    for (team, player), timestamp in tracker_data._multisave.get("client_activity_timers", []):
-        for entry in activity_timers:
-            if entry["team"] == team and entry["player"] == player:
-                entry["time"] = datetime.fromtimestamp(timestamp, timezone.utc)
-                break
-
-    connection_timers: list[PlayerTimer] = []
-    """Time of last connection per player. Returned as RFC 1123 format and null if no connection has been made."""
-    for team, players in all_players.items():
-        for player in players:
-            connection_timers.append({"team": team, "player": player, "time": None})
-
-    for (team, player), timestamp in tracker_data._multisave.get("client_connection_timers", []):
-        # find the matching entry
-        for entry in connection_timers:
-            if entry["team"] == team and entry["player"] == player:
-                entry["time"] = datetime.fromtimestamp(timestamp, timezone.utc)
-                break
-
-    player_status: list[PlayerStatus] = []
-    """The current client status for each player."""
-    for team, players in all_players.items():
-        for player in players:
-            player_status.append(
-                {"team": team, "player": player, "status": tracker_data.get_player_client_status(team, player)})
-
-    return {
-        "aliases": player_aliases,
-        "player_items_received": player_items_received,
-        "player_checks_done": player_checks_done,
-        "total_checks_done": total_checks_done,
-        "hints": hints,
-        "activity_timers": activity_timers,
-        "connection_timers": connection_timers,
-        "player_status": player_status,
-    }
+    rollup = get_rollup(room, room.get_save_version())
+    since = request.args.get("since", None, int)
+    with _rollups_lock:
+        since_rollup = _rollups.get((room.id, since)) if since is not None else None
+    if since_rollup:
+        response = jsonify(rollup.get_delta(since_rollup))
+        response.set_etag(f"{rollup.version}-{since}")
+    else:
+        response = jsonify(rollup.data)
+        response.set_etag(str(rollup.version))
+    return response.make_conditional(request)
 
 
 class PlayerGroups(TypedDict):
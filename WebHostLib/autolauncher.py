@@ -1,20 +1,29 @@
 from __future__ import annotations
 
+import heapq
 import json
 import logging
 import multiprocessing
+import time
+import traceback
 import typing
+from collections import Counter
 from datetime import timedelta, datetime
+from multiprocessing.connection import Connection
 from threading import Event, Thread
 from typing import Any
 from uuid import UUID
 
-from pony.orm import db_session, select, commit, PrimaryKey
+from pony.orm import db_session, select, commit, raw_sql
 
 from Utils import restricted_loads
 from .locker import Locker, AlreadyRunningException
 
 _stop_event = Event()
+_generation_queued = Event()
+
+# how often autohost looks for rooms with new activity and autogen for generations queued by another process
+POLL_INTERVAL_IN_SECONDS = 1
 
 
 def stop() -> None:
@@ -23,6 +32,12 @@ def stop() -> None:
     stop_event = _stop_event
     _stop_event = Event()  # new event for new threads
     stop_event.set()
+    _generation_queued.set()
+
+
+def notify_generation_queued() -> None:
+    """Wakes up autogen of this process to start a generation that was just committed."""
+    _generation_queued.set()
 
 
 def handle_generation_success(seed_id):
@@ -36,39 +51,247 @@ def handle_generation_failure(result: BaseException):
         logging.exception(e)
 
 
-def _mp_gen_game(
-    gen_options: dict,
-    meta: dict[str, Any] | None = None,
-    owner=None,
-    sid=None,
-    timeout: int|None = None,
-) -> PrimaryKey | None:
+class QueuedGeneration(typing.NamedTuple):
+    id: UUID
+    games: Counter[str]
+    """ slots per game """
+    spoiler: int
+    cost: float
+    """ estimated seconds """
+
+
+class GenerationResult(typing.NamedTuple):
+    generation: QueuedGeneration
+    seed_id: UUID | None
+    error: str | None
+    seconds: float | None
+    """ taken by the generation, if it finished or timed out """
+    timed_out: bool = False
+
+
+class GenerationCosts:
+    """
+    Estimates the seconds a generation takes from its slots per game, using a moving average of the seconds per slot
+    that recent generations of each game took. Spoilers with a playthrough take longer for the same slots.
+    """
+    base_seconds = 5.0
+    """ taken by every generation, like writing the output and uploading it """
+    default_seconds_per_slot = 5.0
+    """ for games without history yet """
+    min_seconds_per_slot = 0.1
+    playthrough_factor = 1.5
+    sample_weight = 0.25
+    """ of each new generation in the moving average """
+    seconds_per_slot: dict[str, float]
+
+    def __init__(self):
+        self.seconds_per_slot = {}
+
+    @db_session
+    def load(self) -> None:
+        self.seconds_per_slot = dict(select((entry.game, entry.seconds_per_slot) for entry in GenerationTime))
+
+    def _get_seconds_per_slot(self, game: str) -> float:
+        return self.seconds_per_slot.get(game, self.default_seconds_per_slot)
+
+    def _get_factor(self, spoiler: int) -> float:
+        return self.playthrough_factor if spoiler >= 2 else 1.0
+
+    def estimate(self, games: typing.Mapping[str, int], spoiler: int = 0) -> float:
+        slot_seconds = sum(count * self._get_seconds_per_slot(game) for game, count in games.items())
+        return self.base_seconds + slot_seconds * self._get_factor(spoiler)
+
+    @db_session
+    def record(self, games: typing.Mapping[str, int], spoiler: int, seconds: float) -> None:
+        """Splits the seconds a generation took between its games by their estimates and updates their averages."""
+        if not games:
+            return
+        slot_seconds = max(0.0, seconds - self.base_seconds) / self._get_factor(spoiler)
+        estimated = sum(count * self._get_seconds_per_slot(game) for game, count in games.items())
+        samples = {game: max(self.min_seconds_per_slot, slot_seconds * self._get_seconds_per_slot(game) / estimated)
+                   for game in games}
+        for game, sample in samples.items():
+            old = self.seconds_per_slot.get(game)
+            new = sample if old is None else old + (sample - old) * self.sample_weight
+            self.seconds_per_slot[game] = new
+            entry = GenerationTime.get(game=game)
+            if entry:
+                entry.seconds_per_slot = new
+            else:
+                GenerationTime(game=game, seconds_per_slot=new)
+
+
+class GenerationQueue:
+    """
+    Keeps the queued generations in the order they were first seen, with their estimated cost. Generations estimated
+    to take up to small_job_time are small and can use every generator, large ones only those not reserved for small
+    ones. Later small generations can pass a large one waiting for a generator, but not take the one it waits for.
+    """
+    queued: dict[UUID, QueuedGeneration]
+
+    def __init__(self, costs: GenerationCosts, small_job_time: float):
+        self.costs = costs
+        self.small_job_time = small_job_time
+        self.queued = {}
+
+    @db_session
+    def refresh(self) -> None:
+        """Adds newly queued generations with their estimate and forgets those no longer queued."""
+        queued_ids = set(select(generation.id for generation in Generation if generation.state == STATE_QUEUED))
+        for generation_id in self.queued.keys() - queued_ids:
+            del self.queued[generation_id]
+        for generation_id in queued_ids - self.queued.keys():
+            generation = Generation[generation_id]
+            try:
+                options = restricted_loads(generation.options)
+                meta = json.loads(generation.meta)
+                games = Counter(settings.get("game") for settings in options.values())
+                spoiler = int(meta.get("generator_options", {}).get("spoiler", 0))
+            except Exception as e:
+                generation.state = STATE_ERROR
+                commit()
+                logging.exception(e)
+            else:
+                self.queued[generation_id] = QueuedGeneration(generation_id, games, spoiler,
+                                                              self.costs.estimate(games, spoiler))
+
+    def is_small(self, generation: QueuedGeneration) -> bool:
+        return generation.cost <= self.small_job_time
+
+    def assign(self, idle_workers: typing.Iterable[GeneratorWorker]) \
+            -> list[tuple[GeneratorWorker, QueuedGeneration]]:
+        """Takes the generations to start next off the queue, with the idle worker each one should run on."""
+        small_workers: list[GeneratorWorker] = []
+        shared_workers: list[GeneratorWorker] = []
+        for worker in idle_workers:
+            (small_workers if worker.small_only else shared_workers).append(worker)
+        assigned: list[tuple[GeneratorWorker, QueuedGeneration]] = []
+        for generation in list(self.queued.values()):
+            if self.is_small(generation) and small_workers:
+                worker = small_workers.pop()
+            elif shared_workers:
+                worker = shared_workers.pop()
+            else:
+                continue
+            del self.queued[generation.id]
+            assigned.append((worker, generation))
+        return assigned
+
+
+class GeneratorWorker:
+    """
+    A generator process running one generation at a time. When a generation exceeds its timeout, the process gets
+    killed and replaced, so the worker is free for the next generation right away. Like a pool's maxtasksperchild,
+    the process also gets replaced after max_tasks generations.
+    """
+    max_tasks = 10
+    process: multiprocessing.Process | None
+    connection: Connection | None
+    generation: QueuedGeneration | None
+    """ running on this worker """
+    deadline: float | None
+
+    def __init__(self, config: dict[str, Any], small_only: bool = False):
+        self.config = config
+        self.small_only = small_only
+        self.process = None
+        self.connection = None
+        self.generation = None
+        self.deadline = None
+        self.tasks = 0
+
+    @property
+    def idle(self) -> bool:
+        return self.generation is None
+
+    def start(self) -> None:
+        self.connection, child_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=run_generator_process, args=(self.config, child_connection),
+                                               name="Generator", daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.tasks = 0
+
+    def stop(self) -> None:
+        if self.process:
+            self.process.kill()
+            self.process.join()
+            self.process = None
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+        self.generation = None
+        self.deadline = None
+
+    def restart(self) -> None:
+        self.stop()
+        self.start()
+
+    def submit(self, generation: QueuedGeneration, options: dict, meta: dict[str, Any], owner: UUID,
+               timeout: int | None) -> None:
+        assert self.connection and self.idle
+        self.connection.send((generation.id, options, meta, owner))
+        self.generation = generation
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.tasks += 1
+
+    def poll(self) -> GenerationResult | None:
+        """Returns the result of the running generation once it finished, failed or timed out."""
+        generation = self.generation
+        if generation is None:
+            return None
+        assert self.process and self.connection
+        if self.connection.poll():
+            try:
+                seed_id, error, seconds = self.connection.recv()
+            except EOFError:
+                pass  # process died, handled below
+            else:
+                self.generation = None
+                if self.tasks >= self.max_tasks:
+                    self.restart()
+                return GenerationResult(generation, seed_id, error, seconds)
+        if not self.process.is_alive():
+            error = f"Generator process exited with code {self.process.exitcode}"
+            self.restart()
+            return GenerationResult(generation, None, error, None)
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            seconds = self.config["JOB_TIME"]
+            self.restart()
+            return GenerationResult(generation, None, GENERATION_TIMEOUT_ERROR, seconds, timed_out=True)
+        return None
+
+
+def run_generator_process(config: dict[str, Any], connection: Connection) -> None:
+    """Runs the generations sent through the connection one by one, until the connection closes."""
     from setproctitle import setproctitle
 
-    setproctitle(f"Generator ({sid})")
-    try:
-        return gen_game(gen_options, meta=meta, owner=owner, sid=sid, timeout=timeout)
-    finally:
-        setproctitle(f"Generator (idle)")
+    init_generator(config)
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            return  # autogen is gone
+        sid, options, meta, owner = task
+        setproctitle(f"Generator ({sid})")
+        start = time.perf_counter()
+        try:
+            seed_id = gen_game(options, meta=meta, owner=owner, sid=sid)
+        except Exception:  # gen_game already marked the generation as failed
+            connection.send((None, traceback.format_exc(), time.perf_counter() - start))
+        else:
+            connection.send((seed_id, None, time.perf_counter() - start))
+        finally:
+            setproctitle("Generator (idle)")
 
 
-def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation, timeout: int|None) -> None:
+def launch_generator(worker: GeneratorWorker, generation: Generation, queued: QueuedGeneration,
+                     timeout: int | None) -> None:
     try:
         meta = json.loads(generation.meta)
         options = restricted_loads(generation.options)
-        logging.info(f"Generating {generation.id} for {len(options)} players")
-        pool.apply_async(
-            _mp_gen_game,
-            (options,),
-            {
-                "meta": meta,
-                "sid": generation.id,
-                "owner": generation.owner,
-                "timeout": timeout,
-            },
-            handle_generation_success,
-            handle_generation_failure,
-        )
+        logging.info(f"Generating {generation.id} for {len(options)} players, estimated to take {queued.cost:.0f}s")
+        worker.submit(queued, options, meta, generation.owner, timeout)
     except Exception as e:
         generation.state = STATE_ERROR
         commit()
@@ -77,6 +300,22 @@ def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation, ti
         generation.state = STATE_STARTED
 
 
+def handle_generation_result(costs: GenerationCosts, result: GenerationResult) -> None:
+    generation = result.generation
+    if result.seed_id:
+        handle_generation_success(result.seed_id)
+    elif result.timed_out:
+        logging.warning(f"Generation {generation.id} timed out and was stopped")
+        set_generation_error(generation.id, result.error)
+    elif result.seconds is None:
+        logging.error(f"Generation {generation.id} failed: {result.error}")
+        set_generation_error(generation.id, result.error)
+    else:  # gen_game already marked the generation as failed
+        logging.error(f"Generation {generation.id} failed:\n{result.error}")
+    if result.seed_id or result.timed_out:
+        costs.record(generation.games, generation.spoiler, result.seconds)
+
+
 def init_generator(config: dict[str, Any]) -> None:
     from setproctitle import setproctitle
 
@@ -113,6 +352,84 @@ def cleanup():
         logging.info(f"{rooms} Rooms, {seeds} Seeds and {slots} Slots have been deleted.")
 
 
+class RoomScheduler:
+    """
+    Keeps the rooms that should be hosted, those with activity within their timeout, in a heap by when they time out.
+    After the first refresh, only rooms with activity since the latest one seen are read from the database.
+    """
+    overlap = timedelta(seconds=5)
+    """ rows may be committed a bit after their last_activity, so refreshes read a bit before the latest one """
+    # PonyORM can't transpile the per-room timeout, so the database filters with SQL written for its provider.
+    # Rooms read from other providers are filtered by _add only.
+    timeout_sql = {
+        "sqlite": "julianday(room.last_activity) + (room.timeout + 5) / 86400.0 >= julianday($now)",
+        "postgres": "room.last_activity + (room.timeout + 5) * interval '1 second' >= $now",
+        "cockroach": "room.last_activity + (room.timeout + 5) * interval '1 second' >= $now",
+        "mysql": "TIMESTAMPADD(SECOND, room.timeout + 5, room.last_activity) >= $now",
+    }
+    watermark: datetime | None
+    active: dict[UUID, datetime]
+    """ time each room to host times out """
+    timeouts: list[tuple[datetime, UUID]]
+
+    def __init__(self):
+        self.watermark = None
+        self.active = {}
+        self.timeouts = []
+
+    def _add(self, room_id: UUID, last_activity: datetime, timeout: int, now: datetime) -> bool:
+        """Updates when the room times out, returns whether it just became active."""
+        times_out = last_activity + timedelta(seconds=timeout + 5)
+        if times_out < now:
+            self.active.pop(room_id, None)
+            return False
+        previous = self.active.get(room_id)
+        if previous != times_out:
+            self.active[room_id] = times_out
+            heapq.heappush(self.timeouts, (times_out, room_id))
+        return previous is None
+
+    @db_session
+    def refresh(self, now: datetime) -> list[UUID]:
+        """Reads the rooms with new activity and forgets rooms that timed out, returns the rooms that became active."""
+        since = now - timedelta(days=3) if self.watermark is None else self.watermark - self.overlap
+        timeout_sql = self.timeout_sql.get(db.provider_name, "1 = 1")
+        rooms = select((room.id, room.last_activity, room.timeout) for room in Room
+                       if room.last_activity >= since and raw_sql(timeout_sql))
+        started: list[UUID] = []
+        for room_id, last_activity, timeout in rooms:
+            if self.watermark is None or last_activity > self.watermark:
+                self.watermark = last_activity
+            if self._add(room_id, last_activity, timeout, now):
+                started.append(room_id)
+        if self.watermark is None:
+            self.watermark = since
+        while self.timeouts and self.timeouts[0][0] < now:
+            times_out, room_id = heapq.heappop(self.timeouts)
+            if self.active.get(room_id) == times_out:
+                del self.active[room_id]
+        return started
+
+    @db_session
+    def recheck(self, room_ids: typing.Collection[UUID], now: datetime) -> list[UUID]:
+        """
+        Reads the rooms again, which get their last_activity moved back when they shut down. Returns the rooms that
+        are still active, which have to be started again.
+        """
+        room_ids = list(room_ids)
+        for room_id in room_ids:
+            self.active.pop(room_id, None)
+        rooms = select((room.id, room.last_activity, room.timeout) for room in Room if room.id in room_ids)
+        return [room_id for room_id, last_activity, timeout in rooms
+                if self._add(room_id, last_activity, timeout, now)]
+
+    def get_wait_time(self, now: datetime) -> float:
+        """Returns how long until the next refresh is due."""
+        if self.timeouts:
+            return min(POLL_INTERVAL_IN_SECONDS, max(0.0, (self.timeouts[0][0] - now).total_seconds()))
+        return POLL_INTERVAL_IN_SECONDS
+
+
 def autohost(config: dict):
     def keep_running():
         stop_event = _stop_event
@@ -125,15 +442,18 @@ def autohost(config: dict):
                     hosters.append(hoster)
                     hoster.start()
 
-                while not stop_event.wait(0.1):
-                    with db_session:
-                        rooms = select(
-                            room for room in Room if
-                            room.last_activity >= datetime.utcnow() - timedelta(days=3))
-                        for room in rooms:
-                            # we have to filter twice, as the per-room timeout can't currently be PonyORM transpiled.
-                            if room.last_activity >= datetime.utcnow() - timedelta(seconds=room.timeout + 5):
-                                hosters[room.id.int % len(hosters)].start_room(room.id)
+                scheduler = RoomScheduler()
+                wait_time = 0.0
+                while not stop_event.wait(wait_time):
+                    shut_down_rooms: list[UUID] = []
+                    for hoster in hosters:
+                        shut_down_rooms += hoster.update()
+                    now = datetime.utcnow()
+                    started_rooms = scheduler.recheck(shut_down_rooms, now) if shut_down_rooms else []
+                    started_rooms += scheduler.refresh(now)
+                    for room_id in started_rooms:
+                        get_hoster(hosters, room_id).start_room(room_id)
+                    wait_time = scheduler.get_wait_time(now)
 
         except AlreadyRunningException:
             logging.info("Autohost reports as already running, not starting another.")
@@ -141,15 +461,33 @@ def autohost(config: dict):
     Thread(target=keep_running, name="AP_Autohost").start()
 
 
+def get_hoster(hosters: list[MultiworldInstance], room_id: UUID) -> MultiworldInstance:
+    """
+    Returns the hoster running the room, or else the least loaded one. Rooms get saved when they shut down, so a room
+    that starts again may move to another hoster.
+    """
+    for hoster in hosters:
+        if room_id in hoster.room_ids:
+            return hoster
+    return min(hosters, key=MultiworldInstance.get_load_score)
+
+
 def autogen(config: dict):
     def keep_running():
         stop_event = _stop_event
         try:
             with Locker("autogen"):
-
-                with multiprocessing.Pool(config["GENERATORS"], initializer=init_generator,
-                                          initargs=(config,), maxtasksperchild=10) as generator_pool:
-                    job_time = config["JOB_TIME"]
+                job_time = config["JOB_TIME"]
+                costs = GenerationCosts()
+                costs.load()
+                queue = GenerationQueue(costs, config["SMALL_JOB_TIME"])
+                # at least one generator has to take large generations
+                small_generators = max(0, min(config["SMALL_JOB_GENERATORS"], config["GENERATORS"] - 1))
+                workers = [GeneratorWorker(config, small_only=x < small_generators)
+                           for x in range(config["GENERATORS"])]
+                try:
+                    for worker in workers:
+                        worker.start()
                     with db_session:
                         to_start = select(generation for generation in Generation if generation.state == STATE_STARTED)
 
@@ -160,19 +498,31 @@ def autogen(config: dict):
                                 if sid:
                                     generation.delete()
                                 else:
-                                    launch_generator(generator_pool, generation, timeout=job_time)
+                                    generation.state = STATE_QUEUED
 
                             commit()
                         select(generation for generation in Generation if generation.state == STATE_ERROR).delete()
 
-                    while not stop_event.wait(0.1):
-                        with db_session:
-                            # for update locks the database row(s) during transaction, preventing writes from elsewhere
-                            to_start = select(
-                                generation for generation in Generation
-                                if generation.state == STATE_QUEUED).for_update()
-                            for generation in to_start:
-                                launch_generator(generator_pool, generation, timeout=job_time)
+                    while not stop_event.is_set():
+                        for worker in workers:
+                            result = worker.poll()
+                            if result:
+                                handle_generation_result(costs, result)
+                        idle_workers = [worker for worker in workers if worker.idle]
+                        if idle_workers:
+                            queue.refresh()
+                            for worker, queued in queue.assign(idle_workers):
+                                with db_session:
+                                    # for update locks the database row during transaction, preventing writes from
+                                    # elsewhere
+                                    generation = Generation.get_for_update(id=queued.id)
+                                    if generation and generation.state == STATE_QUEUED:
+                                        launch_generator(worker, generation, queued, timeout=job_time)
+                        _generation_queued.wait(POLL_INTERVAL_IN_SECONDS)
+                        _generation_queued.clear()
+                finally:
+                    for worker in workers:
+                        worker.stop()
         except AlreadyRunningException:
             logging.info("Autogen reports as already running, not starting another.")
 
@@ -187,8 +537,11 @@ class MultiworldInstance():
         self.cert = config["SELFLAUNCHCERT"]
         self.key = config["SELFLAUNCHKEY"]
         self.host = config["HOST_ADDRESS"]
+        self.hibernate_time = config["ROOM_HIBERNATE_TIME"]
         self.rooms_to_start = multiprocessing.Queue()
         self.rooms_shutting_down = multiprocessing.Queue()
+        self.load_reports = multiprocessing.Queue()
+        self.load = HosterLoad(0, 0, 0, 0)
         self.name = f"MultiHoster{id}"
 
     def start(self):
@@ -197,15 +550,32 @@ class MultiworldInstance():
 
         process = multiprocessing.Process(group=None, target=run_server_process,
                                           args=(self.name, self.ponyconfig, get_static_server_data(),
-                                                self.cert, self.key, self.host,
-                                                self.rooms_to_start, self.rooms_shutting_down),
+                                                self.cert, self.key, self.host, self.hibernate_time,
+                                                self.rooms_to_start, self.rooms_shutting_down, self.load_reports),
                                           name=self.name)
         process.start()
         self.process = process
 
-    def start_room(self, room_id):
+    def update(self) -> list[UUID]:
+        """Forgets rooms that shut down and takes the latest load report of the hoster, returns the rooms."""
+        shut_down_rooms: list[UUID] = []
         while not self.rooms_shutting_down.empty():
-            self.room_ids.remove(self.rooms_shutting_down.get(block=True, timeout=None))
+            room_id = self.rooms_shutting_down.get(block=True, timeout=None)
+            self.room_ids.remove(room_id)
+            shut_down_rooms.append(room_id)
+        while not self.load_reports.empty():
+            self.load = self.load_reports.get(block=True, timeout=None)
+        return shut_down_rooms
+
+    def get_load_score(self) -> float:
+        """
+        Weighs the rooms and connections of the hoster with its memory, 100 MiB counting like a room, and its event
+        loop lag, 10 ms counting like a room. Rooms started since the last report are counted too.
+        """
+        return (len(self.room_ids) + self.load.endpoints + self.load.memory / (100 * 1024 * 1024)
+                + self.load.lag * 100)
+
+    def start_room(self, room_id):
         if room_id in self.room_ids:
             pass  # should already be hosted currently.
         else:
@@ -225,6 +595,6 @@ class MultiworldInstance():
         self.process = None
 
 
-from .models import Room, Generation, STATE_QUEUED, STATE_STARTED, STATE_ERROR, db, Seed, Slot
-from .customserver import run_server_process, get_static_server_data
-from .generate import gen_game
+from .models import Room, Generation, GenerationTime, STATE_QUEUED, STATE_STARTED, STATE_ERROR, db, Seed, Slot
+from .customserver import HosterLoad, run_server_process, get_static_server_data
+from .generate import GENERATION_TIMEOUT_ERROR, gen_game, set_generation_error
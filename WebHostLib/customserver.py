@@ -6,26 +6,29 @@ import datetime
 import functools
 import logging
 import multiprocessing
-import pickle
+import os
 import random
 import socket
 import threading
 import time
 import typing
 import sys
+from uuid import UUID
 
 import websockets
-from pony.orm import commit, db_session, select
+from pony.orm import commit, db_session, delete, select
 
 import Utils
 
 from MultiServer import (
-    Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, load_server_cert,
-    server_per_message_deflate_factory,
+    Client, Context, SaveJournal, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor,
+    load_server_cert, server_per_message_deflate_factory, queue_gc,
 )
+from NetUtils import SphereIndex
 from Utils import restricted_loads, cache_argsless
 from .locker import Locker
-from .models import Command, GameDataPackage, Room, db
+from .models import Command, GameDataPackage, Room, RoomJournal, db
+from .staticdata import StaticNameTables
 
 
 class CustomClientMessageProcessor(ClientMessageProcessor):
@@ -37,11 +40,13 @@ class CustomClientMessageProcessor(ClientMessageProcessor):
         """
         if platform.lower().startswith("t"):  # twitch
             self.ctx.video[self.client.team, self.client.slot] = "Twitch", user
+            self.ctx.journal_state("video")
             self.ctx.save()
             self.output(f"Registered Twitch Stream https://www.twitch.tv/{user}")
             return True
         elif platform.lower().startswith("y"):  # youtube
             self.ctx.video[self.client.team, self.client.slot] = "Youtube", user
+            self.ctx.journal_state("video")
             self.ctx.save()
             self.output(f"Registered Youtube Stream for {user}")
             return True
@@ -52,6 +57,17 @@ class CustomClientMessageProcessor(ClientMessageProcessor):
 import MultiServer
 
 MultiServer.client_message_processor = CustomClientMessageProcessor
+_process_client_cmd = MultiServer.process_client_cmd
+
+
+async def process_client_cmd(ctx: Context, client: Client, args: dict):
+    # a hibernating room loads its game again before a client connects to a slot
+    if isinstance(ctx, WebHostContext) and ctx.hibernating and isinstance(args, dict) and args.get("cmd") == "Connect":
+        ctx.wake()
+    await _process_client_cmd(ctx, client, args)
+
+
+MultiServer.process_client_cmd = process_client_cmd
 del MultiServer
 
 
@@ -60,8 +76,59 @@ class DBCommandProcessor(ServerCommandProcessor):
         self.ctx.logger.info(text)
 
 
+class CommandDispatcher(threading.Thread):
+    """
+    Delivers the commands entered on the room pages to the rooms hosted by this process, with one query for all rooms
+    every interval. Commands of rooms not hosted here stay in the database.
+    """
+    interval: float = 1
+    _rooms: typing.Dict[UUID, WebHostContext]
+
+    def __init__(self):
+        super().__init__(name="CommandDispatcher", daemon=True)
+        self._rooms = {}
+        self._lock = threading.Lock()
+
+    def add_room(self, ctx: WebHostContext):
+        with self._lock:
+            self._rooms[ctx.room_id] = ctx
+
+    def remove_room(self, room_id: UUID):
+        with self._lock:
+            self._rooms.pop(room_id, None)
+
+    @db_session
+    def dispatch(self) -> int:
+        """Hands the waiting commands to the event loop of their room in order and deletes them, returns how many."""
+        with self._lock:
+            rooms = dict(self._rooms)
+        if not rooms:
+            return 0
+        room_ids = list(rooms)
+        commands = select(command for command in Command if command.room.id in room_ids).order_by(Command.id)[:]
+        for command in commands:
+            ctx = rooms[command.room.id]
+            ctx.main_loop.call_soon_threadsafe(ctx.run_db_command, command.commandtext)
+            command.delete()
+        commit()
+        return len(commands)
+
+    def run(self):
+        while 1:
+            time.sleep(self.interval)
+            try:
+                self.dispatch()
+            except Exception as e:
+                logging.exception(e)
+
+
 class WebHostContext(Context):
     room_id: int
+    static_name_tables: StaticNameTables
+    hibernate_time: float = 0
+    """ seconds without connected players before the game state is unloaded until the next Connect, 0 never """
+    hibernating: bool = False
+    hibernate_handle: typing.Optional[asyncio.TimerHandle] = None
 
     def __init__(self, static_server_data: dict, logger: logging.Logger):
         # static server data is used during _load_game_data to load required data,
@@ -74,6 +141,10 @@ class WebHostContext(Context):
         self.main_loop = asyncio.get_running_loop()
         self.video = {}
         self.tags = ["AP", "WebHost"]
+        self.save_journal = SaveJournal()
+        # held while saving and while the game state gets unloaded, so no frame gets written after hibernating
+        self.save_lock = threading.RLock()
+        self.db_command_processor = DBCommandProcessor(self)
 
     def __del__(self):
         try:
@@ -89,19 +160,35 @@ class WebHostContext(Context):
             setattr(self, key, value)
         self.non_hintable_names = collections.defaultdict(frozenset, self.non_hintable_names)
 
-    def listen_to_db_commands(self):
-        cmdprocessor = DBCommandProcessor(self)
-
-        while not self.exit_event.is_set():
-            with db_session:
-                commands = select(command for command in Command if command.room.id == self.room_id)
-                if commands:
-                    for command in commands:
-                        self.main_loop.call_soon_threadsafe(cmdprocessor, command.commandtext)
-                        command.delete()
-                    commit()
-            del commands
-            time.sleep(5)
+    def _init_game_data(self):
+        # games using the static data package get the name tables mapped by all hosters and the name sets shared by
+        # all rooms of this hoster, only custom data packages get built per room
+        static_name_tables = self.static_name_tables
+        gamespackage = self.gamespackage
+        self.gamespackage = {game_name: game_package for game_name, game_package in gamespackage.items()
+                             if not static_name_tables.matches(game_name, game_package)}
+        super()._init_game_data()
+        custom_games = [game_name for game_name in self.gamespackage if game_name != "Archipelago"]
+        self.gamespackage = gamespackage
+
+        for game_name, game_package in gamespackage.items():
+            if static_name_tables.matches(game_name, game_package):
+                self.checksums[game_name] = game_package["checksum"]
+                self.item_names[game_name] = static_name_tables.item_names[game_name]
+                self.location_names[game_name] = static_name_tables.location_names[game_name]
+                self.all_item_and_group_names[game_name] = static_name_tables.get_item_and_group_names(
+                    game_name, self.item_name_groups[game_name])
+                self.all_location_and_group_names[game_name] = static_name_tables.get_location_and_group_names(
+                    game_name, self.location_name_groups.get(game_name, []))
+        for game_name in custom_games:
+            # Archipelago items and locations may only be in the static tables
+            self.item_names[game_name].update(self.item_names["Archipelago"])
+            self.location_names[game_name].update(self.location_names["Archipelago"])
+
+    def run_db_command(self, commandtext: str):
+        """Runs a command entered on the room's page, delivered by the CommandDispatcher."""
+        self.wake()
+        self.db_command_processor(commandtext)
 
     @db_session
     def load(self, room_id: int):
@@ -153,27 +240,132 @@ class WebHostContext(Context):
     def init_save(self, enabled: bool = True):
         self.saving = enabled
         if self.saving:
-            with db_session:
-                savegame_data = Room.get(id=self.room_id).multisave
-                if savegame_data:
-                    self.set_save(restricted_loads(Room.get(id=self.room_id).multisave))
+            self._load_save()
             self._start_async_saving(atexit_save=False)
-        threading.Thread(target=self.listen_to_db_commands, daemon=True).start()
 
     @db_session
-    def _save(self, exit_save: bool = False) -> bool:
+    def _load_save(self):
         room = Room.get(id=self.room_id)
-        # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
-        room.multisave = pickle.dumps(self.get_save())
+        if room.multisave:
+            savedata = room.get_save()
+            self.set_save(savedata)
+            self.save_journal.start(self, savedata.get("journal_generation", 0), len(room.multisave),
+                                    sum(len(frame.data) for frame in room.journal))
+
+    def _take_save(self) -> typing.Optional[typing.Tuple[typing.Optional[bytes], bytes]]:
+        """
+        Returns the pickled snapshot to save if one is due and the pickled frame to save, which is empty after a
+        snapshot. None while hibernating.
+        """
+        if self.hibernating:
+            return None  # everything was saved before hibernating
+        snapshot = self.save_journal.take_snapshot(self) if self.save_journal.snapshot_due else None
+        return snapshot, self.save_journal.take_frame(self)
+
+    @db_session
+    def _save(self, exit_save: bool = False) -> bool:
+        with self.save_lock:
+            taken = self.call_in_loop(self._take_save)
+            if taken is None:
+                return True
+            snapshot, data = taken
+            room = Room.get(id=self.room_id)
+            try:
+                version = room.get_save_version() + 1
+                if snapshot is not None:
+                    room.multisave = snapshot
+                    delete(frame for frame in RoomJournal if frame.room == room)
+                    self.save_journal.snapshot_size = len(room.multisave)
+                # every write adds a frame, so its version tells trackers that the save changed, even on exit saves
+                # that leave last_activity as it was
+                frame = RoomJournal(room=room, data=SaveJournal.compress_frame(data), version=version)
+                self.save_journal.journal_size += len(frame.data)
+                commit()
+            except Exception:
+                # changes of a lost frame are only in ctx now, so they need a snapshot
+                self.save_journal.snapshot_size = 0
+                raise
         # saving only occurs on activity, so we can "abuse" this information to mark this as last_activity
         if not exit_save:  # we don't want to count a shutdown as activity, which would restart the server again
             room.last_activity = datetime.datetime.utcnow()
         return True
 
-    def get_save(self) -> dict:
-        d = super(WebHostContext, self).get_save()
-        d["video"] = [(tuple(playerslot), videodata) for playerslot, videodata in self.video.items()]
-        return d
+    async def disconnect(self, endpoint: Client):
+        await super(WebHostContext, self).disconnect(endpoint)
+        self.schedule_hibernation()
+
+    def schedule_hibernation(self):
+        """Hibernates the room after hibernate_time, if no client is connected to a slot."""
+        if self.hibernate_handle:
+            self.hibernate_handle.cancel()
+            self.hibernate_handle = None
+        if self.hibernate_time and self.saving and not self.hibernating \
+                and not any(endpoint.auth for endpoint in self.endpoints):
+            self.hibernate_handle = self.main_loop.call_later(self.hibernate_time, self.hibernate)
+
+    def hibernate(self) -> bool:
+        """
+        Saves the game, then unloads the locations, hints, items, data storage and other state loaded from multidata
+        and save, keeping the socket open. wake loads them again when a client connects.
+        """
+        self.hibernate_handle = None
+        if self.hibernating or not self.saving or self.exit_event.is_set() \
+                or any(endpoint.auth for endpoint in self.endpoints):
+            return False
+        # the saving thread holds the lock while it waits for the frame to be taken in this loop
+        if not self.save_lock.acquire(blocking=False):
+            self.hibernate_handle = self.main_loop.call_later(1, self.hibernate)
+            return False
+        try:
+            if self.save_dirty:
+                # saved as activity like by the saving thread, which trackers use to know when to read the save
+                self.save_dirty = False
+                try:
+                    self._save()
+                except Exception as e:
+                    self.save_dirty = True
+                    self.logger.exception(e)
+                    return False
+            self.hibernating = True
+            del self.locations  # only used by clients connected to a slot, which wake the room first
+            self.location_checks = collections.defaultdict(set)
+            self.received_items = {}
+            self.start_inventory = {}
+            self.hints = collections.defaultdict(set)
+            self.hint_index = collections.defaultdict(set)
+            self.stored_data = {}
+            self.read_data = {}
+            self.slot_data = {}
+            self.er_hint_data = {}
+            self.spheres = []
+            self.sphere_index = SphereIndex([])
+            self.encoded_game_packages = {}
+            self.encoded_slot_data = {}
+        finally:
+            self.save_lock.release()
+        self.logger.info("Hibernating until a client connects.")
+        queue_gc()
+        return True
+
+    def wake(self):
+        """Loads the state unloaded by hibernate again from multidata and save."""
+        if not self.hibernating:
+            return
+        # runs in the event loop like _take_save, so the saving thread cannot see a partially loaded state
+        with db_session:
+            multidata = self.decompress(Room.get(id=self.room_id).seed.multidata)
+        # data packages were kept loaded
+        multidata.pop("datapackage", None)
+        self._load(multidata, {}, False)
+        self._load_save()
+        self.hibernating = False
+        self.logger.info("Woke up from hibernation.")
+        self.schedule_hibernation()
+
+    def get_save_parts(self) -> typing.Dict[str, typing.Callable[[], typing.Any]]:
+        parts = super(WebHostContext, self).get_save_parts()
+        parts["video"] = lambda: [(tuple(playerslot), videodata) for playerslot, videodata in self.video.items()]
+        return parts
 
 
 def get_random_port():
@@ -205,12 +397,13 @@ def get_static_server_data() -> dict:
             for world_name, world in worlds.AutoWorldRegister.world_types.items()
         },
     }
+    # pickles as its file path, which every hoster maps read-only
+    data["static_name_tables"] = StaticNameTables.write(data["gamespackage"])
 
     return data
 
 
 def set_up_logging(room_id) -> logging.Logger:
-    import os
     # logger setup
     logger = logging.getLogger(f"RoomLogger {room_id}")
 
@@ -229,9 +422,32 @@ def set_up_logging(room_id) -> logging.Logger:
     return logger
 
 
+class HosterLoad(typing.NamedTuple):
+    """Load of a hoster process, reported to autohost to place new rooms on the least loaded hoster."""
+    rooms: int
+    endpoints: int
+    memory: int
+    """ resident memory in bytes, 0 if unknown """
+    lag: float
+    """ seconds the event loop was late to wake up """
+
+
+def get_memory_usage() -> int:
+    try:
+        import psutil
+    except ImportError:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, AttributeError):
+            return 0  # not linux
+    return psutil.Process().memory_info().rss
+
+
 def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                        cert_file: typing.Optional[str], cert_key_file: typing.Optional[str],
-                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue):
+                       host: str, hibernate_time: float, rooms_to_run: multiprocessing.Queue,
+                       rooms_shutting_down: multiprocessing.Queue, load_reports: multiprocessing.Queue):
     from setproctitle import setproctitle
 
     setproctitle(name)
@@ -275,6 +491,21 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     gc.collect()  # free intermediate objects used during setup
 
     loop = asyncio.get_event_loop()
+    command_dispatcher = CommandDispatcher()
+    command_dispatcher.start()
+    contexts: typing.Dict[UUID, WebHostContext] = {}
+
+    async def report_load(interval: float = 5):
+        while 1:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            lag = max(0.0, loop.time() - start - interval)
+            load_reports.put(HosterLoad(len(contexts), sum(len(ctx.endpoints) for ctx in contexts.values()),
+                                        get_memory_usage(), lag))
+
+    async def save_off_loop(ctx: WebHostContext):
+        # the saving thread may hold the save lock while it waits for this loop, so saving here would deadlock
+        await asyncio.get_running_loop().run_in_executor(None, ctx._save)
 
     async def start_room(room_id):
         with Locker(f"RoomLocker {room_id}"):
@@ -282,7 +513,10 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                 logger = set_up_logging(room_id)
                 ctx = WebHostContext(static_server_data, logger)
                 ctx.load(room_id)
+                ctx.hibernate_time = hibernate_time
                 ctx.init_save()
+                command_dispatcher.add_room(ctx)
+                contexts[room_id] = ctx
                 assert ctx.server is None
                 try:
                     ctx.server = websockets.serve(
@@ -320,12 +554,13 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                 if ctx.saving:
                     setattr(asyncio.current_task(), "save", lambda: ctx._save(True))
                 assert ctx.shutdown_task is None
+                ctx.schedule_hibernation()
                 ctx.shutdown_task = asyncio.create_task(auto_shutdown(ctx, []))
                 await ctx.shutdown_task
 
             except (KeyboardInterrupt, SystemExit):
                 if ctx.saving:
-                    ctx._save()
+                    await save_off_loop(ctx)
                     setattr(asyncio.current_task(), "save", None)
             except Exception as e:
                 with db_session:
@@ -336,10 +571,12 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                 raise
             else:
                 if ctx.saving:
-                    ctx._save()
+                    await save_off_loop(ctx)
                     setattr(asyncio.current_task(), "save", None)
             finally:
                 try:
+                    command_dispatcher.remove_room(room_id)
+                    contexts.pop(room_id, None)
                     ctx.save_dirty = False  # make sure the saving thread does not write to DB after final wakeup
                     ctx.exit_event.set()  # make sure the saving thread stops at some point
                     # NOTE: async saving should probably be an async task and could be merged with shutdown_task
@@ -378,6 +615,7 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     starter = Starter()
     starter.daemon = True
     starter.start()
+    load_reporter = loop.create_task(report_load())  # the loop only keeps a weak reference to tasks
     try:
         loop.run_forever()
     finally:
@@ -77,6 +77,21 @@ def format_exception(e: BaseException) -> str:
     return f"{e.__class__.__name__}: {e}"
 
 
+GENERATION_TIMEOUT_ERROR = "Allowed time for Generation exceeded, please consider generating locally instead."
+
+
+def set_generation_error(sid: UUID, error: str) -> None:
+    """Marks the generation as failed with the error, which its wait page shows."""
+    with db_session:
+        gen = Generation.get(id=sid)
+        if gen is not None:
+            gen.state = STATE_ERROR
+            meta = json.loads(gen.meta)
+            meta["error"] = error
+            gen.meta = json.dumps(meta)
+            commit()
+
+
 def start_generation(options: dict[str, dict | str], meta: dict[str, Any]):
     results, gen_options = roll_options(options, set(meta["plando_options"]))
 
@@ -102,6 +117,8 @@ def start_generation(options: dict[str, dict | str], meta: dict[str, Any]):
             return render_template("seedError.html", seed_error=meta["error"], details=details)
 
         commit()
+        from .autolauncher import notify_generation_queued
+        notify_generation_queued()
 
         return redirect(url_for("wait_seed", seed=gen.id))
     else:
@@ -152,6 +169,7 @@ def gen_game(gen_options: dict, meta: dict[str, Any] | None = None, owner=None,
         args.skip_output = False
         args.spoiler_only = False
         args.csv_output = False
+        args.fill_profile = False
         args.sprite = dict.fromkeys(range(1, args.multi+1), None)
         args.sprite_pool = dict.fromkeys(range(1, args.multi+1), None)
 
@@ -180,29 +198,13 @@ def gen_game(gen_options: dict, meta: dict[str, Any] | None = None, owner=None,
         return thread.result(timeout)
     except concurrent.futures.TimeoutError as e:
         if sid:
-            with db_session:
-                gen = Generation.get(id=sid)
-                if gen is not None:
-                    gen.state = STATE_ERROR
-                    meta = json.loads(gen.meta)
-                    meta["error"] = ("Allowed time for Generation exceeded, " +
-                                     "please consider generating locally instead. " +
-                                     format_exception(e))
-                    gen.meta = json.dumps(meta)
-                    commit()
+            set_generation_error(sid, f"{GENERATION_TIMEOUT_ERROR} {format_exception(e)}")
     except (KeyboardInterrupt, SystemExit):
         # don't update db, retry next time
         raise
     except BaseException as e:
         if sid:
-            with db_session:
-                gen = Generation.get(id=sid)
-                if gen is not None:
-                    gen.state = STATE_ERROR
-                    meta = json.loads(gen.meta)
-                    meta["error"] = format_exception(e)
-                    gen.meta = json.dumps(meta)
-                    commit()
+            set_generation_error(sid, format_exception(e))
         raise
     finally:
         # free resources claimed by thread pool, if possible
@@ -1,6 +1,6 @@
 from datetime import datetime
 from uuid import UUID, uuid4
-from pony.orm import Database, PrimaryKey, Required, Set, Optional, buffer, LongStr
+from pony.orm import Database, PrimaryKey, Required, Set, Optional, buffer, LongStr, select
 
 db = Database()
 
@@ -31,6 +31,29 @@ class Room(db.Entity):
     tracker = Optional(UUID, index=True)
     # Port special value -1 means the server errored out. Another attempt can be made with a page refresh
     last_port = Optional(int, default=lambda: 0)
+    journal = Set('RoomJournal')
+
+    def get_save(self) -> dict:
+        """Returns the save of this room, which is the multisave snapshot with the journal of its changes applied."""
+        from MultiServer import SaveJournal
+        from Utils import restricted_loads
+        if not self.multisave:
+            return {}
+        savedata = restricted_loads(self.multisave)
+        SaveJournal.replay(savedata, (frame.data for frame in self.journal.order_by(RoomJournal.version)))
+        return savedata
+
+    def get_save_version(self) -> int:
+        """Returns a number that increases with each write of this room's save, 0 if it was not written yet."""
+        return select(frame.version for frame in RoomJournal if frame.room == self).max() or 0
+
+
+class RoomJournal(db.Entity):
+    """Changes of a room's save since its multisave snapshot, see MultiServer.SaveJournal"""
+    id = PrimaryKey(int, auto=True)
+    room = Required(Room, index=True)
+    data = Required(buffer)
+    version = Required(int)  # save version of the room after this frame, each write of the save adds a frame
 
 
 class Seed(db.Entity):
@@ -58,6 +81,12 @@ class Generation(db.Entity):
     state = Required(int, default=0, index=True)
 
 
+class GenerationTime(db.Entity):
+    """Moving average of the seconds generating took per slot of a game, used to estimate queued generations"""
+    game = PrimaryKey(str)
+    seconds_per_slot = Required(float)
+
+
 class GameDataPackage(db.Entity):
     checksum = PrimaryKey(str)
     data = Required(bytes)
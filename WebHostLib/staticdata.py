@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import bisect
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import typing
+
+from Utils import cache_path, restricted_loads
+
+if typing.TYPE_CHECKING:
+    from NetUtils import GamesPackage
+
+_header_offset = struct.Struct("Q")
+
+
+class NameTable(typing.Mapping[int, str]):
+    """
+    Read-only id to name table of one game over a shared buffer, holding sorted ids, name offsets and utf-8 names.
+    Like the tables of MultiServer.Context, looking up an unknown id returns a placeholder name instead of raising.
+    """
+    __slots__ = ("_ids", "_offsets", "_names", "_unknown")
+
+    def __init__(self, buffer: memoryview, ids_start: int, count: int, names_start: int, unknown: str):
+        offsets_start = ids_start + count * 8
+        self._ids = buffer[ids_start:offsets_start].cast("q")
+        self._offsets = buffer[offsets_start:offsets_start + (count + 1) * 8].cast("q")
+        self._names = buffer[names_start:names_start + self._offsets[count]]
+        self._unknown = unknown
+
+    def _index(self, code: int) -> int:
+        index = bisect.bisect_left(self._ids, code)
+        if index < len(self._ids) and self._ids[index] == code:
+            return index
+        return -1
+
+    def _name(self, index: int) -> str:
+        return str(self._names[self._offsets[index]:self._offsets[index + 1]], "utf-8")
+
+    def __getitem__(self, code: int) -> str:
+        index = self._index(code) if isinstance(code, int) else -1
+        if index < 0:
+            return self._unknown.format(code)
+        return self._name(index)
+
+    def get(self, code: int, default: typing.Any = None) -> typing.Any:
+        index = self._index(code) if isinstance(code, int) else -1
+        return default if index < 0 else self._name(index)
+
+    def __contains__(self, code: object) -> bool:
+        return isinstance(code, int) and self._index(code) >= 0
+
+    def __iter__(self) -> typing.Iterator[int]:
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+class StaticNameTables:
+    """
+    id to name tables for the items and locations of every game in the static data package.
+    Written once to a file by the autolauncher and mapped read-only by each hoster when unpickled, so all hosters and
+    their rooms share one copy instead of building the tables per room.
+    """
+    path: str
+    checksums: typing.Dict[str, str]
+    item_names: typing.Dict[str, NameTable]
+    location_names: typing.Dict[str, NameTable]
+    _mmap: mmap.mmap
+    _item_and_group_names: typing.Dict[str, typing.FrozenSet[str]]
+    _location_and_group_names: typing.Dict[str, typing.FrozenSet[str]]
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        header_start, = _header_offset.unpack_from(buffer)
+        header = restricted_loads(bytes(buffer[header_start:]))
+        self.checksums = {}
+        self.item_names = {}
+        self.location_names = {}
+        for game, (checksum, items, locations) in header.items():
+            self.checksums[game] = checksum
+            self.item_names[game] = NameTable(buffer, *items, "Unknown item (ID:{})")
+            self.location_names[game] = NameTable(buffer, *locations, "Unknown location (ID:{})")
+        self._item_and_group_names = {}
+        self._location_and_group_names = {}
+
+    def __reduce__(self) -> typing.Tuple[typing.Callable[[str], StaticNameTables], typing.Tuple[str]]:
+        return StaticNameTables, (self.path,)
+
+    def matches(self, game: str, game_package: GamesPackage) -> bool:
+        """Returns if the data package of this game is the static one, so it can use the shared tables."""
+        return "checksum" in game_package and self.checksums.get(game) == game_package["checksum"]
+
+    def get_item_and_group_names(self, game: str, item_name_groups: typing.Iterable[str]) -> typing.FrozenSet[str]:
+        """Returns item and item group names of a static game, shared by all rooms of this process."""
+        names = self._item_and_group_names.get(game)
+        if names is None:
+            names = self._item_and_group_names[game] = \
+                frozenset(self.item_names[game].values()).union(item_name_groups)
+        return names
+
+    def get_location_and_group_names(self, game: str,
+                                     location_name_groups: typing.Iterable[str]) -> typing.FrozenSet[str]:
+        """Returns location and location group names of a static game, shared by all rooms of this process."""
+        names = self._location_and_group_names.get(game)
+        if names is None:
+            names = self._location_and_group_names[game] = \
+                frozenset(self.location_names[game].values()).union(location_name_groups)
+        return names
+
+    @classmethod
+    def write(cls, gamespackage: typing.Dict[str, GamesPackage]) -> StaticNameTables:
+        """
+        Writes the tables of the data package to a file in the cache folder named after its checksums, then maps it.
+        Files of other data packages get deleted, except where they are still mapped on systems that prevent that.
+        Names of the Archipelago game are included in the tables of every other game, as in MultiServer.Context.
+        """
+        archipelago = gamespackage.get("Archipelago", {})
+        digest = hashlib.sha1()
+        for game in sorted(gamespackage):
+            digest.update(f"{game}:{gamespackage[game].get('checksum')};".encode())
+        folder = cache_path("static_server_data")
+        path = os.path.join(folder, f"{digest.hexdigest()}.bin")
+        if not os.path.exists(path):
+            header: typing.Dict[str, typing.Tuple[str, typing.Tuple[int, int, int], typing.Tuple[int, int, int]]] = {}
+            data = bytearray()
+
+            def add_table(name_to_id: typing.Dict[str, int],
+                          extra: typing.Dict[str, int]) -> typing.Tuple[int, int, int]:
+                names_by_id = {code: name for name, code in extra.items()}
+                names_by_id.update((code, name) for name, code in name_to_id.items())
+                ids = sorted(names_by_id)
+                names = [names_by_id[code].encode() for code in ids]
+                offsets = [0]
+                for name in names:
+                    offsets.append(offsets[-1] + len(name))
+                # data follows the header offset, so positions are relative to the start of the file
+                start = _header_offset.size + len(data)
+                data.extend(struct.pack(f"{len(ids)}q{len(offsets)}q", *ids, *offsets))
+                names_start = _header_offset.size + len(data)
+                data.extend(b"".join(names))
+                data.extend(bytes(-len(data) % 8))  # keep the next table's ids aligned
+                return start, len(ids), names_start
+
+            for game, game_package in gamespackage.items():
+                if "checksum" not in game_package:
+                    continue
+                header[game] = (
+                    game_package["checksum"],
+                    add_table(game_package["item_name_to_id"],
+                              archipelago.get("item_name_to_id", {}) if game != "Archipelago" else {}),
+                    add_table(game_package["location_name_to_id"],
+                              archipelago.get("location_name_to_id", {}) if game != "Archipelago" else {}),
+                )
+
+            os.makedirs(folder, exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as file:
+                file.write(_header_offset.pack(_header_offset.size + len(data)))
+                file.write(data)
+                pickle.dump(header, file)
+            os.replace(temp_path, path)
+        tables = cls(path)
+        for entry in os.scandir(folder):
+            if entry.name.endswith(".bin") and entry.path != path:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass  # still mapped by a running hoster on Windows, gets deleted by a later write
+        return tables
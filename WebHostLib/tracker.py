@@ -1,5 +1,6 @@
 import datetime
 import collections
+import functools
 from dataclasses import dataclass
 from typing import Any, Callable, Dict, List, Optional, Set, Tuple, NamedTuple, Counter
 from uuid import UUID
@@ -9,10 +10,10 @@ from flask import make_response, render_template, request, Request, Response
 from werkzeug.exceptions import abort
 
 from MultiServer import Context, get_saving_second
-from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
+from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType, SphereIndex
 from Utils import restricted_loads, KeyedDefaultDict
 from . import app, cache
-from .models import GameDataPackage, Room
+from .models import GameDataPackage, Room, Seed
 
 # Multisave is currently updated, at most, every minute.
 TRACKER_CACHE_TIMEOUT_IN_SECONDS = 60
@@ -22,6 +23,45 @@ _player_trackers: Dict[str, Callable] = {}
 
 TeamPlayer = Tuple[int, int]
 ItemMetadata = Tuple[int, int, int]
+DataPackageTables = Tuple[Dict[int, str], Dict[int, str], Dict[str, int], Dict[str, int]]
+
+
+# Seeds and data packages never change and a room's save only changes along with its save version, so the parsed
+# data is shared by the TrackerData of all requests in this process. It must not be modified.
+@functools.lru_cache(maxsize=16)
+def _get_multidata(seed_id: UUID) -> Dict[str, Any]:
+    return Context.decompress(Seed[seed_id].multidata)
+
+
+@functools.lru_cache(maxsize=64)
+def _get_save(room_id: UUID, save_version: int) -> Dict[str, Any]:
+    return Room[room_id].get_save()
+
+
+class _IdToNameTable(dict):
+    """Id to name table shared between trackers, which names unknown ids without adding them to the table."""
+    unknown: str
+
+    def __init__(self, unknown: str, names: Dict[int, str]):
+        super().__init__(names)
+        self.unknown = unknown
+
+    def __missing__(self, code: int) -> str:
+        return self.unknown.format(code)
+
+
+@functools.lru_cache(maxsize=64)
+def _get_data_package_tables(checksum: str) -> DataPackageTables:
+    """Returns the id to name and name to id tables of items and locations of a data package."""
+    game_package = restricted_loads(GameDataPackage[checksum].data)
+    return (
+        _IdToNameTable("Unknown Item (ID: {})", {
+            id: name for name, id in game_package["item_name_to_id"].items()}),
+        _IdToNameTable("Unknown Location (ID: {})", {
+            id: name for name, id in game_package["location_name_to_id"].items()}),
+        game_package["item_name_to_id"],
+        game_package["location_name_to_id"],
+    )
 
 
 def _cache_results(func: Callable) -> Callable:
@@ -55,8 +95,8 @@ class TrackerData:
     def __init__(self, room: Room):
         """Initialize a new RoomMultidata object for the current room."""
         self.room = room
-        self._multidata = Context.decompress(room.seed.multidata)
-        self._multisave = restricted_loads(room.multisave) if room.multisave else {}
+        self._multidata = _get_multidata(room.seed.id)
+        self._multisave = _get_save(room.id, room.get_save_version())
         self._tracker_cache = {}
 
         self.item_name_to_id: Dict[str, Dict[str, int]] = {}
@@ -70,15 +110,9 @@ class TrackerData:
             game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Location (ID: {code})")
         })
         for game, game_package in self._multidata["datapackage"].items():
-            game_package = restricted_loads(GameDataPackage.get(checksum=game_package["checksum"]).data)
-            self.item_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
-                id: name for name, id in game_package["item_name_to_id"].items()})
-            self.location_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
-                id: name for name, id in game_package["location_name_to_id"].items()})
-
-            # Normal lookup tables as well.
-            self.item_name_to_id[game] = game_package["item_name_to_id"]
-            self.location_name_to_id[game] = game_package["location_name_to_id"]
+            (self.item_id_to_name[game], self.location_id_to_name[game],
+             self.item_name_to_id[game], self.location_name_to_id[game]) = \
+                _get_data_package_tables(game_package["checksum"])
 
     def get_seed_name(self) -> str:
         """Retrieves the seed name."""
@@ -296,6 +330,23 @@ class TrackerData:
         """ each sphere is { player: { location_id, ... } } """
         return self._multidata.get("spheres", [])
 
+    @_cache_results
+    def get_sphere_index(self) -> SphereIndex:
+        """Retrieves the sphere of each location, see get_spheres."""
+        return SphereIndex(self.get_spheres())
+
+    @_cache_results
+    def get_team_checked_locations_by_sphere(self, team: int) -> List[Dict[int, List[int]]]:
+        """Retrieves the checked locations of each player on the team, grouped by sphere."""
+        sphere_index = self.get_sphere_index()
+        spheres: List[Dict[int, List[int]]] = [{} for _ in self.get_spheres()]
+        for player in self.get_all_players()[team]:
+            for location_id in sorted(self.get_player_checked_locations(team, player)):
+                sphere = sphere_index.get(player, location_id)
+                if sphere != SphereIndex.missing:
+                    spheres[sphere].setdefault(player, []).append(location_id)
+        return spheres
+
 
 def _process_if_request_valid(incoming_request: Request, room: Optional[Room]) -> Optional[Response]:
     if not room:
@@ -1,6 +1,5 @@
 #cython: language_level=3
 #distutils: language = c
-#distutils: depends = intset.h
 
 """
 Provides faster implementation of some core parts.
@@ -13,7 +12,8 @@ import warnings
 from cpython cimport PyObject
 from typing import Any, Dict, Iterable, Iterator, Generator, Sequence, Tuple, TypeVar, Union, Set, List, TYPE_CHECKING
 from cymem.cymem cimport Pool
-from libc.stdint cimport int64_t, uint32_t
+from libc.stdint cimport int64_t, uint32_t, INT64_MIN, UINT32_MAX
+from libc.stdlib cimport qsort
 from collections import defaultdict
 
 cdef extern from *:
@@ -31,27 +31,6 @@ ctypedef int64_t ap_id_t
 cdef ap_player_t MAX_PLAYER_ID = 1000000  # limit the size of indexing array
 cdef size_t INVALID_SIZE = <size_t>(-1)  # this is all 0xff... adding 1 results in 0, but it's not negative
 
-# configure INTSET for player
-cdef extern from *:
-    """
-    #define INTSET_NAME ap_player_set
-    #define INTSET_TYPE uint32_t  // has to match ap_player_t
-    """
-
-# create INTSET for player
-cdef extern from "intset.h":
-    """
-    #undef INTSET_NAME
-    #undef INTSET_TYPE
-    """
-    ctypedef struct ap_player_set:
-        pass
-
-    ap_player_set* ap_player_set_new(size_t bucket_count) nogil
-    void ap_player_set_free(ap_player_set* set) nogil
-    bint ap_player_set_add(ap_player_set* set, ap_player_t val) nogil
-    bint ap_player_set_contains(ap_player_set* set, ap_player_t val) nogil
-
 
 cdef struct LocationEntry:
     # layout is so that
@@ -69,6 +48,23 @@ cdef struct IndexEntry:
     size_t count
 
 
+cdef struct ItemIndexEntry:
+    ap_id_t item
+    ap_player_t receiver
+    uint32_t entry  # index into entries, which are in sender, location order
+
+
+cdef int compare_item_index_entries(const void* a, const void* b) noexcept nogil:
+    # order by receiver, item, then entry
+    cdef const ItemIndexEntry* x = <const ItemIndexEntry*>a
+    cdef const ItemIndexEntry* y = <const ItemIndexEntry*>b
+    if x.receiver != y.receiver:
+        return -1 if x.receiver < y.receiver else 1
+    if x.item != y.item:
+        return -1 if x.item < y.item else 1
+    return (x.entry > y.entry) - (x.entry < y.entry)
+
+
 if TYPE_CHECKING:
     State = Dict[Tuple[int, int], Set[int]]
 else:
@@ -92,6 +88,7 @@ cdef class LocationStore:
     cdef size_t entry_count
     cdef IndexEntry* sender_index  # 16KB/1000 players
     cdef size_t sender_index_size
+    cdef ItemIndexEntry* item_index  # 1.6MB/100k items, entries sorted by receiver and item
     cdef list _keys  # ~36KB/1000 players, speed up iter (28 per int + 8 per list entry)
     cdef list _items  # ~64KB/1000 players, speed up items (56 per tuple + 8 per list entry)
     cdef list _proxies  # ~92KB/1000 players, speed up self[player] (56 per struct + 28 per len + 8 per list entry)
@@ -100,7 +97,8 @@ cdef class LocationStore:
     def get_size(self):
         from sys import getsizeof
         size = getsizeof(self) + getsizeof(self._mem) + getsizeof(self._len) \
-                + sizeof(LocationEntry) * self.entry_count + sizeof(IndexEntry) * self.sender_index_size
+                + sizeof(LocationEntry) * self.entry_count + sizeof(IndexEntry) * self.sender_index_size \
+                + sizeof(ItemIndexEntry) * self.entry_count
         size += getsizeof(self._keys) + getsizeof(self._items) + getsizeof(self._proxies)
         size += sum(sizeof(key) for key in self._keys)
         size += sum(sizeof(item) for item in self._items)
@@ -143,11 +141,14 @@ cdef class LocationStore:
 
         if not count:
             warnings.warn("Game has no locations")
+        if count > UINT32_MAX:
+            raise ValueError("Too many locations")
 
         # allocate the arrays and invalidate index (0xff...)
         if count:
             # leaving entries as NULL if there are none, makes potential memory errors more visible
             self.entries = <LocationEntry*>self._mem.alloc(count, sizeof(LocationEntry))
+            self.item_index = <ItemIndexEntry*>self._mem.alloc(count, sizeof(ItemIndexEntry))
         self.sender_index = <IndexEntry*>self._mem.alloc(max_sender + 1, sizeof(IndexEntry))
         self._raw_proxies = <PyObject**>self._mem.alloc(max_sender + 1, sizeof(PyObject*))
 
@@ -170,7 +171,12 @@ cdef class LocationStore:
                     self.entries[i].flags = data[2]  # initialized to 0 during alloc
                 # Ignoring extra data. warn?
                 self.sender_index[sender].count += 1
+                self.item_index[i].item = self.entries[i].item
+                self.item_index[i].receiver = self.entries[i].receiver
+                self.item_index[i].entry = i
                 i += 1
+        if count:
+            qsort(self.item_index, count, sizeof(ItemIndexEntry), compare_item_index_entries)
 
         # build pyobject caches
         self._proxies.append(None)  # player 0
@@ -214,48 +220,51 @@ cdef class LocationStore:
     def items(self) -> Iterable[Tuple[int, PlayerLocationProxy]]:
         return self._items
 
+    cdef size_t _find_in_item_index(self, ap_player_t receiver, ap_id_t item) noexcept nogil:
+        # binary search for the first entry of the item index that is not before receiver and item
+        cdef size_t l = 0
+        cdef size_t r = self.entry_count
+        cdef size_t m
+        cdef ItemIndexEntry* index_entry
+        while l < r:
+            m = (l + r) // 2
+            index_entry = self.item_index + m
+            if index_entry.receiver < receiver or (index_entry.receiver == receiver and index_entry.item < item):
+                l = m + 1
+            else:
+                r = m
+        return l
+
     # specialized accessors
     def find_item(self, slots: Set[int], seeked_item_id: int) -> Generator[Tuple[int, int, int, int, int], None, None]:
         cdef ap_id_t item = seeked_item_id
         cdef ap_player_t receiver
-        cdef ap_player_set* receivers
-        cdef size_t slot_count = len(slots)
-        if slot_count == 1:
-            # specialized implementation for single slot
-            receiver = list(slots)[0]
-            with nogil:
-                for entry in self.entries[:self.entry_count]:
-                    if entry.item == item and entry.receiver == receiver:
-                        with gil:
-                            yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
-        elif slot_count:
-            # generic implementation with lookup in set
-            receivers = ap_player_set_new(min(1023, slot_count))  # limit top level struct to 16KB
-            if not receivers:
-                raise MemoryError()
-            try:
-                for receiver in slots:
-                    if not ap_player_set_add(receivers, receiver):
-                        raise MemoryError()
-                with nogil:
-                    for entry in self.entries[:self.entry_count]:
-                        if entry.item == item and ap_player_set_contains(receivers, entry.receiver):
-                            with gil:
-                                yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
-            finally:
-                ap_player_set_free(receivers)
+        cdef size_t i
+        cdef LocationEntry* entry
+        found: List[int] = []
+        for receiver in slots:
+            i = self._find_in_item_index(receiver, item)
+            while i < self.entry_count and self.item_index[i].receiver == receiver and self.item_index[i].item == item:
+                found.append(self.item_index[i].entry)
+                i += 1
+        if len(slots) > 1:
+            found.sort()  # yield in location order, as for a single slot
+        for i in found:
+            entry = self.entries + i
+            yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
 
     def get_for_player(self, slot: int) -> Dict[int, Set[int]]:
         cdef ap_player_t receiver = slot
+        cdef size_t i = self._find_in_item_index(receiver, INT64_MIN)
+        cdef LocationEntry* entry
         all_locations: Dict[int, Set[int]] = {}
-        with nogil:
-            for entry in self.entries[:self.entry_count]:
-                if entry.receiver == receiver:
-                    with gil:
-                        sender: int = entry.sender
-                        if sender not in all_locations:
-                            all_locations[sender] = set()
-                        all_locations[sender].add(entry.location)
+        while i < self.entry_count and self.item_index[i].receiver == receiver:
+            entry = self.entries + self.item_index[i].entry
+            sender: int = entry.sender
+            if sender not in all_locations:
+                all_locations[sender] = set()
+            all_locations[sender].add(entry.location)
+            i += 1
         return all_locations
 
     def get_checked(self, state: State, team: int, slot: int) -> List[int]:
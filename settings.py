@@ -609,12 +609,19 @@ class ServerOptions(Group):
         OFF = 0
         ON = 1
 
+    class BroadcastWindow(int):
+        """
+        Milliseconds to hold text broadcasts to a team, to send those of that time as one message.
+        0 sends them right away.
+        """
+
     host: str | None = None
     port: int = 38281
     password: str | None = None
     multidata: str | None = None
     savefile: str | None = None
     disable_save: bool = False
+    save_journal: bool = False
     loglevel: str = "info"
     logtime: bool = False
     server_password: ServerPassword | None = None
@@ -628,6 +635,7 @@ class ServerOptions(Group):
     auto_shutdown: AutoShutdown = AutoShutdown(0)
     compatibility: Compatibility = Compatibility(2)
     log_network: LogNetwork = LogNetwork(0)
+    broadcast_window: BroadcastWindow = BroadcastWindow(0)
 
 
 class GeneratorOptions(Group):
@@ -0,0 +1,54 @@
+def run_encode_benchmark() -> None:
+    """Compare the single pass orjson encoder of NetUtils.encode against the scan and JSONEncoder one
+    on packets of the size a big room sends."""
+    import logging
+    import random
+
+    from time_it import TimeIt
+
+    from Utils import init_logging
+    from NetUtils import (encode, _encode_slow, Hint, HintStatus, NetworkItem, NetworkPlayer, NetworkSlot,
+                          SlotType)
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    rnd = random.Random(0)
+    players = 1000
+    packets = {
+        "ReceivedItems": [{"cmd": "ReceivedItems", "index": 0, "items": [
+            NetworkItem(rnd.randrange(1, 1000), rnd.randrange(1, 1000), rnd.randrange(1, players), rnd.randrange(8))
+            for _ in range(5000)]}],
+        "RoomUpdate": [{"cmd": "RoomUpdate", "players": [
+            NetworkPlayer(0, slot, f"Player{slot}", f"Player{slot}") for slot in range(1, players + 1)],
+            "checked_locations": list(range(2000))}],
+        "Connected": [{"cmd": "Connected", "team": 0, "slot": 1,
+                       "missing_locations": list(range(200)), "checked_locations": list(range(200, 400)),
+                       "slot_info": {slot: NetworkSlot(f"Player{slot}", "Game", SlotType.player)
+                                     for slot in range(1, players + 1)},
+                       "hint_points": 0, "slot_data": {"options": {str(n): n for n in range(100)}}}],
+        "Hints": [{"cmd": "Retrieved", "keys": {"_read_hints_0_1": {
+            Hint(rnd.randrange(1, players), 1, location, rnd.randrange(1000), rnd.random() < 0.5, "",
+                 0, HintStatus.HINT_PRIORITY) for location in range(500)}}}],
+        "PrintJSON": [{"cmd": "PrintJSON", "type": "ItemSend", "receiving": 2,
+                       "item": NetworkItem(1, 2, 3, 0),
+                       "data": [{"text": "Player", "type": "player_id"}, {"text": " sent "},
+                                {"text": "1", "type": "item_id", "player": 2, "flags": 1}]}] * 140,
+    }
+    iterations = 50
+
+    for name, packet in packets.items():
+        if encode(packet) != _encode_slow(packet):
+            logger.warning(f"{name} encodes differently with the new encoder.")
+        with TimeIt(f"{name} x{iterations} (scan + JSONEncoder)", logger):
+            for _ in range(iterations):
+                _encode_slow(packet)
+        with TimeIt(f"{name} x{iterations} (orjson)", logger):
+            for _ in range(iterations):
+                encode(packet)
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_encode_benchmark()
@@ -0,0 +1,79 @@
+def run_reachability_benchmark(region_count: int = 2_000, key_count: int = 200, players: int = 4) -> None:
+    """
+    Run a benchmark of region updates while collecting items one at a time, comparing a multiworld whose entrances
+    declare their item dependencies against the same multiworld without declarations.
+
+    :param region_count: Number of regions to create per player, each connected by a key-locked door.
+    :param key_count: Number of distinct key items per player; doors share keys round-robin.
+    :param players: Number of players in the multiworld.
+    """
+    import argparse
+    import logging
+    import random
+
+    from time_it import TimeIt
+
+    from Utils import init_logging
+    from BaseClasses import CollectionState, Entrance, Item, ItemClassification, MultiWorld, Region
+    from worlds.generic import GenericWorld
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    evaluations = 0
+
+    def make_rule(item_name: str, player: int):
+        def rule(state: CollectionState) -> bool:
+            nonlocal evaluations
+            evaluations += 1
+            return state.has(item_name, player)
+        return rule
+
+    def build_multiworld(declare: bool) -> MultiWorld:
+        multiworld = MultiWorld(players)
+        multiworld.game = {player: GenericWorld.game for player in multiworld.player_ids}
+        multiworld.player_name = {player: f"Tester{player}" for player in multiworld.player_ids}
+        multiworld.set_seed(0)
+        args = argparse.Namespace()
+        for name, option in GenericWorld.options_dataclass.type_hints.items():
+            setattr(args, name, {player: option.from_any(option.default) for player in multiworld.player_ids})
+        multiworld.set_options(args)
+        multiworld.regions += [Region("Menu", player, multiworld) for player in multiworld.player_ids]
+        rng = random.Random(0)
+        for player in multiworld.player_ids:
+            regions = [multiworld.get_region("Menu", player)]
+            for index in range(region_count):
+                region = Region(f"Region {index}", player, multiworld)
+                multiworld.regions.append(region)
+                parent = regions[rng.randrange(len(regions))]
+                key = f"Key {index % key_count}"
+                entrance: Entrance = parent.connect(region, f"Door {index}", make_rule(key, player))
+                if declare:
+                    multiworld.register_item_dependencies(entrance, (key,))
+                regions.append(region)
+        return multiworld
+
+    def collect_all(multiworld: MultiWorld, name: str) -> None:
+        nonlocal evaluations
+        state = CollectionState(multiworld)
+        keys = [Item(f"Key {index}", ItemClassification.progression, None, player)
+                for player in multiworld.player_ids for index in range(key_count)]
+        random.Random(1).shuffle(keys)
+        origins = [multiworld.get_region("Menu", player) for player in multiworld.player_ids]
+        evaluations = 0
+        with TimeIt(f"{name}: collecting {len(keys)} keys", logger):
+            for key in keys:
+                state.collect(key, True)
+                for origin in origins:
+                    origin.can_reach(state)
+        logger.info(f"{name}: {evaluations} entrance evaluations, "
+                    f"{evaluations / len(keys):.1f} per collect.")
+
+    collect_all(build_multiworld(False), "undeclared")
+    collect_all(build_multiworld(True), "declared")
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_reachability_benchmark()
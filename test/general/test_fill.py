@@ -5,7 +5,7 @@ from Options import Accessibility
 from test.general import generate_items, generate_locations, generate_test_multiworld
 from Fill import FillError, balance_multiworld_progression, fill_restrictive, \
     distribute_early_items, distribute_items_restrictive
-from BaseClasses import Entrance, LocationProgressType, MultiWorld, Region, Item, Location, \
+from BaseClasses import Entrance, FillProfile, LocationProgressType, MultiWorld, Region, Item, Location, \
     ItemClassification
 from worlds.generic.Rules import CollectionRule, add_item_rule, locality_rules, set_rule
 
@@ -463,6 +463,54 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertEqual(1, len(player1.prog_items))
         self.assertIsNot(loc0.item, player1.prog_items[0], "Filled item was still present in item pool")
 
+    def test_unreachable_location_checked_once_per_sweep(self):
+        """Test that items placed from the same sweep skip locations already found to be unreachable"""
+        multiworld = generate_test_multiworld(2)
+        player1 = generate_player_data(multiworld, 1, 3, 1)
+        player2 = generate_player_data(multiworld, 2, 0, 1)
+        blocked_location = player1.locations[0]
+        rule_calls = 0
+
+        def blocked_rule(state) -> bool:
+            nonlocal rule_calls
+            rule_calls += 1
+            return False
+
+        set_rule(blocked_location, blocked_rule)
+        fill_restrictive(multiworld, multiworld.state, player1.locations.copy(),
+                         player1.prog_items + player2.prog_items)
+
+        self.assertIsNone(blocked_location.item)
+        self.assertIsNotNone(player1.locations[1].item)
+        self.assertIsNotNone(player1.locations[2].item)
+        self.assertEqual(rule_calls, 1)
+
+    def test_fill_profile(self):
+        """Test that a fill profile records the fill stage and counts rule calls until the rules are restored"""
+        multiworld = generate_test_multiworld()
+        player1 = generate_player_data(multiworld, 1, 2, 2)
+        items = player1.prog_items
+        locations = player1.locations
+        rule = lambda state: state.has(items[0].name, player1.id)
+        set_rule(locations[1], rule)
+        multiworld.fill_profile = FillProfile()
+        changed_rule = lambda state: True
+        multiworld.fill_profile.count_rule_calls(multiworld)
+
+        fill_restrictive(multiworld, multiworld.state, locations.copy(), items.copy(), name="Profiled")
+
+        profile = multiworld.fill_profile
+        self.assertEqual(profile.stage_calls["fill_restrictive (Profiled)"], 1)
+        self.assertGreater(profile.sweeps, 0)
+        self.assertGreater(profile.region_updates[player1.id], 0)
+        self.assertGreater(profile.rule_calls[player1.id], 0)
+        self.assertEqual(profile.to_dict(multiworld)["players"][player1.id]["rule_calls"],
+                         profile.rule_calls[player1.id])
+        set_rule(locations[0], changed_rule)
+        profile.restore_rules()
+        self.assertIs(locations[1].access_rule, rule)
+        self.assertIs(locations[0].access_rule, changed_rule, "rule changed while profiling was reverted")
+
 
 class TestDistributeItemsRestrictive(unittest.TestCase):
     def test_basic_distribute(self):
@@ -1,8 +1,8 @@
 import unittest
 
-from BaseClasses import CollectionState
+from BaseClasses import CollectionState, Item, ItemClassification, Location, Region
 from worlds.AutoWorld import AutoWorldRegister
-from . import setup_solo_multiworld, gen_steps
+from . import generate_test_multiworld, setup_solo_multiworld, gen_steps
 
 
 class TestBase(unittest.TestCase):
@@ -79,3 +79,121 @@ class TestBase(unittest.TestCase):
                             locations.add(location)
                     self.assertGreater(len(locations), 0,
                                        msg="Need to be able to reach at least one location to get started.")
+
+
+class TestItemDependencies(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld()
+        self.menu = self.multiworld.get_region("Menu", 1)
+        self.calls = {}
+        self.entrances = {}
+        for key in ("A", "B", "C"):
+            region = Region(f"Room {key}", 1, self.multiworld)
+            self.multiworld.regions.append(region)
+            self.entrances[key] = self.menu.connect(region, f"Door {key}", self.make_rule(key))
+
+    def make_rule(self, key: str):
+        def rule(state: CollectionState) -> bool:
+            self.calls[key] = self.calls.get(key, 0) + 1
+            return state.has(f"Key {key}", 1)
+        return rule
+
+    def collect_key(self, state: CollectionState, key: str) -> None:
+        state.collect(Item(f"Key {key}", ItemClassification.progression, None, 1), True)
+
+    def test_only_dependent_entrances_rechecked(self) -> None:
+        """Ensure collecting an item only rechecks blocked entrances that declared a dependency on it."""
+        self.multiworld.register_item_dependencies(self.entrances["A"], ("Key A",))
+        self.multiworld.register_item_dependencies(self.entrances["B"], ("Key B",))
+        state = CollectionState(self.multiworld)
+        self.assertFalse(state.can_reach_region("Room A", 1))
+        self.calls.clear()
+
+        self.collect_key(state, "A")
+        self.assertTrue(state.can_reach_region("Room A", 1))
+        self.assertFalse(state.can_reach_region("Room B", 1))
+        # Door B declared its dependencies, Door C did not and falls back to being rechecked every update
+        self.assertEqual({"A": 1, "C": 1}, self.calls)
+
+        self.calls.clear()
+        copied_state = state.copy()
+        self.collect_key(copied_state, "B")
+        self.assertTrue(copied_state.can_reach_region("Room B", 1))
+        self.assertEqual({"B": 1, "C": 1}, self.calls)
+
+    def test_reachability_matches_full_update(self) -> None:
+        """Ensure declaring item dependencies does not change which regions are reachable."""
+        for entrance in self.entrances.values():
+            self.multiworld.register_item_dependencies(entrance, (f"Key {entrance.name[-1]}",))
+        state = CollectionState(self.multiworld)
+        self.assertFalse(state.can_reach_region("Room C", 1))
+        for key in ("C", "A"):
+            self.collect_key(state, key)
+            self.assertTrue(state.can_reach_region(f"Room {key}", 1))
+        self.assertFalse(state.can_reach_region("Room B", 1))
+
+        state.remove(Item("Key A", ItemClassification.progression, None, 1))
+        self.assertFalse(state.can_reach_region("Room A", 1))
+        self.assertTrue(state.can_reach_region("Room C", 1))
+
+
+class TestSpheres(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld(2)
+
+    def add_location(self, player: int, name: str, item: Item, required_item: str = "",
+                     required_player: int = 0) -> Location:
+        location = Location(player, name, 1, self.multiworld.get_region("Menu", player))
+        if required_item:
+            location.access_rule = lambda state: state.has(required_item, required_player or player)
+        location.parent_region.locations.append(location)
+        location.place_locked_item(item)
+        return location
+
+    def test_spheres_across_players(self) -> None:
+        """Ensure spheres are only built from what was reachable in the previous sphere, across players."""
+        def key(name: str, player: int) -> Item:
+            return Item(name, ItemClassification.progression, 1, player)
+
+        first = self.add_location(1, "First", key("Key A", 2))
+        second = self.add_location(2, "Second", key("Key B", 1), "Key A")
+        third = self.add_location(1, "Third", key("Key C", 2), "Key B")
+        unrelated = self.add_location(2, "Unrelated", Item("Filler", ItemClassification.filler, 1, 1))
+        unreachable = self.add_location(2, "Unreachable", key("Key D", 2), "Key D")
+
+        expected = [{first, unrelated}, {second}, {third}, set(), {unreachable}]
+        self.assertEqual(expected, list(self.multiworld.get_spheres()))
+        self.assertEqual(expected, list(self.multiworld.get_sendable_spheres()))
+
+    def test_cross_player_rules(self) -> None:
+        """Ensure locations depending on another player's items are found in the sphere they become reachable in."""
+        def key(name: str, player: int) -> Item:
+            return Item(name, ItemClassification.progression, 1, player)
+
+        def full_scan_spheres() -> list[set[Location]]:
+            # every sphere tests every location left, as spheres were built before LocationSphereIndex
+            state = CollectionState(self.multiworld)
+            locations = set(self.multiworld.get_filled_locations())
+            spheres: list[set[Location]] = []
+            while locations:
+                sphere = {location for location in locations if location.can_reach(state)}
+                spheres.append(sphere)
+                if not sphere:
+                    spheres.append(locations)
+                    break
+                for location in sphere:
+                    state.collect(location.item, True, location)
+                locations -= sphere
+            return spheres
+
+        first = self.add_location(1, "First", key("Key A", 2))
+        second = self.add_location(2, "Second", key("Key B", 2), "Key A")
+        # only player 2 changes in sphere 1, this one depends on it anyway
+        cross = self.add_location(1, "Cross", key("Key C", 1), "Key A", 2)
+        third = self.add_location(2, "Third", Item("Filler", ItemClassification.filler, 1, 2), "Key B")
+        after_cross = self.add_location(1, "After Cross", Item("Filler", ItemClassification.filler, 1, 1), "Key C")
+
+        expected = [{first}, {second, cross}, {third, after_cross}]
+        self.assertEqual(expected, full_scan_spheres())
+        self.assertEqual(expected, list(self.multiworld.get_spheres()))
+        self.assertEqual(expected, list(self.multiworld.get_sendable_spheres()))
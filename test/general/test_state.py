@@ -1,7 +1,8 @@
 import unittest
 
+from BaseClasses import CollectionState, Item, ItemClassification, Region
 from worlds.AutoWorld import AutoWorldRegister, call_all
-from . import setup_solo_multiworld
+from . import generate_test_multiworld, setup_solo_multiworld
 
 
 class TestBase(unittest.TestCase):
@@ -27,3 +28,47 @@ class TestBase(unittest.TestCase):
                     with self.subTest("Step", step=step):
                         call_all(multiworld, step)
                         self.assertTrue(multiworld.get_all_state(False, allow_partial_entrances=True))
+
+
+class TestStateCopy(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld(2)
+        for player in self.multiworld.player_ids:
+            menu = self.multiworld.get_region("Menu", player)
+            room = Region("Room", player, self.multiworld)
+            self.multiworld.regions.append(room)
+            menu.connect(room, "Door", lambda state, player=player: state.has("Key", player))
+
+    def collect_key(self, state: CollectionState, player: int) -> None:
+        state.collect(Item("Key", ItemClassification.progression, None, player), True)
+
+    def test_copies_are_independent(self) -> None:
+        """Ensure that changes to a copy, or its original, are not visible in the other state."""
+        state = CollectionState(self.multiworld)
+        self.assertFalse(state.can_reach_region("Room", 1))
+        copied_state = state.copy()
+
+        self.collect_key(copied_state, 1)
+        self.assertTrue(copied_state.can_reach_region("Room", 1))
+        self.assertFalse(state.has("Key", 1))
+        self.assertFalse(state.can_reach_region("Room", 1))
+
+        self.collect_key(state, 2)
+        self.assertTrue(state.can_reach_region("Room", 2))
+        self.assertFalse(copied_state.can_reach_region("Room", 2))
+
+        second_copy = copied_state.copy()
+        copied_state.remove(Item("Key", ItemClassification.progression, None, 1))
+        self.assertFalse(copied_state.can_reach_region("Room", 1))
+        self.assertTrue(second_copy.can_reach_region("Room", 1))
+        self.assertEqual({1: 1, 2: 0}, {player: counter["Key"] for player, counter in second_copy.prog_items.items()})
+
+    def test_copy_path(self) -> None:
+        """Ensure the region path is shared with copies until either state writes to it."""
+        state = CollectionState(self.multiworld)
+        copied_state = state.copy()
+        self.assertIs(state.path, copied_state.path)
+        self.collect_key(copied_state, 1)
+        self.assertTrue(copied_state.can_reach_region("Room", 1))
+        self.assertIn(self.multiworld.get_region("Room", 1), copied_state.path)
+        self.assertNotIn(self.multiworld.get_region("Room", 1), state.path)
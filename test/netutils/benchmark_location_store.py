@@ -0,0 +1,60 @@
+"""
+Benchmark of the item lookups of _speedups.LocationStore and NetUtils._LocationStore, as used for hints and collect.
+Run from the root folder with `python -m test.netutils.benchmark_location_store`.
+"""
+import random
+import time
+import typing
+
+RawLocations = typing.Dict[int, typing.Dict[int, typing.Tuple[int, int, int]]]
+
+
+def make_locations(players: int, locations_per_player: int, seed: int = 0) -> RawLocations:
+    rnd = random.Random(seed)
+    return {
+        sender: {
+            location: (rnd.randrange(1, locations_per_player), rnd.randrange(1, players + 1), rnd.randrange(8))
+            for location in range(1, locations_per_player + 1)
+        }
+        for sender in range(1, players + 1)
+    }
+
+
+def run_location_store_benchmark(players: int = 1000, locations_per_player: int = 100,
+                                 iterations: int = 1000) -> None:
+    from NetUtils import LocationStore, _LocationStore
+
+    locations = make_locations(players, locations_per_player)
+    stores: typing.List[typing.Type[typing.Union[LocationStore, _LocationStore]]] = [_LocationStore]
+    if LocationStore is not _LocationStore:
+        stores.insert(0, LocationStore)
+    rnd = random.Random(1)
+    queries = [(rnd.randrange(1, players + 1), rnd.randrange(1, locations_per_player)) for _ in range(iterations)]
+
+    print(f"{players} players with {locations_per_player} locations each, {iterations} lookups")
+    for store_type in stores:
+        start = time.perf_counter()
+        store = store_type(locations)
+        built = time.perf_counter()
+        for receiver, item in queries:
+            for _ in store.find_item({receiver}, item):
+                pass
+        found = time.perf_counter()
+        for receiver, item in queries:
+            for _ in store.find_item({receiver, receiver % players + 1}, item):
+                pass
+        found_group = time.perf_counter()
+        for receiver, _ in queries:
+            store.get_for_player(receiver)
+        collected = time.perf_counter()
+        size = f", {store.get_size() / 1024 / 1024:.2f}MiB" if hasattr(store, "get_size") else ""
+        print(f"{store_type.__module__}.{store_type.__name__}: "
+              f"construct {built - start:.4f}s, "
+              f"find_item {found - built:.4f}s, "
+              f"find_item for 2 slots {found_group - found:.4f}s, "
+              f"get_for_player {collected - found_group:.4f}s"
+              f"{size}")
+
+
+if __name__ == "__main__":
+    run_location_store_benchmark()
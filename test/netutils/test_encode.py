@@ -0,0 +1,29 @@
+# Tests for NetUtils.encode, which has to write the same JSON with and without orjson
+import unittest
+
+from NetUtils import ClientStatus, Hint, HintStatus, NetworkItem, NetworkPlayer, NetworkSlot, SlotType, \
+    _encode_slow, decode, encode
+from Utils import KeyedDefaultDict
+
+
+class TestEncode(unittest.TestCase):
+    def test_same_as_slow(self) -> None:
+        samples = [
+            [{"cmd": "ReceivedItems", "index": 0, "items": [NetworkItem(1, 2, 3, 4), NetworkItem(5, 6, 7, 0)]}],
+            [{"cmd": "RoomUpdate", "players": [NetworkPlayer(0, 1, "Älias", "Name")], "hint_points": 3}],
+            {"slot_info": {1: NetworkSlot("Name", "Game", SlotType.group, [2, 3])}, "status": ClientStatus.CLIENT_GOAL},
+            {"hints": {Hint(1, 2, 3, 4, True, "Entrance", 1, HintStatus.HINT_FOUND)}, "keys": frozenset({"a"})},
+            KeyedDefaultDict(lambda key: key, {"key": (1, [2, (3,)])}),
+            [None, True, False, "\x00\"\\\n", -1, 2 ** 70],
+            [float("nan"), float("inf"), -float("inf")],
+            {"floats": [0.0, -0.0, 1.5, 1e15, 1e16, -1.5e16, 1e300, 1e-4, 1e-5, -9.9e-5, 1e-7, 5e-324]},
+            1e16,
+            {1e16: 1, 1e-5: 2, float("nan"): 3},
+        ]
+        for sample in samples:
+            with self.subTest(sample=sample):
+                self.assertEqual(encode(sample), _encode_slow(sample))
+
+    def test_round_trip(self) -> None:
+        item = NetworkItem(1, 2, 3, 4)
+        self.assertEqual(decode(encode([{"cmd": "ReceivedItems", "items": [item]}]))[0]["items"], [item])
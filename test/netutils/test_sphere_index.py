@@ -0,0 +1,30 @@
+# Tests for NetUtils.SphereIndex
+import unittest
+
+from NetUtils import SphereIndex
+
+
+class TestSphereIndex(unittest.TestCase):
+    spheres = [
+        {1: {100, 101}, 2: {1 << 40}},
+        {1: {105}, 2: {1}},
+        {1: set(), 3: {7}},
+    ]
+
+    def test_get(self) -> None:
+        index = SphereIndex(self.spheres)
+        for sphere_number, sphere in enumerate(self.spheres):
+            for player, locations in sphere.items():
+                for location in locations:
+                    self.assertEqual(index.get(player, location), sphere_number)
+        for player, location in ((1, 99), (1, 102), (1, 106), (2, 2), (4, 1)):
+            self.assertEqual(index.get(player, location), SphereIndex.missing)
+
+    def test_many_spheres(self) -> None:
+        spheres = [{1: {sphere_number}} for sphere_number in range(1000)]
+        index = SphereIndex(spheres)
+        self.assertEqual(index.get(1, 999), 999)
+        self.assertEqual(index.get(1, 1000), SphereIndex.missing)
+
+    def test_empty(self) -> None:
+        self.assertEqual(SphereIndex([]).get(1, 1), SphereIndex.missing)
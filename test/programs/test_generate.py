@@ -137,3 +137,23 @@ class TestGenerateWeights(TestGenerateMain):
                     result, getattr(namespace, option_name)[player].value,
                     "Generated results from weights file did not match expected value."
                 )
+
+
+class TestGenerateBatch(unittest.TestCase):
+    """Tests Generate.py --batch generating several seeds from one manifest."""
+
+    input_dir = Path(__file__).parent / "data" / "one_player"
+
+    def test_generate_manifest(self):
+        with TemporaryDirectory(prefix="AP_out_") as output_dir:
+            manifest = Path(output_dir) / "batch.yaml"
+            manifest.write_text(f"- player_files_path: '{self.input_dir}'\n"
+                                f"  seed: 0\n"
+                                f"- player_files_path: '{self.input_dir}'\n")
+            args = Generate.mystery_argparse(["--batch", str(manifest), "--seed", "0", "--multi", "1",
+                                              "--batch_workers", "2", "--outputpath", output_dir])
+            results = Generate.generate_batch(args)
+
+            self.assertEqual([result.seed for result in results], [0, 1])
+            self.assertEqual([result.error for result in results], [None, None])
+            self.assertEqual(len(list(Path(output_dir).glob("*.zip"))), 2)
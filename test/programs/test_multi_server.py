@@ -38,3 +38,233 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class TestSendNewItems(unittest.TestCase):
+    def test_pending_slots(self) -> None:
+        """Items of consecutive sends are combined per client, and only slots that received items are flushed."""
+        import asyncio
+        from MultiServer import Client, send_items_to, send_new_items
+        from NetUtils import NetworkItem
+
+        ctx = Context("", 0, "", "", 0, 0, False)
+        sent: list[tuple[Client, list[dict]]] = []
+
+        async def send_msgs(endpoint: Client, msgs: list[dict]) -> bool:
+            sent.append((endpoint, msgs))
+            return True
+
+        ctx.send_msgs = send_msgs  # type: ignore[method-assign]
+        clients = {slot: Client(None, ctx) for slot in (1, 2)}
+        for slot, client in clients.items():
+            client.team, client.slot, client.remote_items = 0, slot, True
+        ctx.clients = {0: {slot: [client] for slot, client in clients.items()}}
+
+        async def release() -> None:
+            send_items_to(ctx, 0, 1, NetworkItem(10, 1, 2, 0))
+            send_new_items(ctx)
+            send_items_to(ctx, 0, 1, NetworkItem(11, 2, 2, 0))
+            send_new_items(ctx)
+            self.assertEqual(sent, [], "items should be sent after the current iteration of the event loop")
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+
+        asyncio.run(release())
+        self.assertEqual(len(sent), 1)
+        client, msgs = sent[0]
+        self.assertIs(client, clients[1])
+        self.assertEqual(msgs[0]["cmd"], "ReceivedItems")
+        self.assertEqual(msgs[0]["index"], 0)
+        self.assertEqual([item.item for item in msgs[0]["items"]], [10, 11])
+        self.assertEqual(clients[1].send_index, 2)
+        self.assertEqual(clients[2].send_index, 0)
+        self.assertEqual(ctx.pending_items, set())
+
+
+class TestRecheckHints(unittest.TestCase):
+    def test_location_hints(self) -> None:
+        """Checking a location updates the hints on it for every slot concerned, leaving the other hints alone."""
+        from NetUtils import Hint, HintStatus
+
+        ctx = Context("", 0, "", "", 0, 0, False)
+        hinted = Hint(1, 2, 20, 100, False)
+        other = Hint(1, 2, 21, 101, False)
+        for slot in (1, 2):
+            ctx.hints[0, slot] |= {hinted, other}
+        ctx.index_hints(0, [hinted, other])
+
+        ctx.location_checks[0, 2] = {20, 21}
+        changed: set[tuple[int, int]] = set()
+        ctx.recheck_location_hints(0, 2, [20], changed)
+
+        found = hinted._replace(found=True, status=HintStatus.HINT_FOUND)
+        self.assertEqual(changed, {(0, 1), (0, 2)})
+        for slot in (1, 2):
+            self.assertEqual({(hint.location, hint.found) for hint in ctx.hints[0, slot]}, {(20, True), (21, False)})
+        self.assertEqual(ctx.get_hint(0, 2, 20), found)
+        self.assertTrue(ctx.get_hint(0, 2, 20).found)
+        self.assertFalse(ctx.get_hint(0, 2, 21).found)
+        self.assertIsNone(ctx.get_hint(0, 1, 20))
+
+
+class TestSaveJournal(unittest.TestCase):
+    def test_snapshot_and_frames(self) -> None:
+        """A save written as snapshot and journal frames loads as the full save."""
+        import os
+        import tempfile
+        import zlib
+        from MultiServer import SaveJournal
+        from NetUtils import Hint, NetworkItem
+        from Utils import restricted_loads
+
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.connect_names = {"Player1": (0, 1)}
+        ctx.save_journal = SaveJournal()
+        with tempfile.TemporaryDirectory() as tempdir:
+            ctx.save_filename = os.path.join(tempdir, "test.apsave")
+            ctx.journal_filename = ctx.save_filename + ".journal"
+
+            def load() -> dict:
+                with open(ctx.save_filename, "rb") as f:
+                    savedata = restricted_loads(zlib.decompress(f.read()))
+                with open(ctx.journal_filename, "rb") as f:
+                    SaveJournal.replay(savedata, SaveJournal.unpack_frames(f.read()))
+                del savedata["journal_generation"]
+                return savedata
+
+            ctx.received_items[0, 1, True] = [NetworkItem(10, 1, 1, 0)]
+            ctx.location_checks[0, 1] = {1}
+            self.assertTrue(ctx._save())
+            snapshot = os.path.getsize(ctx.save_filename)
+            self.assertEqual(os.path.getsize(ctx.journal_filename), 0)
+
+            ctx.received_items[0, 1, True].append(NetworkItem(11, 2, 1, 0))
+            ctx.location_checks[0, 1] |= {2}
+            ctx.save_journal.new_checks[0, 1] |= {2}
+            ctx.hints[0, 1].add(Hint(1, 1, 3, 12, False))
+            ctx.journal_hints(0, 1)
+            ctx.set_stored_data("key", [1, 2])
+            self.assertTrue(ctx._save())
+            ctx.client_game_state[0, 1] = 30
+            ctx.journal_state("client_game_state")
+            self.assertTrue(ctx._save())
+            self.assertEqual(os.path.getsize(ctx.save_filename), snapshot, "frames should not rewrite the snapshot")
+            self.assertEqual(load(), ctx.get_save())
+
+            # incomplete last frame of an interrupted write is dropped
+            with open(ctx.journal_filename, "ab") as f:
+                f.write(SaveJournal.pack_frames(b"incomplete")[:-2])
+            self.assertEqual(load(), ctx.get_save())
+
+            # the journal outgrew the snapshot, the next save starts over
+            ctx.save_journal.journal_size = ctx.save_journal.snapshot_size
+            self.assertTrue(ctx._save())
+            self.assertEqual(os.path.getsize(ctx.journal_filename), 0)
+            self.assertEqual(load(), ctx.get_save())
+
+    def test_frame_taken_in_loop(self) -> None:
+        """Frames are taken in the event loop of the context and do not change with the context afterwards."""
+        import asyncio
+        import threading
+        from MultiServer import SaveJournal
+        from Utils import restricted_loads
+
+        async def create() -> Context:
+            return Context("", 0, "", "", 0, 0, False)
+
+        loop = asyncio.new_event_loop()
+        ctx = loop.run_until_complete(create())
+        ctx.save_journal = SaveJournal()
+        ctx.set_stored_data("key", [1])
+        thread = threading.Thread(target=loop.run_forever)
+        thread.start()
+        try:
+            frame_thread = []
+
+            def take_frame():
+                frame_thread.append(threading.current_thread())
+                return ctx.save_journal.take_frame(ctx)
+
+            frame = ctx.call_in_loop(take_frame)
+            self.assertEqual(frame_thread, [thread])
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+        ctx.stored_data["key"].append(2)
+        generation, frame_data = restricted_loads(frame)
+        self.assertEqual(frame_data["stored_data"], {"key": [1]})
+        # a stopped loop runs the function right away
+        self.assertEqual(ctx.call_in_loop(lambda: 1), 1)
+
+
+class TestEncodedMessages(unittest.TestCase):
+    def test_spliced_messages(self) -> None:
+        """Messages spliced from pre-encoded parts decode the same as encoding them whole."""
+        from MultiServer import update_aliases
+        from NetUtils import NetworkSlot, SlotType, decode, encode
+
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.player_names = {(0, 1): "Player1", (0, 2): "Player2"}
+        ctx.slot_info = {1: NetworkSlot("Player1", "Archipelago", SlotType.player),
+                         2: NetworkSlot("Player2", "Archipelago", SlotType.player)}
+        ctx.slot_data = {1: {"option": [1, 2]}, 2: {}}
+        ctx.clients = {0: {}}
+
+        games = [game for game in ctx.gamespackage][:3]
+        self.assertEqual(decode(ctx.encode_data_package(games)),
+                         decode(encode([{"cmd": "DataPackage",
+                                         "data": {"games": {game: ctx.gamespackage[game] for game in games}}}])))
+        self.assertEqual(decode(ctx.encode_data_package([])), [{"cmd": "DataPackage", "data": {"games": {}}}])
+
+        msg = {"cmd": "Connected", "team": 0, "slot": 1}
+        spliced = ctx.encode_spliced(msg, players=ctx.get_encoded_players(), slot_info=ctx.get_encoded_slot_info(),
+                                     slot_data=ctx.get_encoded_slot_data(1))
+        self.assertEqual(decode(spliced), decode(encode({**msg, "players": ctx.get_players_package(),
+                                                         "slot_info": ctx.slot_info, "slot_data": ctx.slot_data[1]})))
+
+        ctx.name_aliases[0, 2] = "Alias"
+        update_aliases(ctx, 0)
+        self.assertEqual(decode(ctx.get_encoded_players()), decode(encode(ctx.get_players_package())))
+        self.assertIn("Alias", ctx.get_encoded_players())
+
+
+class TestBroadcastWindow(unittest.TestCase):
+    def test_coalesce_text(self) -> None:
+        """Text broadcasts within the window are sent as one frame, skipping NoText clients once."""
+        import asyncio
+        from MultiServer import Client
+        from NetUtils import decode
+
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.broadcast_window = 0.01
+        sent: list[tuple[list[Client], list[dict]]] = []
+
+        async def broadcast_send_encoded_msgs(endpoints: list[Client], msg: str) -> bool:
+            sent.append((list(endpoints), decode(msg)))
+            return True
+
+        ctx.broadcast_send_encoded_msgs = broadcast_send_encoded_msgs  # type: ignore[method-assign]
+        text_client, no_text_client = Client(None, ctx), Client(None, ctx)
+        no_text_client.no_text = True
+        ctx.clients = {0: {1: [text_client], 2: [no_text_client]}}
+
+        async def burst() -> None:
+            for n in range(3):
+                ctx.broadcast_team(0, [{"cmd": "PrintJSON", "data": [{"text": str(n)}]}])
+            await asyncio.sleep(0.05)
+            self.assertEqual(len(sent), 1)
+            ctx.broadcast_team(0, [{"cmd": "PrintJSON", "data": [{"text": "3"}]}])
+            ctx.broadcast_team(0, [{"cmd": "RoomUpdate", "hint_points": 1}])
+            await asyncio.sleep(0.05)
+
+        asyncio.run(burst())
+        self.assertEqual([endpoints for endpoints, _ in sent],
+                         [[text_client], [text_client], [text_client, no_text_client]])
+        self.assertEqual([[msg["data"][0]["text"] for msg in msgs] for _, msgs in sent[:2]], [["0", "1", "2"], ["3"]])
+        self.assertEqual(sent[2][1][0]["cmd"], "RoomUpdate")
+        self.assertEqual(ctx.coalesced_frames_saved, 2)
+        coalesced = [{"cmd": "PrintJSON", "data": [{"text": str(n)}]} for n in range(3)]
+        self.assertEqual(ctx.coalesced_bytes_saved,
+                         sum(len(ctx.dumper([msg])) for msg in coalesced) - len(ctx.dumper(coalesced)))
+        self.assertEqual(ctx.pending_broadcasts, {})
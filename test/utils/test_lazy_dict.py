@@ -0,0 +1,48 @@
+# Tests for LazyDict in Utils.py
+
+import pickle
+import unittest
+from typing import List
+
+from Utils import LazyDict
+
+
+class TestLazyDict(unittest.TestCase):
+    def setUp(self) -> None:
+        self.loaded_keys: List[str] = []
+        self.loaded_all = 0
+
+        def load_key(key: str) -> None:
+            self.loaded_keys.append(key)
+            if key.startswith("known"):
+                self.lazy[key] = key.upper()
+
+        def load_all() -> None:
+            self.loaded_all += 1
+            for key in ("known 1", "known 2"):
+                self.lazy.setdefault(key, key.upper())
+
+        self.lazy = LazyDict({"eager": "EAGER"}, load_key=load_key, load_all=load_all)
+
+    def test_lookup_loads_key(self) -> None:
+        self.assertEqual(self.lazy["eager"], "EAGER")
+        self.assertEqual(self.loaded_keys, [])
+        self.assertEqual(self.lazy["known 1"], "KNOWN 1")
+        self.assertIn("known 2", self.lazy)
+        self.assertEqual(self.lazy.get("unknown", "default"), "default")
+        with self.assertRaises(KeyError):
+            self.lazy["unknown"]
+        self.assertEqual(self.loaded_keys, ["known 1", "known 2", "unknown", "unknown"])
+        self.assertEqual(self.loaded_all, 0)
+
+    def test_iteration_loads_all(self) -> None:
+        self.assertEqual(len(self.lazy), 3)
+        self.assertEqual(sorted(self.lazy), ["eager", "known 1", "known 2"])
+        self.assertEqual(self.loaded_all, 1)
+        self.assertNotIn("known 3", self.lazy)
+        self.assertEqual(self.loaded_keys, [])
+
+    def test_pickle_as_dict(self) -> None:
+        unpickled = pickle.loads(pickle.dumps(self.lazy))
+        self.assertIs(type(unpickled), dict)
+        self.assertEqual(unpickled, {"eager": "EAGER", "known 1": "KNOWN 1", "known 2": "KNOWN 2"})
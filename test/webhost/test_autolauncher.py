@@ -0,0 +1,207 @@
+import json
+import unittest
+from datetime import datetime, timedelta
+from uuid import UUID, uuid4
+
+from . import TestBase
+
+
+class TestRoomPlacement(unittest.TestCase):
+    def setUp(self) -> None:
+        from WebHostLib.autolauncher import MultiworldInstance
+
+        config = {"PONY": {}, "SELFLAUNCHCERT": None, "SELFLAUNCHKEY": None, "HOST_ADDRESS": "",
+                  "ROOM_HIBERNATE_TIME": 0}
+        self.hosters = [MultiworldInstance(config, n) for n in range(3)]
+
+    def test_least_loaded(self) -> None:
+        """New rooms go to the hoster with the lowest load, running rooms stay on their hoster."""
+        from WebHostLib.autolauncher import get_hoster
+        from WebHostLib.customserver import HosterLoad
+
+        self.hosters[0].load = HosterLoad(1, 20, 0, 0)
+        self.hosters[1].load = HosterLoad(0, 0, 0, 0.5)
+        self.hosters[2].room_ids.add(uuid4())
+        new_room = uuid4()
+        self.assertIs(get_hoster(self.hosters, new_room), self.hosters[2])
+        self.hosters[2].room_ids.add(new_room)
+        self.hosters[2].load = HosterLoad(2, 100, 0, 0)
+        self.assertIs(get_hoster(self.hosters, new_room), self.hosters[2])
+        self.assertIs(get_hoster(self.hosters, uuid4()), self.hosters[0])
+
+    def test_load_report(self) -> None:
+        """The latest load report and shut down rooms get picked up."""
+        import time
+        from WebHostLib.customserver import HosterLoad
+
+        hoster = self.hosters[0]
+        room_id = uuid4()
+        hoster.room_ids.add(room_id)
+        hoster.rooms_shutting_down.put(room_id)
+        hoster.load_reports.put(HosterLoad(1, 1, 0, 0))
+        hoster.load_reports.put(HosterLoad(1, 2, 0, 0))
+        time.sleep(0.1)  # queues are filled by a thread
+        hoster.update()
+        self.assertEqual(hoster.room_ids, set())
+        self.assertEqual(hoster.load, HosterLoad(1, 2, 0, 0))
+
+
+class TestRoomScheduler(TestBase):
+    def setUp(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Room, Seed
+
+        super().setUp()
+        self.now = datetime.utcnow()
+        with db_session:
+            owner = uuid4()
+            seed = Seed(multidata=b"", owner=owner)
+            self.seed_id = seed.id
+            self.active_room = Room(seed=seed, owner=owner, last_activity=self.now - timedelta(minutes=10),
+                                    timeout=3600).id
+            self.timed_out_room = Room(seed=seed, owner=owner, last_activity=self.now - timedelta(hours=2),
+                                       timeout=3600).id
+
+    def tearDown(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Seed
+
+        with db_session:
+            seed = Seed.get(id=self.seed_id)
+            for room in seed.rooms:
+                room.delete()
+            seed.delete()
+
+    def test_refresh(self) -> None:
+        """Only rooms within their timeout are active, rooms are read again once they have new activity."""
+        from pony.orm import db_session
+        from WebHostLib.autolauncher import RoomScheduler
+        from WebHostLib.models import Room
+
+        scheduler = RoomScheduler()
+        self.assertEqual(scheduler.refresh(self.now), [self.active_room])
+        self.assertIn(self.active_room, scheduler.active)
+        self.assertNotIn(self.timed_out_room, scheduler.active)
+        self.assertEqual(scheduler.active[self.active_room], self.now + timedelta(minutes=50, seconds=5))
+
+        with db_session:
+            Room.get(id=self.timed_out_room).last_activity = self.now
+            Room.get(id=self.active_room).last_activity = self.now - timedelta(minutes=9)
+        self.assertEqual(scheduler.refresh(self.now), [self.timed_out_room], "active rooms are started once")
+        self.assertIn(self.timed_out_room, scheduler.active)
+
+        scheduler.refresh(self.now + timedelta(minutes=55))
+        self.assertNotIn(self.active_room, scheduler.active)
+        self.assertIn(self.timed_out_room, scheduler.active)
+        self.assertLessEqual(scheduler.get_wait_time(self.now), 1)
+
+    def test_timeout_in_query(self) -> None:
+        """Rooms past their timeout are filtered by the database."""
+        from WebHostLib.autolauncher import RoomScheduler
+        from WebHostLib.models import db
+
+        self.assertIn(db.provider_name, RoomScheduler.timeout_sql)
+        scheduler = RoomScheduler()
+        read: list[UUID] = []
+        add = scheduler._add
+
+        def record(room_id: UUID, *args) -> bool:
+            read.append(room_id)
+            return add(room_id, *args)
+
+        scheduler._add = record  # type: ignore[method-assign]
+        scheduler.refresh(self.now)
+        self.assertEqual(read, [self.active_room])
+
+    def test_recheck(self) -> None:
+        """Rooms that shut down stay active only if they still have activity within their timeout."""
+        from pony.orm import db_session
+        from WebHostLib.autolauncher import RoomScheduler
+        from WebHostLib.models import Room
+
+        scheduler = RoomScheduler()
+        scheduler.refresh(self.now)
+        with db_session:
+            # shutting down moves last_activity back
+            Room.get(id=self.active_room).last_activity = self.now - timedelta(hours=1, minutes=1)
+        scheduler.refresh(self.now)
+        self.assertIn(self.active_room, scheduler.active, "last_activity moving back is not seen by refresh")
+        self.assertEqual(scheduler.recheck([self.active_room], self.now), [])
+        self.assertNotIn(self.active_room, scheduler.active)
+
+
+class TestGenerationQueue(TestBase):
+    def setUp(self) -> None:
+        from WebHostLib.autolauncher import GenerationCosts
+
+        super().setUp()
+        self.costs = GenerationCosts()
+        self.costs.seconds_per_slot = {"Small Game": 1.0, "Large Game": 100.0}
+
+    def tearDown(self) -> None:
+        from pony.orm import db_session, delete
+        from WebHostLib.models import Generation, GenerationTime
+
+        with db_session:
+            delete(generation for generation in Generation)
+            delete(entry for entry in GenerationTime)
+
+    def test_estimate(self) -> None:
+        """Estimates grow with slots and slower games, recorded times move the estimates of the games."""
+        from WebHostLib.autolauncher import GenerationCosts
+
+        small = self.costs.estimate({"Small Game": 2})
+        self.assertLess(small, self.costs.estimate({"Small Game": 3}))
+        self.assertLess(small, self.costs.estimate({"Small Game": 2}, spoiler=2))
+        self.assertLess(self.costs.estimate({"Unknown Game": 2}), self.costs.estimate({"Large Game": 2}))
+
+        self.costs.record({"Small Game": 1, "Large Game": 1}, 0, self.costs.base_seconds + 505)
+        self.assertAlmostEqual(self.costs.seconds_per_slot["Small Game"], 2)
+        self.assertAlmostEqual(self.costs.seconds_per_slot["Large Game"], 200)
+        self.costs.record({"New Game": 2}, 0, self.costs.base_seconds + 20)
+        self.assertAlmostEqual(self.costs.seconds_per_slot["New Game"], 10)
+
+        loaded = GenerationCosts()
+        loaded.load()
+        self.assertEqual(loaded.seconds_per_slot, {"Small Game": 2, "Large Game": 200, "New Game": 10})
+
+    def test_lanes(self) -> None:
+        """Small generations can pass large ones, large ones only run on generators not reserved for small ones."""
+        from pony.orm import db_session
+        from Utils import restricted_dumps
+        from WebHostLib.autolauncher import GenerationQueue
+        from WebHostLib.models import Generation, STATE_QUEUED, STATE_STARTED
+
+        class FakeWorker:
+            def __init__(self, small_only: bool) -> None:
+                self.small_only = small_only
+
+        def queue_generation(game: str, players: int) -> UUID:
+            options = {f"Player{n}.yaml": {"game": game} for n in range(players)}
+            return Generation(options=restricted_dumps(options), meta=json.dumps({"generator_options": {}}),
+                              state=STATE_QUEUED, owner=uuid4()).id
+
+        queue = GenerationQueue(self.costs, small_job_time=60)
+        with db_session:
+            large = queue_generation("Large Game", 2)
+        queue.refresh()
+        with db_session:
+            small = queue_generation("Small Game", 2)
+            other_large = queue_generation("Large Game", 1)
+        queue.refresh()
+        self.assertFalse(queue.is_small(queue.queued[large]))
+        self.assertTrue(queue.is_small(queue.queued[small]))
+
+        small_worker = FakeWorker(True)
+        queued_small = queue.queued[small]
+        self.assertEqual(queue.assign([small_worker]), [(small_worker, queued_small)])
+        self.assertNotIn(small, queue.queued)
+        self.assertEqual(queue.assign([FakeWorker(True)]), [])
+        shared_worker = FakeWorker(False)
+        self.assertEqual([generation.id for _, generation in queue.assign([shared_worker])], [large])
+
+        with db_session:
+            for generation_id in (small, large, other_large):
+                Generation[generation_id].state = STATE_STARTED
+        queue.refresh()
+        self.assertEqual(queue.queued, {})
@@ -0,0 +1,72 @@
+import asyncio
+import typing
+from uuid import UUID, uuid4
+
+from . import TestBase
+
+
+class TestCommandDispatcher(TestBase):
+    room_ids: typing.List[UUID]
+
+    def setUp(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Room, Seed
+
+        super().setUp()
+        with db_session:
+            owner = uuid4()
+            seed = Seed(multidata=b"", owner=owner)
+            self.room_ids = [Room(seed=seed, owner=owner, tracker=uuid4()).id for _ in range(3)]
+
+    def tearDown(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Room
+
+        with db_session:
+            seed = Room.get(id=self.room_ids[0]).seed
+            for room in seed.rooms:
+                room.delete()  # deletes its commands
+            seed.delete()
+
+    def test_dispatch(self) -> None:
+        """Commands of hosted rooms get run in their loop in order, others stay in the database."""
+        from pony.orm import db_session, select
+        from WebHostLib.customserver import CommandDispatcher
+        from WebHostLib.models import Command, Room
+
+        loop = asyncio.new_event_loop()
+        received: typing.List[typing.Tuple[UUID, str]] = []
+
+        class FakeContext:
+            main_loop = loop
+
+            def __init__(self, room_id: UUID) -> None:
+                self.room_id = room_id
+
+            def run_db_command(self, commandtext: str) -> None:
+                received.append((self.room_id, commandtext))
+
+        with db_session:
+            for n, room_id in enumerate(self.room_ids * 2):
+                Command(room=Room.get(id=room_id), commandtext=f"/command {n}")
+
+        dispatcher = CommandDispatcher()
+        self.assertEqual(dispatcher.dispatch(), 0)
+        dispatcher.add_room(FakeContext(self.room_ids[0]))  # type: ignore
+        dispatcher.add_room(FakeContext(self.room_ids[1]))  # type: ignore
+        dispatcher.add_room(FakeContext(self.room_ids[2]))  # type: ignore
+        dispatcher.remove_room(self.room_ids[2])
+        self.assertEqual(dispatcher.dispatch(), 4)
+        self.assertEqual(received, [])
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()
+        self.assertEqual(received, [
+            (self.room_ids[0], "/command 0"),
+            (self.room_ids[1], "/command 1"),
+            (self.room_ids[0], "/command 3"),
+            (self.room_ids[1], "/command 4"),
+        ])
+        self.assertEqual(dispatcher.dispatch(), 0)
+        with db_session:
+            self.assertEqual(select(command.commandtext for command in Command
+                                    if command.room.id == self.room_ids[2]).count(), 2)
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from pathlib import Path
+from typing import ClassVar
+from uuid import UUID, uuid4
+
+from . import TestBase
+
+
+class TestHibernate(TestBase):
+    room_id: UUID
+    data: ClassVar[bytes]
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        with (Path(__file__).parent / "data" / "One_Archipelago.archipelago").open("rb") as f:
+            cls.data = f.read()
+
+    def setUp(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Room, Seed
+
+        super().setUp()
+        with db_session:
+            owner = uuid4()
+            seed = Seed(multidata=self.data, owner=owner)
+            self.room_id = Room(seed=seed, owner=owner, tracker=uuid4()).id
+
+    def tearDown(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Room
+
+        with db_session:
+            room = Room.get(id=self.room_id)
+            room.seed.delete()
+            room.delete()
+
+    def test_hibernate_and_wake(self) -> None:
+        """Hibernating saves and unloads the game, waking loads the same state again."""
+        from pony.orm import db_session
+        from NetUtils import NetworkItem
+        from WebHostLib.customserver import WebHostContext, get_static_server_data
+        from WebHostLib.models import Room
+
+        async def run() -> None:
+            ctx = WebHostContext(get_static_server_data(), logging.getLogger("TestHibernate"))
+            ctx.load(self.room_id)
+            ctx.saving = True
+            try:
+                ctx.stored_data["key"] = [1, 2]
+                ctx.received_items[0, 1, True] = [NetworkItem(1, 0, 1, 0)]
+                ctx.location_checks[0, 1].add(-1)
+                ctx.save()
+                read_data = set(ctx.read_data)
+
+                self.assertTrue(ctx.hibernate())
+                self.assertTrue(ctx.hibernating)
+                self.assertFalse(ctx.hibernate())
+                self.assertEqual(ctx.stored_data, {})
+                self.assertEqual(ctx.received_items, {})
+                self.assertEqual(ctx.read_data, {})
+                self.assertFalse(hasattr(ctx, "locations"))
+                self.assertEqual(ctx.player_names[0, 1], "Player1")  # needed for RoomInfo
+
+                with db_session:
+                    room = Room.get(id=self.room_id)
+                    multisave, save_version = room.multisave, room.get_save_version()
+                self.assertTrue(ctx._save())
+                with db_session:
+                    room = Room.get(id=self.room_id)
+                    self.assertEqual(room.multisave, multisave, "saved while hibernating")
+                    self.assertEqual(room.get_save_version(), save_version, "saved while hibernating")
+
+                ctx.wake()
+                self.assertFalse(ctx.hibernating)
+                self.assertEqual(ctx.stored_data, {"key": [1, 2]})
+                self.assertEqual(ctx.received_items, {(0, 1, True): [NetworkItem(1, 0, 1, 0)]})
+                self.assertEqual(ctx.location_checks[0, 1], {-1})
+                self.assertEqual(set(ctx.read_data), read_data)
+                self.assertIn(1, ctx.locations)
+            finally:
+                ctx.exit_event.set()
+
+        asyncio.run(run())
+
+    def test_not_while_connected(self) -> None:
+        """A room with a client connected to a slot does not hibernate."""
+        from WebHostLib.customserver import WebHostContext, get_static_server_data
+
+        class FakeClient:
+            auth = True
+
+        async def run() -> None:
+            ctx = WebHostContext(get_static_server_data(), logging.getLogger("TestHibernate"))
+            ctx.load(self.room_id)
+            ctx.saving = True
+            ctx.hibernate_time = 60
+            try:
+                ctx.endpoints.append(FakeClient())  # type: ignore
+                ctx.schedule_hibernation()
+                self.assertIsNone(ctx.hibernate_handle)
+                self.assertFalse(ctx.hibernate())
+                ctx.endpoints.clear()
+                ctx.schedule_hibernation()
+                self.assertIsNotNone(ctx.hibernate_handle)
+            finally:
+                ctx.exit_event.set()
+                if ctx.hibernate_handle:
+                    ctx.hibernate_handle.cancel()
+
+        asyncio.run(run())
@@ -0,0 +1,65 @@
+import os
+import pickle
+import sys
+import unittest
+
+from WebHostLib.staticdata import StaticNameTables
+
+
+class TestStaticNameTables(unittest.TestCase):
+    gamespackage = {
+        "Archipelago": {
+            "item_name_to_id": {"Nothing": -1},
+            "location_name_to_id": {"Cheat Console": -1, "Server": -2},
+            "checksum": "test_archipelago",
+        },
+        "Test Game": {
+            "item_name_to_id": {"Sword": 3, "Shield": 1, "Ocarina ♪": 2},
+            "location_name_to_id": {},
+            "checksum": "test_game",
+        },
+        "Custom Game": {
+            "item_name_to_id": {"Key": 1},
+            "location_name_to_id": {"Chest": 1},
+        },
+    }
+
+    def setUp(self) -> None:
+        self.tables = StaticNameTables.write(self.gamespackage)
+
+    def test_lookup(self) -> None:
+        item_names = self.tables.item_names["Test Game"]
+        self.assertEqual(dict(item_names), {-1: "Nothing", 1: "Shield", 2: "Ocarina ♪", 3: "Sword"})
+        self.assertIn(2, item_names)
+        self.assertNotIn(4, item_names)
+        self.assertIsNone(item_names.get(4))
+        self.assertEqual(item_names[4], "Unknown item (ID:4)")
+        self.assertEqual(dict(self.tables.location_names["Test Game"]), {-2: "Server", -1: "Cheat Console"})
+        self.assertEqual(self.tables.location_names["Test Game"][0], "Unknown location (ID:0)")
+        self.assertNotIn(-2, self.tables.item_names["Archipelago"])
+
+    def test_matches(self) -> None:
+        self.assertTrue(self.tables.matches("Test Game", self.gamespackage["Test Game"]))
+        self.assertFalse(self.tables.matches("Test Game", {**self.gamespackage["Test Game"], "checksum": "other"}))
+        self.assertFalse(self.tables.matches("Custom Game", self.gamespackage["Custom Game"]))
+        self.assertNotIn("Custom Game", self.tables.item_names)
+
+    def test_shared_file(self) -> None:
+        """Pickling only passes the file along, and writing the same data package again reuses the file."""
+        self.assertLess(len(pickle.dumps(self.tables)), 200)
+        unpickled = pickle.loads(pickle.dumps(self.tables))
+        self.assertEqual(unpickled.path, self.tables.path)
+        self.assertEqual(dict(unpickled.item_names["Test Game"]), dict(self.tables.item_names["Test Game"]))
+        modified = os.path.getmtime(self.tables.path)
+        self.assertEqual(StaticNameTables.write(self.gamespackage).path, self.tables.path)
+        self.assertEqual(os.path.getmtime(self.tables.path), modified)
+
+    @unittest.skipIf(sys.platform == "win32", "files that are still mapped can't be deleted on Windows")
+    def test_old_files_removed(self) -> None:
+        """Writing another data package deletes the file of the previous one, while its tables stay readable."""
+        other = StaticNameTables.write({**self.gamespackage,
+                                        "Test Game": {**self.gamespackage["Test Game"], "checksum": "changed"}})
+        self.assertNotEqual(other.path, self.tables.path)
+        self.assertFalse(os.path.exists(self.tables.path))
+        self.assertEqual(os.listdir(os.path.dirname(other.path)), [os.path.basename(other.path)])
+        self.assertEqual(self.tables.item_names["Test Game"][3], "Sword")
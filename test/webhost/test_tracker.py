@@ -62,6 +62,18 @@ class TestTracker(TestBase):
         except FileNotFoundError:
             pass
 
+    @staticmethod
+    def write_frame(room) -> None:
+        """Writes an empty journal frame to the room's save like an exit save, which leaves last_activity as it is."""
+        from pony.orm import commit
+        from MultiServer import SaveJournal
+        from WebHostLib.models import RoomJournal
+
+        frame = {"received_items": {}, "location_checks": {}, "hints": {}, "stored_data": {}, "state": {}}
+        RoomJournal(room=room, data=SaveJournal.compress_frame(pickle.dumps((0, frame))),
+                    version=room.get_save_version() + 1)
+        commit()
+
     def test_valid_if_modified_since(self) -> None:
         """
         Verify that we get a 200 response for valid If-Modified-Since
@@ -103,3 +115,101 @@ class TestTracker(TestBase):
                 self.assertEqual(response.status_code, 200)
             with self.client.open(url_for("api.tracker_slot_data", tracker=self.tracker_uuid)) as response:
                 self.assertEqual(response.status_code, 200)
+
+    def test_checked_locations_by_sphere(self) -> None:
+        """Verify checked locations are grouped by their sphere"""
+        from NetUtils import NetworkSlot, SlotType
+        from WebHostLib.tracker import TrackerData
+
+        tracker_data = TrackerData.__new__(TrackerData)
+        tracker_data._tracker_cache = {}
+        tracker_data._multidata = {
+            "slot_info": {1: NetworkSlot("Player1", "Archipelago", SlotType.player),
+                          2: NetworkSlot("Player2", "Archipelago", SlotType.player)},
+            "spheres": [{1: {10, 11}, 2: {20}}, {1: {12}, 2: {21, 22}}],
+        }
+        tracker_data._multisave = {"location_checks": {(0, 1): {10, 12}, (0, 2): {21, 22}}}
+        self.assertEqual(tracker_data.get_team_checked_locations_by_sphere(0), [{1: [10]}, {1: [12], 2: [21, 22]}])
+
+    def test_shared_parsed_data(self) -> None:
+        """Verify trackers of the same room share parsed data until the room saves again"""
+        from pony.orm import db_session
+        from WebHostLib.models import Room
+        from WebHostLib.tracker import TrackerData
+
+        with db_session:
+            room = Room.get(id=self.room_id)
+            first = TrackerData(room)
+            second = TrackerData(room)
+            self.assertIs(first._multidata, second._multidata)
+            self.assertIs(first._multisave, second._multisave)
+            self.assertIs(first.item_id_to_name["Archipelago"], second.item_id_to_name["Archipelago"])
+            self.assertEqual(first.get_player_checked_locations(0, 1), set())
+            self.assertEqual(first.item_id_to_name["Archipelago"][-999], "Unknown Item (ID: -999)")
+            self.assertNotIn(-999, second.item_id_to_name["Archipelago"], "unknown ids are added to shared tables")
+
+            room.multisave = pickle.dumps({"location_checks": {(0, 1): {-1}}, "hints": {}})
+            self.write_frame(room)
+            third = TrackerData(room)
+            self.assertIs(first._multidata, third._multidata)
+            self.assertEqual(third.get_player_checked_locations(0, 1), {-1})
+
+    def test_tracker_api_versions(self) -> None:
+        """Verify tracker api answers with an ETag, 304 for a known ETag and a delta for a known version"""
+        from pony.orm import db_session
+        from WebHostLib.models import Room
+
+        with self.app.test_request_context():
+            url = url_for("api.tracker_data", tracker=self.tracker_uuid)
+            with self.client.open(url) as response:
+                self.assertEqual(response.status_code, 200)
+                version = response.json["version"]
+                self.assertNotIn("since", response.json)
+                etag = response.headers["ETag"]
+            self.assertEqual(etag, f'"{version}"')
+            with self.client.open(url, headers={"If-None-Match": etag}) as response:
+                self.assertEqual(response.status_code, 304)
+            with self.client.open(url, query_string={"since": version}) as response:
+                self.assertEqual(response.json["since"], version)
+                self.assertEqual(response.json["player_status"], [])
+
+            with db_session:
+                self.write_frame(Room.get(id=self.room_id))
+            with self.client.open(url, headers={"If-None-Match": etag}) as response:
+                self.assertEqual(response.status_code, 200)
+                self.assertGreater(response.json["version"], version)
+            with self.client.open(url, query_string={"since": -1}) as response:
+                self.assertNotIn("since", response.json, "unknown versions get all data")
+
+    def test_tracker_api_delta(self) -> None:
+        """Verify a delta only contains the players that changed"""
+        from NetUtils import ClientStatus, NetworkItem, NetworkSlot, SlotType
+        from WebHostLib.api.tracker import TrackerRollup
+        from WebHostLib.tracker import TrackerData
+
+        def make_tracker_data(multisave: dict) -> TrackerData:
+            tracker_data = TrackerData.__new__(TrackerData)
+            tracker_data._tracker_cache = {}
+            tracker_data._multidata = {
+                "slot_info": {1: NetworkSlot("Player1", "Archipelago", SlotType.player),
+                              2: NetworkSlot("Player2", "Archipelago", SlotType.player),
+                              3: NetworkSlot("Player3", "Archipelago", SlotType.player)},
+            }
+            tracker_data._multisave = multisave
+            return tracker_data
+
+        old = TrackerRollup(make_tracker_data({"location_checks": {(0, 1): {1}}}), 1)
+        new = TrackerRollup(make_tracker_data({
+            "location_checks": {(0, 1): {1}, (0, 2): {2}},
+            "received_items": {(0, 1, True): [NetworkItem(3, 2, 2, 0)]},
+            "client_game_state": {(0, 3): ClientStatus.CLIENT_GOAL},
+        }), 2)
+        self.assertEqual(new.get_changed_players(old), {(0, 1), (0, 2), (0, 3)})
+        self.assertEqual(new.get_changed_players(new), set())
+        self.assertEqual(old.get_changed_players(old), set())
+        delta = TrackerRollup(make_tracker_data({"location_checks": {(0, 1): {1, 5}}}), 3).get_delta(old)
+        self.assertEqual(delta["since"], 1)
+        self.assertEqual(delta["version"], 3)
+        self.assertEqual(delta["player_checks_done"], [{"team": 0, "player": 1, "locations": [1, 5]}])
+        self.assertEqual([entry["player"] for entry in delta["player_status"]], [1])
+        self.assertEqual(delta["total_checks_done"], [{"team": 0, "checks_done": 2}])
@@ -167,6 +167,9 @@ def _timed_call(method: Callable[..., Any], *args: Any,
     start = time.perf_counter()
     ret = method(*args)
     taken = time.perf_counter() - start
+    if player and multiworld and multiworld.fill_profile:
+        step_times = multiworld.fill_profile.step_times[player]
+        step_times[method.__name__] = step_times.get(method.__name__, 0.0) + taken
     if taken > 1.0:
         if player and multiworld:
             perf_logger.info(f"Took {taken:.4f} seconds in {method.__qualname__} for player {player}, "
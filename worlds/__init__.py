@@ -8,10 +8,12 @@ import zipimport
 import time
 import dataclasses
 import json
-from typing import List
+import pickle
+from typing import Any, Dict, List, Optional
 
-from NetUtils import DataPackage
-from Utils import local_path, user_path, Version, version_tuple, tuplize_version
+from NetUtils import DataPackage, GamesPackage
+from Utils import (cache_path, local_path, user_path, restricted_loads, LazyDict, Version, version_tuple,
+                   tuplize_version)
 
 local_folder = os.path.dirname(__file__)
 user_folder = user_path("worlds") if user_path() != local_path() else user_path("custom_worlds")
@@ -27,11 +29,20 @@ __all__ = {
     "local_folder",
     "user_folder",
     "failed_world_loads",
+    "lazy_world_loading",
 }
 
 
 failed_world_loads: List[str] = []
 
+lazy_world_loading: bool = os.environ.get("LAZY_WORLD_LOADING", "").lower() in ("1", "true", "yes")
+"""
+Only load world folders once their game gets looked up in AutoWorldRegister.world_types or network_data_package, using
+the world index to know which folder registers which game. .apworld files are always loaded.
+"""
+world_index_path = cache_path("world_index.json")
+data_package_cache_path = cache_path("data_package.pickle")
+
 
 @dataclasses.dataclass(order=True)
 class WorldSource:
@@ -50,6 +61,41 @@ class WorldSource:
             return os.path.join(local_folder, self.path)
         return self.path
 
+
+    @property
+    def loaded(self) -> bool:
+        return self.time_taken >= 0
+
+    def get_fingerprint(self) -> List[int]:
+        """Returns file count, total size and latest modification time of this source, to tell when it changed."""
+        if self.is_zip:
+            stat = os.stat(self.resolved_path)
+            return [1, stat.st_size, stat.st_mtime_ns]
+        count = size = mtime = 0
+        for dirpath, dirnames, filenames in os.walk(self.resolved_path):
+            dirnames[:] = [dirname for dirname in dirnames if dirname != "__pycache__"]
+            for file in filenames:
+                stat = os.stat(os.path.join(dirpath, file))
+                count += 1
+                size += stat.st_size
+                mtime = max(mtime, stat.st_mtime_ns)
+        return [count, size, mtime]
+
+    def load_manifest_version(self) -> None:
+        """Applies world_version of this folder's archipelago.json to the game it registered."""
+        manifest = {}
+        for dirpath, dirnames, filenames in os.walk(self.resolved_path):
+            for file in filenames:
+                if file.endswith("archipelago.json"):
+                    with open(os.path.join(dirpath, file), mode="r", encoding="utf-8") as manifest_file:
+                        manifest = json.load(manifest_file)
+                    break
+            if manifest:
+                break
+        game = manifest.get("game")
+        if game in dict.keys(AutoWorldRegister.world_types):
+            AutoWorldRegister.world_types[game].world_version = tuplize_version(manifest.get("world_version", "0.0.0"))
+
     def load(self) -> bool:
         try:
             start = time.perf_counter()
@@ -102,34 +148,123 @@ for folder in (folder for folder in (user_folder, local_folder) if folder):
             elif entry.is_file() and entry.name.endswith(".apworld"):
                 world_sources.append(WorldSource(file_name, is_zip=True, relative=relative))
 
+def read_world_index() -> Dict[str, Dict[str, Any]]:
+    """Returns the last known fingerprint and games of world folders by their resolved path."""
+    try:
+        with open(world_index_path, encoding="utf-8") as index_file:
+            return json.load(index_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def update_world_index(index: Dict[str, Dict[str, Any]], sources: List[WorldSource],
+                       fingerprints: Dict[str, List[int]]) -> None:
+    """Records the games registered by the loaded sources into the world index and writes it if anything changed."""
+    games_by_module: Dict[str, List[str]] = {}
+    for game, world_type in dict.items(AutoWorldRegister.world_types):
+        module_parts = world_type.__module__.split(".")
+        if len(module_parts) > 1 and module_parts[0] == "worlds":
+            games_by_module.setdefault(module_parts[1], []).append(game)
+    changed = False
+    for source in sources:
+        if source.loaded:
+            path = source.resolved_path
+            entry = {"fingerprint": fingerprints[path], "games": sorted(games_by_module.get(os.path.basename(path), ()))}
+            if index.get(path) != entry:
+                index[path] = entry
+                changed = True
+    if changed:
+        try:
+            os.makedirs(os.path.dirname(world_index_path), exist_ok=True)
+            temp_path = f"{world_index_path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as index_file:
+                json.dump(index, index_file)
+            os.replace(temp_path, world_index_path)
+        except OSError as e:
+            logging.debug(f"Could not write world index: {e}")
+
+
+def read_data_package_cache(key: Dict[str, Any]) -> Dict[str, GamesPackage]:
+    """Returns the games of the cached data package if it was built from the same core version and world sources."""
+    try:
+        with open(data_package_cache_path, "rb") as cache_file:
+            cache = restricted_loads(cache_file.read())
+    except Exception as e:
+        logging.debug(f"Could not load data package cache: {e}")
+        return {}
+    return cache["games"] if cache.get("key") == key else {}
+
+
+def write_data_package_cache(key: Dict[str, Any], games: Dict[str, GamesPackage]) -> None:
+    try:
+        os.makedirs(os.path.dirname(data_package_cache_path), exist_ok=True)
+        temp_path = f"{data_package_cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as cache_file:
+            pickle.dump({"key": key, "games": games}, cache_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, data_package_cache_path)
+    except OSError as e:
+        logging.debug(f"Could not write data package cache: {e}")
+
+
+def get_core_fingerprint() -> Dict[str, Optional[List[int]]]:
+    """Returns size and modification time of the core modules that build and encode the data package."""
+    fingerprints: Dict[str, Optional[List[int]]] = {}
+    for module_name in ("worlds", "worlds.AutoWorld", "NetUtils"):
+        try:
+            stat = os.stat(sys.modules[module_name].__file__)
+        except (KeyError, TypeError, OSError):  # not loaded or not from a file, as in some frozen builds
+            fingerprints[module_name] = None
+        else:
+            fingerprints[module_name] = [stat.st_size, stat.st_mtime_ns]
+    return fingerprints
+
+
 # import all submodules to trigger AutoWorldRegister
 world_sources.sort()
-apworlds: list[WorldSource] = []
-for world_source in world_sources:
-    # load all loose files first:
-    if world_source.is_zip:
-        apworlds.append(world_source)
-    else:
-        world_source.load()
-
+apworlds: list[WorldSource] = [world_source for world_source in world_sources if world_source.is_zip]
+world_folders: list[WorldSource] = [world_source for world_source in world_sources if not world_source.is_zip]
+world_index = read_world_index()
+world_fingerprints: Dict[str, List[int]] = {source.resolved_path: source.get_fingerprint() for source in world_folders}
 
 from .AutoWorld import AutoWorldRegister
 
-for world_source in world_sources:
-    if not world_source.is_zip:
-        # look for manifest
-        manifest = {}
-        for dirpath, dirnames, filenames in os.walk(world_source.resolved_path):
-            for file in filenames:
-                if file.endswith("archipelago.json"):
-                    with open(os.path.join(dirpath, file), mode="r", encoding="utf-8") as manifest_file:
-                        manifest = json.load(manifest_file)
-                    break
-            if manifest:
-                break
-        game = manifest.get("game")
-        if game in AutoWorldRegister.world_types:
-            AutoWorldRegister.world_types[game].world_version = tuplize_version(manifest.get("world_version", "0.0.0"))
+if lazy_world_loading:
+    # changed or new folders get loaded to learn their games, the others wait until their game is needed.
+    # Folders without a game, like modules shared by other worlds, can't be looked up by game and always get loaded.
+    unloaded_folders: list[WorldSource] = []
+    folders_by_game: Dict[str, WorldSource] = {}
+    for world_source in world_folders:
+        entry = world_index.get(world_source.resolved_path)
+        if entry and entry["games"] and entry["fingerprint"] == world_fingerprints[world_source.resolved_path]:
+            unloaded_folders.append(world_source)
+            folders_by_game.update(dict.fromkeys(entry["games"], world_source))
+        elif world_source.load():
+            world_source.load_manifest_version()
+
+    def load_world_folder(world_source: WorldSource) -> None:
+        # removed first, as registering its world looks up its game again
+        if world_source in unloaded_folders:
+            unloaded_folders.remove(world_source)
+            if world_source.load():
+                world_source.load_manifest_version()
+
+    def load_world_folder_of(game: str) -> None:
+        if game in folders_by_game:
+            load_world_folder(folders_by_game[game])
+
+    def load_world_folders() -> None:
+        for world_source in list(unloaded_folders):
+            load_world_folder(world_source)
+
+    AutoWorldRegister.world_types = LazyDict(AutoWorldRegister.world_types,
+                                             load_key=load_world_folder_of, load_all=load_world_folders)
+else:
+    for world_source in world_folders:
+        world_source.load()
+    for world_source in world_folders:
+        world_source.load_manifest_version()
+
+update_world_index(world_index, world_folders, world_fingerprints)
 
 if apworlds:
     # encapsulation for namespace / gc purposes
@@ -182,7 +317,7 @@ if apworlds:
                            add_as_failed_to_load=False)
             else:
                 apworld_source.load()
-                if apworld.game in AutoWorldRegister.world_types:
+                if apworld.game in dict.keys(AutoWorldRegister.world_types):
                     # world could fail to load at this point
                     if apworld.world_version:
                         AutoWorldRegister.world_types[apworld.game].world_version = apworld.world_version
@@ -191,8 +326,40 @@ if apworlds:
 
 del apworlds
 
-# Build the data package for each game.
-network_data_package: DataPackage = {
-    "games": {world_name: world.get_data_package_data() for world_name, world in AutoWorldRegister.world_types.items()},
+# Build the data package for each game, reusing the cache unless the core or any world source changed.
+data_package_cache_key: Dict[str, Any] = {
+    "version": tuple(version_tuple),
+    "core": get_core_fingerprint(),
+    "sources": {world_source.resolved_path: world_fingerprints[world_source.resolved_path] if not world_source.is_zip
+                else world_source.get_fingerprint() for world_source in world_sources},
 }
+if lazy_world_loading:
+    cached_games: Optional[Dict[str, GamesPackage]] = None
+
+    def load_game_data_package(game: str) -> None:
+        global cached_games
+        if game in AutoWorldRegister.world_types:
+            if cached_games is None:
+                cached_games = read_data_package_cache(data_package_cache_key)
+            network_data_package["games"][game] = cached_games.get(game) or \
+                AutoWorldRegister.world_types[game].get_data_package_data()
+
+    def load_game_data_packages() -> None:
+        games = network_data_package["games"]
+        for world_name, world in AutoWorldRegister.world_types.items():
+            if not dict.__contains__(games, world_name):
+                load_game_data_package(world_name)
+        if cached_games is None or dict.keys(games) - cached_games.keys():
+            write_data_package_cache(data_package_cache_key, dict(dict.items(games)))
 
+    network_data_package: DataPackage = {
+        "games": LazyDict(load_key=load_game_data_package, load_all=load_game_data_packages),
+    }
+else:
+    cached_games = read_data_package_cache(data_package_cache_key)
+    network_data_package: DataPackage = {
+        "games": {world_name: cached_games.get(world_name) or world.get_data_package_data()
+                  for world_name, world in AutoWorldRegister.world_types.items()},
+    }
+    if network_data_package["games"].keys() - cached_games.keys():
+        write_data_package_cache(data_package_cache_key, network_data_package["games"])
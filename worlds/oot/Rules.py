@@ -125,7 +125,8 @@ class OOTLogic(LogicMixin):
                     bc.remove(connection)
                     bc.update(new_region.exits)
                     queue.extend(new_region.exits)
-                    self.path[new_region] = (new_region.name, self.path.get(connection, None))
+                    path = self.get_writable_path()
+                    path[new_region] = (new_region.name, path.get(connection, None))
 
 
 # Sets extra rules on various specific locations not handled by the rule parser.
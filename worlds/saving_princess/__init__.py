@@ -77,10 +77,10 @@ class SavingPrincessWorld(World):
     topology_present = False
 
     item_name_to_id = {
-        key: value.code for key, value in (Items.item_dict.items() - Items.item_dict_events.items())
+        key: value.code for key, value in Items.item_dict.items() if key not in Items.item_dict_events
     }
     location_name_to_id = {
-        key: value.code for key, value in (Locations.location_dict.items() - Locations.location_dict_events.items())
+        key: value.code for key, value in Locations.location_dict.items() if key not in Locations.location_dict_events
     }
 
     item_name_groups = {